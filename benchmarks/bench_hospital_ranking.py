@@ -0,0 +1,93 @@
+"""
+Hospital ranking benchmark on synthetic facilities: the old per-facility
+flat-earth distance + full sort vs vectorized haversine + argpartition top-k,
+plus the flat-earth error at increasing latitudes.
+
+Usage:
+    python benchmarks/bench_hospital_ranking.py [--facilities 100000] [--k 20]
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.services.geo import haversine_m, haversine_many, nearest_order
+
+
+def _flat_distance(lat1, lng1, lat2, lng2):
+    """Previous osm_maps.calculate_distance"""
+    lat_diff = (lat2 - lat1) * 111000
+    lng_diff = (lng2 - lng1) * 111000 * 0.9
+    return math.sqrt(lat_diff**2 + lng_diff**2)
+
+
+def _best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n_facilities, k, repeats=5):
+    rng = np.random.default_rng(42)
+    lat0, lng0 = 52.52, 13.40
+    lats = lat0 + rng.uniform(-0.5, 0.5, n_facilities)
+    lngs = lng0 + rng.uniform(-0.8, 0.8, n_facilities)
+    facilities = [{"lat": a, "lng": b} for a, b in zip(lats.tolist(), lngs.tolist())]
+
+    def loop_flat_sort():
+        ranked = sorted(facilities, key=lambda f: _flat_distance(lat0, lng0, f["lat"], f["lng"]))
+        return ranked[:k]
+
+    def loop_haversine_sort():
+        ranked = sorted(facilities, key=lambda f: haversine_m(lat0, lng0, f["lat"], f["lng"]))
+        return ranked[:k]
+
+    def vectorized_sort():
+        distances = haversine_many(lat0, lng0, lats, lngs)
+        return np.argsort(distances)[:k]
+
+    def vectorized_top_k():
+        distances = haversine_many(lat0, lng0, lats, lngs)
+        return nearest_order(distances, k)
+
+    results = [
+        ("per-facility flat-earth + sort", _best_of(loop_flat_sort, repeats)),
+        ("per-facility haversine + sort", _best_of(loop_haversine_sort, repeats)),
+        ("NumPy haversine + argsort", _best_of(vectorized_sort, repeats)),
+        ("NumPy haversine + argpartition", _best_of(vectorized_top_k, repeats)),
+    ]
+
+    print(f"\n{'='*60}")
+    print(f"⏱️  Ranking {n_facilities:,} facilities, top {k} (best of {repeats})")
+    print(f"{'='*60}")
+    for name, seconds in results:
+        print(f"   {name:<36} {seconds * 1e3:>10.2f} ms")
+    print(f"\n   ✅ Vectorized top-k: {results[0][1] / results[-1][1]:.0f}x faster than the old loop")
+
+    print("\n📏 Flat-earth error for a point 5 km east")
+    for lat in (0, 30, 45, 60, 70):
+        lng_offset = 5000 / (111320 * math.cos(math.radians(lat)))
+        true = haversine_m(lat, 0.0, lat, lng_offset)
+        flat = _flat_distance(lat, 0.0, lat, lng_offset)
+        print(f"   lat {lat:>2}°: flat-earth {flat / 1000:6.2f} km vs haversine {true / 1000:5.2f} km "
+              f"({(flat - true) / true:+.0%})")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hospital distance ranking")
+    parser.add_argument("--facilities", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+    run(args.facilities, args.k)
@@ -0,0 +1,98 @@
+"""
+Overpass response parsing benchmark on the recorded 60 km Berlin response:
+``json.loads`` of the whole body vs incremental parsing, with and without a
+nearest-k cap (early stop). Reports time to first facility, total time and
+peak memory (tracemalloc).
+
+Usage:
+    python benchmarks/bench_overpass_stream.py [--k 20] [--chunk-size 65536]
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.services.osm_maps import _facility_from_element, collect_facilities, is_relevant
+from src.services.overpass_stream import iter_json_array
+
+FIXTURE = project_root / "tests" / "fixtures" / "osm" / "overpass_berlin_60km.json.gz"
+LAT, LNG = 52.52, 13.40
+
+
+def _chunks(body, size):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def _measure(fn):
+    """(seconds to first facility, total seconds, peak bytes)"""
+    first = []
+    start = time.perf_counter()
+
+    def on_first():
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn(on_first)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return first[0] if first else float("nan"), time.perf_counter() - start, peak
+
+
+def run(k, chunk_size):
+    body = gzip.open(FIXTURE).read()
+
+    def keep(facility):
+        return is_relevant(facility["tags"], "heart")
+
+    def full_json(on_first):
+        elements = json.loads(body)["elements"]
+        for element in elements:
+            if _facility_from_element(element) is not None:
+                on_first()
+                break
+        return collect_facilities(elements, LAT, LNG, k, keep)
+
+    def streamed_all(on_first):
+        def elements():
+            for element in iter_json_array(_chunks(body, chunk_size)):
+                on_first()
+                yield element
+        return collect_facilities(elements(), LAT, LNG, None, keep)
+
+    def streamed_top_k(on_first):
+        def elements():
+            for element in iter_json_array(_chunks(body, chunk_size)):
+                on_first()
+                yield element
+        return collect_facilities(elements(), LAT, LNG, k, keep)
+
+    print(f"\n{'='*72}")
+    print(f"📦 Recorded Overpass response: {len(body) / 1e6:.1f} MB, nearest {k} cardiology-relevant")
+    print(f"{'='*72}")
+    print(f"   {'':<32}{'first result':>14}{'total':>12}{'peak memory':>14}")
+    for name, fn in (("json.loads + filter", full_json),
+                     ("streaming, all facilities", streamed_all),
+                     (f"streaming, nearest {k} (early stop)", streamed_top_k)):
+        first, total, peak = _measure(fn)
+        print(f"   {name:<32}{first * 1e3:>11.1f} ms{total * 1e3:>9.1f} ms{peak / 1e6:>11.1f} MB")
+    # tracemalloc slows parsing; timings are for comparison only
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streaming Overpass parsing")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    args = parser.parse_args()
+    run(args.k, args.chunk_size)
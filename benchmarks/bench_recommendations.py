@@ -0,0 +1,107 @@
+"""
+Recommendation latency benchmark: per-call config parsing vs cached config
+snapshot, the precompiled JSON response path, and scalar vs vectorized risk
+banding over a screening-sized batch.
+
+Usage:
+    python benchmarks/bench_recommendations.py [--iterations 2000]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from src.recommendation.engine import (
+    generate_recommendations,
+    generate_recommendations_json,
+    risk_band,
+    risk_bands,
+)
+from src.utils.config import clear_config_cache, get_config, load_config
+from src.utils.settings import get_settings
+
+CONFIG_PATH = "config/config.yaml"
+
+
+def _time_per_call(fn, iterations):
+    """Mean seconds per call (stdout of the calls is discarded)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()  # warm-up
+        start = time.perf_counter()
+        for i in range(iterations):
+            fn(i)
+        return (time.perf_counter() - start) / iterations
+
+
+def run(iterations):
+    conditions = ["diabetes", "heart", "kidney"]
+
+    def legacy_load(i=0):
+        load_config(CONFIG_PATH)
+
+    def cached_load(i=0):
+        get_config(CONFIG_PATH)
+
+    def typed_settings(i=0):
+        get_settings(CONFIG_PATH)
+
+    def recommend_uncached(i=0):
+        # What every request paid before: parse + env-substitute the YAML file
+        clear_config_cache()
+        generate_recommendations(conditions[i % 3], i % 101, config_path=CONFIG_PATH)
+
+    def recommend_cached(i=0):
+        generate_recommendations(conditions[i % 3], i % 101, config_path=CONFIG_PATH)
+
+    def recommend_dumps(i=0):
+        json.dumps(generate_recommendations(conditions[i % 3], i % 101, config_path=CONFIG_PATH))
+
+    def recommend_json(i=0):
+        generate_recommendations_json(conditions[i % 3], i % 101, config_path=CONFIG_PATH)
+
+    scores = np.random.default_rng(0).uniform(0, 100, 10_000)
+
+    def bands_scalar(i=0):
+        [risk_band(score, CONFIG_PATH) for score in scores]
+
+    def bands_vectorized(i=0):
+        risk_bands(scores, CONFIG_PATH)
+
+    batch_iterations = max(1, iterations // 100)
+    results = [
+        ("load_config (per call)", _time_per_call(legacy_load, iterations)),
+        ("get_config (cached)", _time_per_call(cached_load, iterations)),
+        ("get_settings (cached, typed)", _time_per_call(typed_settings, iterations)),
+        ("recommendations, config re-read", _time_per_call(recommend_uncached, iterations)),
+        ("recommendations, cached config", _time_per_call(recommend_cached, iterations)),
+        ("JSON response, json.dumps per call", _time_per_call(recommend_dumps, iterations)),
+        ("JSON response, precompiled table", _time_per_call(recommend_json, iterations)),
+        ("risk_band loop, 10k scores", _time_per_call(bands_scalar, batch_iterations)),
+        ("risk_bands vectorized, 10k scores", _time_per_call(bands_vectorized, batch_iterations)),
+    ]
+
+    print(f"\n{'='*60}")
+    print(f"⏱️  Recommendation latency ({iterations} calls each)")
+    print(f"{'='*60}")
+    for name, seconds in results:
+        print(f"   {name:<36} {seconds * 1e6:>10.1f} µs/call")
+    speedup = results[3][1] / results[4][1]
+    print(f"\n   ✅ Cached config: {speedup:.1f}x faster per recommendation")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recommendation latency")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.iterations)
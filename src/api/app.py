@@ -1,44 +1,64 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import joblib
+import json
 import numpy as np
 import pandas as pd
 import sys
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
+from sklearn.preprocessing import LabelEncoder
 
 # Add project root to path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.utils.config import load_config
-from src.recommendation.engine import generate_recommendations
+from src.utils.settings import build_settings, get_settings
+from src.recommendation.engine import generate_recommendations_batch, generate_recommendations_json
+from src.recommendation.rules import get_rule_engine
+from src.models.explain import ExplainerRegistry, model_version
+from src.models.importance import importance_path
+from src.models.whatif import score_sweeps
+from src.services.hospital_search import NoMapServiceError, latency_metrics, search_hospitals
+from src.services.http_client import backend_metrics
+from src.services.osm_maps import get_osm_cache
+from src.services.outbox import NoRecipientsError, enqueue_sos, get_outbox, outbox_metrics
 
 app = Flask(__name__)
 CORS(app)
 
-# Load config
+# Load config. A missing file only disables the models; malformed values
+# (ValueError) stop the API here rather than on the first request.
 try:
-    config = load_config()
-except Exception as e:
+    settings = get_settings()
+except RuntimeError as e:
     print(f"Warning: Could not load config: {e}")
-    config = None
+    settings = build_settings({})
 
 # Load models
 models = {}
 scalers = {}
+model_versions = {}
+model_backgrounds = {}
 
 try:
-    if config:
+    if settings.ml_models:
         # Load model dictionaries and extract pipelines
         for disease in ["diabetes", "heart", "kidney"]:
-            model_data = joblib.load(config["ml_models"][disease])
+            model_data = joblib.load(settings.ml_models[disease])
             # Check if it's a dict with pipeline key or just the model
             if isinstance(model_data, dict) and "pipeline" in model_data:
                 models[disease] = model_data["pipeline"]
+                model_backgrounds[disease] = model_data.get("background")
             else:
                 # If it's not a dict, assume it's the model directly
                 models[disease] = model_data
+            model_versions[disease] = model_version(settings.ml_models[disease])
         print("✅ Models loaded successfully")
 except Exception as e:
     print(f"❌ Error loading models: {e}")
@@ -56,6 +76,155 @@ EXPECTED_FEATURES = {
                "htn", "dm", "cad", "appet", "pe", "ane"]
 }
 
+# Largest batch accepted by /predict/<disease>/batch and /recommendations/batch
+BATCH_MAX_ROWS = 10000
+
+# SHAP explanations run in their own bounded thread pool so slow explanations
+# never occupy the request threads that serve /predict.
+explainer_registry = ExplainerRegistry(
+    max_entries=settings.explain.max_explainers,
+    background_size=settings.explain.background_size,
+)
+EXPLAIN_WORKERS = settings.explain.workers
+EXPLAIN_MAX_PENDING = settings.explain.max_pending
+EXPLAIN_SYNC_MAX_ROWS = settings.explain.sync_max_rows
+EXPLAIN_TIMEOUT = settings.explain.timeout_seconds
+EXPLAIN_MAX_JOBS = 200
+
+explain_pool = ThreadPoolExecutor(max_workers=EXPLAIN_WORKERS, thread_name_prefix="explain")
+explain_slots = threading.BoundedSemaphore(EXPLAIN_MAX_PENDING)
+explain_jobs = OrderedDict()
+explain_jobs_lock = threading.Lock()
+
+# Precomputed population importance, reloaded only when the file changes
+importance_cache = {}
+
+
+def _risk_zone(prediction):
+    """Green/Yellow/Red zone of a 0-100 risk score"""
+    if prediction <= 30:
+        return "Green"
+    elif prediction <= 70:
+        return "Yellow"
+    return "Red"
+
+
+def _patient_frame(patients, expected):
+    """
+    Validated feature frame for a list of patient objects.
+
+    Returns ``(frame, None)`` or ``(None, error_response)``.
+    """
+    rows = []
+    for i, patient in enumerate(patients):
+        missing_features = [f for f in expected if f not in patient]
+        if missing_features:
+            return None, (jsonify({
+                "error": "Missing required features",
+                "row": i,
+                "missing": missing_features,
+                "expected": expected
+            }), 400)
+        try:
+            rows.append([float(patient[f]) for f in expected])
+        except (ValueError, TypeError):
+            return None, (jsonify({"error": "All features must be numeric values", "row": i}), 400)
+
+    features_df = pd.DataFrame(rows, columns=expected)
+    if not np.isfinite(features_df.values).all():
+        return None, (jsonify({"error": "Invalid input: contains NaN or infinite values"}), 400)
+    return features_df, None
+
+
+def _risk_scores(model, features_df):
+    """0-100 risk score per row, with the same clamping and fallback as /predict"""
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(features_df)[:, 1]
+    else:
+        proba = model.predict(features_df)
+    scores = np.clip(np.asarray(proba, dtype=float) * 100, 0.0, 100.0)
+    return np.where(np.isfinite(scores), scores, 50.0)
+
+
+def _explain_background(disease):
+    """Training rows used as explainer background (bundle sample or the raw dataset)"""
+    background = model_backgrounds.get(disease)
+    if background is not None:
+        return background
+    raw_dir = settings.paths.get("raw_data", "data/raw")
+    raw = pd.read_csv(os.path.join(project_root, raw_dir, f"{disease}.csv"))
+    background = raw[EXPECTED_FEATURES[disease]].copy()
+    # Same cleaning as train_models.clean_data: fill gaps, then label-encode text
+    # columns with the encoders saved at training time. Without saved encoders a
+    # fresh fit over the same CSV reproduces the training codes.
+    label_encoders = _label_encoders(disease)
+    for col in background.columns:
+        if pd.api.types.is_numeric_dtype(background[col]):
+            background[col] = background[col].fillna(background[col].median())
+            continue
+        values = background[col].fillna(background[col].mode()[0]).astype(str)
+        le = label_encoders.get(col) or LabelEncoder().fit(values)
+        mapping = {label: code for code, label in enumerate(le.classes_)}
+        background[col] = values.map(mapping).fillna(0).astype(int)
+    return background
+
+
+def _label_encoders(disease):
+    """Training label encoders saved next to the model by train_models, or {}"""
+    model_path = settings.ml_models.get(disease)
+    if not model_path:
+        return {}
+    path = os.path.join(os.path.dirname(model_path), f"{disease}_encoders.joblib")
+    return joblib.load(path) if os.path.exists(path) else {}
+
+
+def _run_explanations(disease, features_df, top_k):
+    """Worker task: risk score, zone and top-k SHAP contributions per row"""
+    model = models[disease]
+    explainer = explainer_registry.get(
+        disease, model_versions.get(disease, "0"), model, _explain_background(disease)
+    )
+    probabilities = model.predict_proba(features_df)[:, 1]
+    explanations = explainer.explain(features_df, top_k=top_k)
+
+    results = []
+    for proba, explanation in zip(probabilities, explanations):
+        score = 50.0 if not np.isfinite(proba) else max(0.0, min(100.0, float(proba) * 100))
+        results.append({
+            "risk_score": round(score, 2),
+            "zone": _risk_zone(score),
+            "expected_value": explanation["expected_value"],
+            "contributions": explanation["contributions"],
+        })
+    return results
+
+
+def _submit_explanations(disease, features_df, top_k):
+    """Queue an explanation task, or return None when the pool's queue is full"""
+    if not explain_slots.acquire(blocking=False):
+        return None
+    try:
+        future = explain_pool.submit(_run_explanations, disease, features_df, top_k)
+    except Exception:
+        explain_slots.release()
+        raise
+    future.add_done_callback(lambda _: explain_slots.release())
+    return future
+
+
+def _store_explain_job(future, disease, n_rows):
+    job_id = uuid.uuid4().hex
+    with explain_jobs_lock:
+        explain_jobs[job_id] = {"future": future, "disease": disease, "rows": n_rows, "created": time.time()}
+        # Forget the oldest finished jobs beyond the cap
+        for old_id in list(explain_jobs):
+            if len(explain_jobs) <= EXPLAIN_MAX_JOBS:
+                break
+            if explain_jobs[old_id]["future"].done():
+                del explain_jobs[old_id]
+    return job_id
+
+
 @app.route("/")
 def home():
     return jsonify({
@@ -64,8 +233,18 @@ def home():
         "available_endpoints": [
             "GET /",
             "POST /predict/<disease>",
+            "POST /predict/<disease>/batch",
+            "POST /explain/<disease>",
+            "GET /explain/jobs/<job_id>",
+            "GET /importance/<disease>?zone=Red",
+            "POST /whatif/<disease>",
             "GET /recommendations/<disease>",
-            "GET /hospitals/<disease>?lat=X&lng=Y&radius=5000",
+            "POST /recommendations/batch",
+            "GET /rules",
+            "POST /rules/reload",
+            "GET /hospitals/<disease>?lat=X&lng=Y&radius=5000&k=10&mode=fallback|hedged|parallel",
+            "POST /sos",
+            "GET /sos/<tracking_id>",
             "GET /health"
         ]
     })
@@ -73,10 +252,15 @@ def home():
 @app.route("/health")
 def health():
     """Health check endpoint"""
+    osm_cache = get_osm_cache()
     return jsonify({
         "status": "healthy",
         "models_loaded": len(models),
-        "available_diseases": list(models.keys())
+        "available_diseases": list(models.keys()),
+        "osm_cache": osm_cache.metrics() if osm_cache is not None else None,
+        "map_backends": backend_metrics(),
+        "map_latency": latency_metrics(),
+        "notification_outbox": outbox_metrics()
     })
 
 @app.route("/predict/<disease>", methods=["POST"])
@@ -145,12 +329,7 @@ def predict(disease):
             prediction = max(0.0, min(100.0, prediction))
         
         # Risk zone classification
-        if prediction <= 30:
-            zone = "Green"
-        elif prediction <= 70:
-            zone = "Yellow"
-        else:
-            zone = "Red"
+        zone = _risk_zone(prediction)
         
         return jsonify({
             "disease": disease,
@@ -165,6 +344,263 @@ def predict(disease):
             "details": str(e)
         }), 500
 
+@app.route("/predict/<disease>/batch", methods=["POST"])
+def predict_batch(disease):
+    """
+    Risk scores for many patients ({"patients": [...]} or a JSON list) in one
+    model call. With "include_recommendations": true each result also carries
+    its recommendations, including feature rules matched on the patient data.
+    """
+    try:
+        if disease not in models:
+            return jsonify({
+                "error": f"Invalid disease type. Available: {list(models.keys())}"
+            }), 400
+
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        options = data if isinstance(data, dict) else {}
+        patients = data if isinstance(data, list) else data.get("patients")
+        if not isinstance(patients, list) or not patients or not all(isinstance(p, dict) for p in patients):
+            return jsonify({"error": "patients must be a non-empty list of objects"}), 400
+        if len(patients) > BATCH_MAX_ROWS:
+            return jsonify({"error": f"At most {BATCH_MAX_ROWS} patients per batch"}), 400
+
+        expected = EXPECTED_FEATURES.get(disease, [])
+        features_df, error = _patient_frame(patients, expected)
+        if error:
+            return error
+
+        # Zones and recommendations use the raw score, as /predict does;
+        # rounding is for display only
+        scores = _risk_scores(models[disease], features_df)
+        results = [{"risk_score": round(float(score), 2), "zone": _risk_zone(score)} for score in scores]
+
+        if options.get("include_recommendations"):
+            items = [
+                {"disease": disease, "risk_score": float(score), "features": features}
+                for score, features in zip(scores, features_df.to_dict("records"))
+            ]
+            for result, recs in zip(results, generate_recommendations_batch(items)):
+                result["risk_level"] = recs["risk_level"]
+                result["recommendations"] = recs["recommendations"]
+                result["matched_rules"] = recs["matched_rules"]
+
+        return jsonify({
+            "disease": disease,
+            "count": len(results),
+            "features_used": expected,
+            "results": results
+        })
+
+    except Exception as e:
+        return jsonify({
+            "error": "Prediction failed",
+            "details": str(e)
+        }), 500
+
+@app.route("/explain/<disease>", methods=["POST"])
+def explain(disease):
+    """
+    Top-k SHAP contributions for one patient (JSON object) or many
+    ({"patients": [...]} or a JSON list). Batches larger than the sync limit,
+    or requests with "async": true, return a job id to poll.
+    """
+    try:
+        if disease not in models:
+            return jsonify({
+                "error": f"Invalid disease type. Available: {list(models.keys())}"
+            }), 400
+
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        options = data if isinstance(data, dict) else {}
+        if isinstance(data, list):
+            patients = data
+        elif "patients" in data:
+            patients = data["patients"]
+        else:
+            patients = [data]
+        if not isinstance(patients, list) or not patients or not all(isinstance(p, dict) for p in patients):
+            return jsonify({"error": "patients must be a non-empty list of objects"}), 400
+
+        try:
+            top_k = int(options.get("top_k", 5))
+        except (ValueError, TypeError):
+            return jsonify({"error": "top_k must be an integer"}), 400
+
+        features_df, error = _patient_frame(patients, EXPECTED_FEATURES.get(disease, []))
+        if error:
+            return error
+        n_rows = len(features_df)
+
+        future = _submit_explanations(disease, features_df, top_k)
+        if future is None:
+            return jsonify({"error": "Explanation queue is full, retry later"}), 503
+
+        if options.get("async") or n_rows > EXPLAIN_SYNC_MAX_ROWS:
+            job_id = _store_explain_job(future, disease, n_rows)
+            return jsonify({
+                "job_id": job_id,
+                "status": "pending",
+                "rows": n_rows,
+                "poll": f"/explain/jobs/{job_id}"
+            }), 202
+
+        try:
+            explanations = future.result(timeout=EXPLAIN_TIMEOUT)
+        except FutureTimeoutError:
+            # Keep the work: hand the caller a job id instead of failing
+            job_id = _store_explain_job(future, disease, n_rows)
+            return jsonify({
+                "job_id": job_id,
+                "status": "pending",
+                "rows": n_rows,
+                "poll": f"/explain/jobs/{job_id}"
+            }), 202
+
+        return jsonify({
+            "disease": disease,
+            "count": len(explanations),
+            "explanations": explanations
+        })
+
+    except Exception as e:
+        return jsonify({
+            "error": "Explanation failed",
+            "details": str(e)
+        }), 500
+
+
+@app.route("/explain/jobs/<job_id>", methods=["GET"])
+def explain_job(job_id):
+    """Status (and results once done) of a queued explanation job"""
+    with explain_jobs_lock:
+        job = explain_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+
+    future = job["future"]
+    response = {"job_id": job_id, "disease": job["disease"], "rows": job["rows"]}
+    if not future.done():
+        response["status"] = "running" if future.running() else "pending"
+        return jsonify(response)
+
+    error = future.exception()
+    if error is not None:
+        response.update({"status": "failed", "error": str(error)})
+        return jsonify(response), 500
+
+    explanations = future.result()
+    response.update({"status": "done", "count": len(explanations), "explanations": explanations})
+    return jsonify(response)
+
+
+@app.route("/whatif/<disease>", methods=["POST"])
+def whatif(disease):
+    """
+    Risk curves for a base patient under one or more feature sweeps, e.g.
+    {"patient": {...}, "sweeps": [{"feature": "Glucose", "start": 80, "stop": 200, "step": 5}]}.
+    All sweep points (and the full grid for 2+ sweeps) are scored in one batch.
+    """
+    try:
+        if disease not in models:
+            return jsonify({
+                "error": f"Invalid disease type. Available: {list(models.keys())}"
+            }), 400
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("patient"), dict):
+            return jsonify({"error": "Request must contain a 'patient' object"}), 400
+        sweeps = data.get("sweeps")
+        if not isinstance(sweeps, list) or not sweeps:
+            return jsonify({"error": "Request must contain a non-empty 'sweeps' list"}), 400
+
+        patient = data["patient"]
+        expected = EXPECTED_FEATURES.get(disease, [])
+        swept = {s.get("feature") for s in sweeps if isinstance(s, dict)}
+        missing_features = [f for f in expected if f not in patient and f not in swept]
+        if missing_features:
+            return jsonify({
+                "error": "Missing required features",
+                "missing": missing_features,
+                "expected": expected
+            }), 400
+
+        try:
+            # Swept features may be left out of the base patient; use the first sweep value
+            base = {f: float(patient.get(f, np.nan)) for f in expected}
+        except (ValueError, TypeError):
+            return jsonify({"error": "All features must be numeric values"}), 400
+
+        try:
+            for sweep in sweeps:
+                feature = sweep.get("feature") if isinstance(sweep, dict) else None
+                if feature in base and not np.isfinite(base[feature]):
+                    first = sweep["values"][0] if "values" in sweep else sweep["start"]
+                    base[feature] = float(first)
+            if not all(np.isfinite(v) for v in base.values()):
+                return jsonify({"error": "Invalid input: contains NaN or infinite values"}), 400
+            result = score_sweeps(models[disease], base, sweeps, expected)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            return jsonify({"error": "Invalid sweep", "details": str(e)}), 400
+
+        return jsonify(dict(disease=disease, **result))
+
+    except Exception as e:
+        return jsonify({
+            "error": "What-if analysis failed",
+            "details": str(e)
+        }), 500
+
+
+def _load_importance(disease):
+    """Parsed <disease>_importance.json, cached by file modification time"""
+    save_dir = settings.paths.get("models", "models/saved_models")
+    path = importance_path(os.path.join(project_root, save_dir), disease)
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    cached = importance_cache.get(disease)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r") as f:
+            cached = (mtime, json.load(f))
+        importance_cache[disease] = cached
+    return cached[1]
+
+
+@app.route("/importance/<disease>", methods=["GET"])
+def importance(disease):
+    """Precomputed population-level SHAP importance (optionally for one zone)"""
+    if disease not in EXPECTED_FEATURES:
+        return jsonify({"error": "Invalid disease type"}), 400
+
+    report = _load_importance(disease)
+    if report is None:
+        return jsonify({
+            "error": "Importance not available",
+            "details": f"Train the {disease} model with ModelTrainer to compute it"
+        }), 404
+
+    zone = request.args.get("zone")
+    if zone is None:
+        return jsonify(report)
+
+    zone = zone.capitalize()
+    if zone not in report.get("zones", {}):
+        return jsonify({"error": "Invalid zone. Use: Green, Yellow, or Red"}), 400
+    return jsonify({
+        "condition": report.get("condition", disease),
+        "created_at": report.get("created_at"),
+        "zone": zone,
+        **report["zones"][zone]
+    })
+
+
 @app.route("/recommendations/<disease>", methods=["GET"])
 def recommendations(disease):
     """Get personalized recommendations based on disease and risk score"""
@@ -177,10 +613,10 @@ def recommendations(disease):
         if disease not in ["diabetes", "heart", "kidney"]:
             return jsonify({"error": "Invalid disease type"}), 400
         
-        # Generate recommendations
-        reco_data = generate_recommendations(disease, risk_score)
+        # Precompiled recommendations, already serialized
+        body = generate_recommendations_json(disease, risk_score)
         
-        return jsonify(reco_data)
+        return app.response_class(body, mimetype="application/json")
     
     except Exception as e:
         return jsonify({
@@ -188,68 +624,104 @@ def recommendations(disease):
             "details": str(e)
         }), 500
 
+@app.route("/recommendations/batch", methods=["POST"])
+def recommendations_batch():
+    """
+    Recommendations for many {"disease", "risk_score", "features"?} items
+    ({"items": [...]} or a JSON list), in request order.
+    """
+    try:
+        data = request.get_json(silent=True)
+        items = data if isinstance(data, list) else (data or {}).get("items")
+        if not isinstance(items, list) or not items or not all(isinstance(i, dict) for i in items):
+            return jsonify({"error": "items must be a non-empty list of objects"}), 400
+        if len(items) > BATCH_MAX_ROWS:
+            return jsonify({"error": f"At most {BATCH_MAX_ROWS} items per batch"}), 400
+
+        for i, item in enumerate(items):
+            if item.get("disease") not in ["diabetes", "heart", "kidney"]:
+                return jsonify({"error": "Invalid disease type", "row": i}), 400
+            try:
+                float(item.get("risk_score"))
+            except (ValueError, TypeError):
+                return jsonify({"error": "risk_score must be numeric", "row": i}), 400
+            if item.get("features") is not None and not isinstance(item["features"], dict):
+                return jsonify({"error": "features must be an object", "row": i}), 400
+
+        results = generate_recommendations_batch(items)
+        return jsonify({"count": len(results), "results": results})
+
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to generate recommendations",
+            "details": str(e)
+        }), 500
+
+@app.route("/rules", methods=["GET"])
+def rules_status():
+    """Active recommendation rule set"""
+    engine = get_rule_engine()
+    ruleset = engine.ruleset
+    return jsonify({
+        "rules": len(ruleset),
+        "features": list(ruleset.features),
+        "sources": [os.path.basename(p) for p in ruleset.sources],
+        "last_error": engine.last_error
+    })
+
+@app.route("/rules/reload", methods=["POST"])
+def rules_reload():
+    """Recompile rule files in the background; requests keep the current rules meanwhile"""
+    get_rule_engine().reload_async()
+    return jsonify({"status": "reloading"}), 202
+
 @app.route("/hospitals/<disease>", methods=["GET"])
 def find_hospitals(disease):
-    """Find nearby hospitals/clinics for a specific disease"""
+    """Find nearby hospitals/clinics for a specific disease (optionally only the k nearest)"""
     try:
         # Get location parameters
         lat = request.args.get('lat', type=float)
         lng = request.args.get('lng', type=float)
         radius = request.args.get('radius', type=int, default=5000)
+        k = request.args.get('k', type=int)
+        mode = request.args.get('mode')
         
         if lat is None or lng is None:
             return jsonify({
                 "error": "lat and lng parameters required"
             }), 400
+
+        if k is not None and k < 1:
+            return jsonify({
+                "error": "k must be a positive integer"
+            }), 400
         
         if disease not in ["diabetes", "heart", "kidney"]:
             return jsonify({
                 "error": "Invalid disease type. Use: diabetes, heart, or kidney"
             }), 400
         
-        # Try OpenStreetMap first (free, no API key needed)
+        # OpenStreetMap first (free, no API key needed), Google Maps as the
+        # fallback, hedge or parallel partner (maps.hedging.mode or ?mode=)
         try:
-            from src.services.osm_maps import find_hospitals_nearby_osm, format_osm_results_for_api
-            
-            print(f"🗺️  Using OpenStreetMap to find hospitals...")
-            hospitals_raw = find_hospitals_nearby_osm(lat, lng, disease, radius)
-            hospitals = format_osm_results_for_api(hospitals_raw)
-            
+            hospitals, source = search_hospitals(lat, lng, disease, radius, k, mode)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except NoMapServiceError as e:
             return jsonify({
-                "disease": disease,
-                "location": {"lat": lat, "lng": lng},
-                "radius_meters": radius,
-                "count": len(hospitals),
-                "hospitals": hospitals,
-                "source": "OpenStreetMap"
-            })
-        
-        except Exception as osm_error:
-            print(f"⚠️  OpenStreetMap failed: {osm_error}")
-            
-            # Fallback to Google Maps if available
-            try:
-                from src.services.maps import find_hospitals_nearby
-                
-                print(f"🔄 Falling back to Google Maps...")
-                hospitals = find_hospitals_nearby(lat, lng, disease, radius)
-                
-                return jsonify({
-                    "disease": disease,
-                    "location": {"lat": lat, "lng": lng},
-                    "radius_meters": radius,
-                    "count": len(hospitals),
-                    "hospitals": hospitals,
-                    "source": "Google Maps"
-                })
-            
-            except ValueError as ve:
-                # Google Maps API not configured
-                return jsonify({
-                    "error": "No map service available",
-                    "details": f"OpenStreetMap failed: {str(osm_error)}. Google Maps not configured: {str(ve)}",
-                    "instructions": "OpenStreetMap is temporarily unavailable. Please try again later or configure Google Maps API."
-                }), 503
+                "error": "No map service available",
+                "details": str(e),
+                "instructions": "OpenStreetMap is temporarily unavailable. Please try again later or configure Google Maps API."
+            }), 503
+
+        return jsonify({
+            "disease": disease,
+            "location": {"lat": lat, "lng": lng},
+            "radius_meters": radius,
+            "count": len(hospitals),
+            "hospitals": hospitals,
+            "source": source
+        })
     
     except Exception as e:
         return jsonify({
@@ -257,6 +729,38 @@ def find_hospitals(disease):
             "details": str(e)
         }), 500
 
+@app.route("/sos", methods=["POST"])
+def sos():
+    """Queue an SOS for all emergency contacts; delivery happens in the background"""
+    data = request.get_json(silent=True) or {}
+    summary = data.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        return jsonify({"error": "Request must contain a non-empty 'summary' string"}), 400
+    subject = data.get("subject", "Emergency Alert")
+    if not isinstance(subject, str):
+        return jsonify({"error": "subject must be a string"}), 400
+    # Retries of the same alert (client timeouts, double clicks) reuse one key
+    idempotency_key = request.headers.get("Idempotency-Key") or data.get("idempotency_key")
+    try:
+        queued = enqueue_sos(summary, idempotency_key=idempotency_key, subject=subject)
+    except NoRecipientsError as e:
+        return jsonify({
+            "error": str(e),
+            "instructions": "Add services.emergency_contacts and Twilio or SMTP settings to config.yaml"
+        }), 503
+    except Exception as e:
+        return jsonify({"error": "Failed to queue SOS", "details": str(e)}), 500
+    queued["status_url"] = f"/sos/{queued['tracking_id']}"
+    return jsonify(queued), 200 if queued["duplicate"] else 202
+
+@app.route("/sos/<tracking_id>", methods=["GET"])
+def sos_status(tracking_id):
+    """Delivery state of a queued SOS"""
+    status = get_outbox().status(tracking_id)
+    if status is None:
+        return jsonify({"error": "Unknown tracking id"}), 404
+    return jsonify(status)
+
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({
@@ -264,6 +768,7 @@ def not_found(e):
         "available_endpoints": [
             "GET /",
             "POST /predict/<disease>",
+            "POST /explain/<disease>",
             "GET /recommendations/<disease>",
             "GET /health"
         ]
@@ -0,0 +1,233 @@
+"""
+Precomputed cross-validation fold cache.
+
+Splitting, scaling and encoding the same dataset for every candidate and fold is
+repeated dozens of times per comparison/training run. ``FoldCache`` does it once
+per (dataset hash, split parameters, preprocessing) and stores the result as
+``.npy`` files under ``data/processed/fold_cache``; every later reader opens them
+memory-mapped (zero-copy, shared through the OS page cache across worker
+processes and across runs).
+
+Layout of one cache entry::
+
+    <cache_dir>/<key>/
+        manifest.json            split parameters and shapes
+        y.npy                    full target vector
+        X.npy                    full feature matrix (only when preprocess is None)
+        fold{i}_train_idx.npy    row indices of each split
+        fold{i}_test_idx.npy
+        fold{i}_X_train.npy      preprocessed matrices (only when preprocess is set)
+        fold{i}_X_test.npy
+        fold{i}_transformer.joblib
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from src.utils.config import get_project_root
+
+
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join("data", "processed", "fold_cache")
+
+# Named preprocessors that can be baked into cached folds
+PREPROCESSORS = {
+    "standard": StandardScaler,
+}
+
+
+def dataset_hash(X, y) -> str:
+    """Stable content hash of a feature matrix and target."""
+    h = hashlib.sha1()
+    X_df = X if isinstance(X, pd.DataFrame) else pd.DataFrame(np.asarray(X))
+    h.update(pd.util.hash_pandas_object(X_df, index=False).values.tobytes())
+    h.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).values.tobytes())
+    h.update(",".join(map(str, X_df.columns)).encode())
+    return h.hexdigest()[:16]
+
+
+def _frame(X_arr: np.ndarray, columns: List[str] | None):
+    return X_arr if columns is None else pd.DataFrame(X_arr, columns=columns)
+
+
+class CachedSplits:
+    """Read-only view over one cache entry; arrays are opened memory-mapped."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        self.n_splits = int(self.manifest["n_splits"])
+        self.preprocess = self.manifest["preprocess"]
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._load("y")
+
+    def indices(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(train_idx, test_idx) per split; usable directly as sklearn ``cv=``."""
+        return [
+            (self._load(f"fold{i}_train_idx"), self._load(f"fold{i}_test_idx"))
+            for i in range(self.n_splits)
+        ]
+
+    def fold(self, i: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(X_train, X_test, y_train, y_test) for split ``i``."""
+        if not 0 <= i < self.n_splits:
+            raise IndexError(f"Fold {i} out of range for {self.n_splits} splits")
+        train_idx = self._load(f"fold{i}_train_idx")
+        test_idx = self._load(f"fold{i}_test_idx")
+        y = self.y
+        if self.preprocess:
+            X_train = self._load(f"fold{i}_X_train")
+            X_test = self._load(f"fold{i}_X_test")
+        elif self.manifest.get("has_matrix"):
+            X = self._load("X")
+            X_train, X_test = X[train_idx], X[test_idx]
+        else:
+            raise ValueError("This cache entry stores split indices only")
+        return X_train, X_test, y[train_idx], y[test_idx]
+
+    def transformer(self, i: int):
+        """Preprocessor fitted on the training part of split ``i``."""
+        if not self.preprocess:
+            return None
+        return joblib.load(os.path.join(self.path, f"fold{i}_transformer.joblib"))
+
+
+class FoldCache:
+    """Builds and reuses preprocessed CV splits keyed by dataset hash and split seed."""
+
+    def __init__(self, cache_dir: str | None = None) -> None:
+        cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        if not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(get_project_root(), cache_dir)
+        self.cache_dir = cache_dir
+        self._opened: Dict[str, CachedSplits] = {}
+
+    def kfold(
+        self, X, y, n_splits: int = 5, seed: int = 42, preprocess: str | None = None, indices_only: bool = False
+    ) -> CachedSplits:
+        """StratifiedKFold(n_splits, shuffle=True, random_state=seed) splits of (X, y)."""
+        spec = {"kind": "kfold", "n_splits": n_splits, "seed": seed}
+        return self._get_or_build(X, y, spec, preprocess, indices_only)
+
+    def holdout(
+        self,
+        X,
+        y,
+        test_size: float = 0.2,
+        seed: int = 42,
+        preprocess: str | None = None,
+        stratify: bool = True,
+        indices_only: bool = False,
+    ) -> CachedSplits:
+        """Single (optionally stratified) train/test split, stored as a one-fold entry."""
+        spec = {"kind": "holdout", "n_splits": 1, "test_size": test_size, "seed": seed, "stratify": stratify}
+        return self._get_or_build(X, y, spec, preprocess, indices_only)
+
+    def _key(self, data_hash: str, spec: Dict, preprocess: str | None, indices_only: bool) -> str:
+        parts = [f"v{CACHE_VERSION}", data_hash, spec["kind"], str(spec["n_splits"]), str(spec["seed"])]
+        if spec["kind"] == "holdout":
+            parts.append(f"{spec['test_size']}{'s' if spec['stratify'] else ''}")
+        parts.append("idx" if indices_only else (preprocess or "raw"))
+        return "_".join(parts)
+
+    def _get_or_build(
+        self, X, y, spec: Dict, preprocess: str | None, indices_only: bool = False
+    ) -> CachedSplits:
+        if preprocess and preprocess not in PREPROCESSORS:
+            raise ValueError(f"Unknown preprocess '{preprocess}'. Available: {list(PREPROCESSORS)}")
+        if indices_only:
+            preprocess = None
+
+        key = self._key(dataset_hash(X, y), spec, preprocess, indices_only)
+        if key in self._opened:
+            return self._opened[key]
+
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            self._build(path, X, y, spec, preprocess, indices_only)
+
+        splits = CachedSplits(path)
+        self._opened[key] = splits
+        return splits
+
+    def _build(self, path: str, X, y, spec: Dict, preprocess: str | None, indices_only: bool) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        y_arr = np.asarray(y)
+        numeric = not indices_only and (
+            not isinstance(X, pd.DataFrame) or all(pd.api.types.is_numeric_dtype(t) for t in X.dtypes)
+        )
+        if preprocess and not numeric:
+            raise ValueError("Preprocessed fold caching requires numeric features")
+        X_arr = np.asarray(X, dtype=float) if numeric else None
+        # Persisted transformers keep feature_names_in_ when X has column names
+        columns = list(X.columns) if isinstance(X, pd.DataFrame) else None
+
+        if spec["kind"] == "kfold":
+            splitter = StratifiedKFold(n_splits=spec["n_splits"], shuffle=True, random_state=spec["seed"])
+            splits = list(splitter.split(np.zeros(len(y_arr)), y_arr))
+        else:
+            train_idx, test_idx = train_test_split(
+                np.arange(len(y_arr)),
+                test_size=spec["test_size"],
+                random_state=spec["seed"],
+                stratify=y_arr if spec["stratify"] else None,
+            )
+            splits = [(train_idx, test_idx)]
+
+        # Build in a private temp dir and rename into place, so concurrent
+        # builders never expose a half-written entry.
+        tmp = tempfile.mkdtemp(prefix=".building-", dir=self.cache_dir)
+        try:
+            np.save(os.path.join(tmp, "y.npy"), y_arr)
+            if X_arr is not None and not preprocess:
+                np.save(os.path.join(tmp, "X.npy"), X_arr)
+
+            for i, (train_idx, test_idx) in enumerate(splits):
+                np.save(os.path.join(tmp, f"fold{i}_train_idx.npy"), np.asarray(train_idx, dtype=np.int64))
+                np.save(os.path.join(tmp, f"fold{i}_test_idx.npy"), np.asarray(test_idx, dtype=np.int64))
+                if preprocess:
+                    transformer = PREPROCESSORS[preprocess]()
+                    np.save(os.path.join(tmp, f"fold{i}_X_train.npy"),
+                            transformer.fit_transform(_frame(X_arr[train_idx], columns)))
+                    np.save(os.path.join(tmp, f"fold{i}_X_test.npy"),
+                            transformer.transform(_frame(X_arr[test_idx], columns)))
+                    joblib.dump(transformer, os.path.join(tmp, f"fold{i}_transformer.joblib"))
+
+            manifest = dict(spec)
+            manifest.update({
+                "version": CACHE_VERSION,
+                "preprocess": preprocess,
+                "n_rows": int(len(y_arr)),
+                "n_features": int(X_arr.shape[1]) if X_arr is not None else int(X.shape[1]),
+                "has_matrix": X_arr is not None and not preprocess,
+            })
+            with open(os.path.join(tmp, "manifest.json"), "w") as f:
+                json.dump(manifest, f, indent=2)
+
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                # Another process finished the same entry first; keep theirs.
+                shutil.rmtree(tmp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
@@ -0,0 +1,278 @@
+"""
+Synthetic patient data generator for scale and load benchmarks.
+
+Fits a Gaussian copula to each bundled dataset in ``data/raw``: every column keeps
+its empirical marginal distribution (quantile grid for numeric columns, category
+frequencies for text columns) and the columns are tied together through the
+correlation matrix of their normal scores, target label included. Rows are then
+sampled in independent, reproducible chunks so 10^6-10^8 row datasets can be
+streamed to disk without ever being held in memory.
+
+The emitted frames have exactly the raw CSV schema (column names, order, dtypes
+and missingness), so they can be fed to ``DataLoader``, ``ModelTrainer`` and the
+API's ``EXPECTED_FEATURES`` subsets unchanged.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from src.utils.config import get_project_root
+
+
+DISEASE_FILES = {
+    "diabetes": "diabetes.csv",
+    "heart": "heart.csv",
+    "kidney": "kidney.csv",
+}
+
+# Columns that are row identifiers rather than patient attributes
+ID_COLUMNS = {"id"}
+
+# Resolution of the stored quantile grid for numeric marginals
+N_QUANTILES = 512
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+@dataclass
+class ColumnSpec:
+    """Fitted marginal distribution of a single column."""
+
+    name: str
+    kind: str  # "numeric", "categorical" or "id"
+    dtype: str
+    missing_rate: float = 0.0
+    quantiles: Optional[np.ndarray] = None
+    probs: Optional[np.ndarray] = None
+    integral: bool = False
+    as_text: bool = False
+    decimals: int = 0
+    categories: List[str] = field(default_factory=list)
+    cum_probs: Optional[np.ndarray] = None
+
+
+def _as_numeric(series: pd.Series) -> Optional[pd.Series]:
+    """Coerce a text column to numbers if (almost) all present values parse."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    present = series.dropna()
+    if present.empty:
+        return None
+    parsed = pd.to_numeric(present.astype(str).str.strip(), errors="coerce")
+    if parsed.notna().mean() < 0.95:
+        return None
+    return pd.to_numeric(series.astype(str).str.strip(), errors="coerce").astype(float)
+
+
+def _decimals(values: np.ndarray) -> int:
+    """Number of decimals needed to reproduce the observed values (capped at 4)."""
+    for d in range(5):
+        if np.allclose(values, np.round(values, d)):
+            return d
+    return 4
+
+
+def _normal_scores(values: np.ndarray) -> np.ndarray:
+    """Map observed values to standard normal scores via average ranks; NaN -> 0."""
+    z = np.zeros(len(values))
+    mask = ~np.isnan(values)
+    n = int(mask.sum())
+    if n == 0:
+        return z
+    ranks = pd.Series(values[mask]).rank(method="average").to_numpy()
+    z[mask] = ndtri(ranks / (n + 1))
+    return z
+
+
+def _nearest_correlation(corr: np.ndarray) -> np.ndarray:
+    """Clip negative eigenvalues so the correlation matrix is positive definite."""
+    corr = np.nan_to_num(corr, nan=0.0)
+    np.fill_diagonal(corr, 1.0)
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    eigvals = np.clip(eigvals, 1e-6, None)
+    fixed = eigvecs @ np.diag(eigvals) @ eigvecs.T
+    d = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(d, d)
+
+
+class SyntheticDataGenerator:
+    """Gaussian-copula generator reproducing a dataset's marginals and correlations."""
+
+    def __init__(self, columns: List[ColumnSpec], correlation: np.ndarray, seed: int = 42) -> None:
+        self.columns = columns
+        self.correlation = correlation
+        self.seed = seed
+        self._latent = [c for c in columns if c.kind != "id"]
+        self._cholesky = np.linalg.cholesky(correlation) if len(self._latent) else np.zeros((0, 0))
+
+    @property
+    def column_names(self) -> List[str]:
+        return [c.name for c in self.columns]
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, seed: int = 42) -> "SyntheticDataGenerator":
+        """Fit marginals and the latent correlation matrix from a raw dataframe."""
+        specs: List[ColumnSpec] = []
+        scores: List[np.ndarray] = []
+        probs = np.linspace(0.0, 1.0, N_QUANTILES)
+
+        for name in df.columns:
+            series = df[name]
+            dtype = str(series.dtype)
+            missing_rate = float(series.isna().mean())
+
+            if name in ID_COLUMNS:
+                specs.append(ColumnSpec(name=name, kind="id", dtype=dtype))
+                continue
+
+            numeric = _as_numeric(series)
+            if numeric is not None:
+                values = numeric.to_numpy()
+                present = values[~np.isnan(values)]
+                decimals = _decimals(present)
+                specs.append(ColumnSpec(
+                    name=name,
+                    kind="numeric",
+                    dtype=dtype,
+                    # Missingness also covers unparseable text entries
+                    missing_rate=float(np.isnan(values).mean()),
+                    quantiles=np.quantile(present, probs),
+                    probs=probs,
+                    integral=decimals == 0,
+                    as_text=not pd.api.types.is_numeric_dtype(series),
+                    decimals=decimals,
+                ))
+                scores.append(_normal_scores(values))
+                continue
+
+            counts = series.dropna().astype(str).value_counts().sort_index()
+            categories = counts.index.tolist()
+            cum = np.cumsum(counts.to_numpy(dtype=float))
+            specs.append(ColumnSpec(
+                name=name,
+                kind="categorical",
+                dtype=dtype,
+                missing_rate=missing_rate,
+                categories=categories,
+                cum_probs=cum / cum[-1],
+            ))
+            codes = series.map({c: i for i, c in enumerate(categories)}).astype(float).to_numpy()
+            scores.append(_normal_scores(codes))
+
+        if scores:
+            corr = np.corrcoef(np.vstack(scores)) if len(scores) > 1 else np.ones((1, 1))
+            corr = _nearest_correlation(np.atleast_2d(corr))
+        else:
+            corr = np.zeros((0, 0))
+        return cls(specs, corr, seed=seed)
+
+    @classmethod
+    def from_csv(cls, csv_path: str, seed: int = 42) -> "SyntheticDataGenerator":
+        return cls.fit(pd.read_csv(csv_path), seed=seed)
+
+    def _rng(self, chunk_index: int) -> np.random.Generator:
+        # One independent stream per chunk: chunks are reproducible and can be
+        # generated in any order or in parallel.
+        return np.random.default_rng([self.seed, chunk_index])
+
+    def sample(self, n_rows: int, chunk_index: int = 0, start_id: int = 0) -> pd.DataFrame:
+        """Sample ``n_rows`` synthetic rows with the raw dataset schema."""
+        rng = self._rng(chunk_index)
+        z = rng.standard_normal((n_rows, len(self._latent))) @ self._cholesky.T
+        u = ndtr(z)
+
+        data: Dict[str, object] = {}
+        latent_idx = 0
+        for spec in self.columns:
+            if spec.kind == "id":
+                data[spec.name] = np.arange(start_id, start_id + n_rows, dtype=np.int64)
+                continue
+
+            col_u = u[:, latent_idx]
+            latent_idx += 1
+            missing = rng.random(n_rows) < spec.missing_rate if spec.missing_rate > 0 else None
+
+            if spec.kind == "numeric":
+                values = np.interp(col_u, spec.probs, spec.quantiles)
+                values = np.round(values, spec.decimals)
+                if spec.as_text:
+                    fmt = "{:.0f}" if spec.integral else "{:.%df}" % spec.decimals
+                    out = np.array([fmt.format(v) for v in values], dtype=object)
+                    if missing is not None:
+                        out[missing] = np.nan
+                    data[spec.name] = out
+                elif missing is not None:
+                    values[missing] = np.nan
+                    data[spec.name] = values
+                elif spec.integral and spec.dtype.startswith("int"):
+                    data[spec.name] = values.astype(spec.dtype)
+                else:
+                    data[spec.name] = values
+            else:
+                idx = np.minimum(np.searchsorted(spec.cum_probs, col_u), len(spec.categories) - 1)
+                out = np.asarray(spec.categories, dtype=object)[idx]
+                if missing is not None:
+                    out[missing] = np.nan
+                data[spec.name] = out
+
+        return pd.DataFrame(data, columns=self.column_names)
+
+    def iter_chunks(self, n_rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """Yield ``n_rows`` synthetic rows as a stream of dataframes of ``chunk_size`` rows."""
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        emitted = 0
+        chunk_index = 0
+        while emitted < n_rows:
+            size = min(chunk_size, n_rows - emitted)
+            yield self.sample(size, chunk_index=chunk_index, start_id=emitted)
+            emitted += size
+            chunk_index += 1
+
+    def write_csv(self, path: str, n_rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+        """Stream ``n_rows`` synthetic rows to a CSV file and return its path."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for i, chunk in enumerate(self.iter_chunks(n_rows, chunk_size)):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        return path
+
+
+def fit_generator(disease: str, raw_dir: str | None = None, seed: int = 42) -> SyntheticDataGenerator:
+    """Fit a generator on the bundled raw dataset for ``disease``."""
+    disease = disease.lower()
+    if disease not in DISEASE_FILES:
+        raise ValueError(f"Unknown disease '{disease}'. Available: {list(DISEASE_FILES)}")
+    raw_dir = raw_dir or os.path.join(get_project_root(), "data", "raw")
+    return SyntheticDataGenerator.from_csv(os.path.join(raw_dir, DISEASE_FILES[disease]), seed=seed)
+
+
+def iter_synthetic_chunks(
+    disease: str, n_rows: int, chunk_size: int = DEFAULT_CHUNK_SIZE, seed: int = 42
+) -> Iterator[pd.DataFrame]:
+    """Convenience wrapper: fit on ``data/raw`` and stream ``n_rows`` rows."""
+    return fit_generator(disease, seed=seed).iter_chunks(n_rows, chunk_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic patient datasets")
+    parser.add_argument("--disease", choices=sorted(DISEASE_FILES), required=True)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="Output CSV (default: data/synthetic/<disease>.csv)")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join("data", "synthetic", DISEASE_FILES[args.disease])
+    print(f"🧬 Generating {args.rows:,} synthetic {args.disease} rows -> {out}")
+    fit_generator(args.disease, seed=args.seed).write_csv(out, args.rows, args.chunk_size)
+    print("✅ Done")
@@ -3,11 +3,22 @@ Compare different ML algorithms for each disease
 and select the best performing model
 """
 
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+from queue import Empty, SimpleQueue
+
 import pandas as pd
 import numpy as np
-import json
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
@@ -16,46 +27,63 @@ from sklearn.naive_bayes import GaussianNB
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 from xgboost import XGBClassifier
 from lightgbm import LGBMClassifier
-import warnings
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data_processing.fold_cache import CachedSplits, FoldCache, dataset_hash
 
 warnings.filterwarnings('ignore')
 
-def load_and_preprocess(csv_path, target_column):
-    """Load and preprocess data"""
+DATASETS = {
+    "diabetes": ("data/raw/diabetes.csv", "Outcome"),
+    "heart": ("data/raw/heart.csv", "target"),
+    "kidney": ("data/raw/kidney.csv", "classification"),
+}
+
+DEFAULT_STORE = "models/comparison/results.jsonl"
+
+
+def load_dataset(csv_path, target_column):
+    """Load a raw CSV and return fully numeric features and target"""
     df = pd.read_csv(csv_path)
     
+    # Strip stray whitespace/tabs in text columns (e.g. 'ckd\t' in kidney data)
+    text_cols = df.select_dtypes(exclude=[np.number]).columns
+    for col in text_cols:
+        df[col] = df[col].str.strip()
+    
     # Handle missing values
     numeric_cols = df.select_dtypes(include=[np.number]).columns
     for col in numeric_cols:
         if df[col].isnull().sum() > 0:
-            df[col].fillna(df[col].median(), inplace=True)
+            df[col] = df[col].fillna(df[col].median())
     
-    cat_cols = df.select_dtypes(include=['object']).columns
-    for col in cat_cols:
+    for col in text_cols:
         if df[col].isnull().sum() > 0:
-            df[col].fillna(df[col].mode()[0], inplace=True)
+            df[col] = df[col].fillna(df[col].mode()[0])
     
     # Encode categorical
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            le = LabelEncoder()
-            df[col] = le.fit_transform(df[col].astype(str))
+    for col in text_cols:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col].astype(str))
     
     X = df.drop(columns=[target_column])
     y = df[target_column]
     
+    return X, y
+
+
+def load_and_preprocess(csv_path, target_column):
+    """Load and preprocess data"""
+    X, y = load_dataset(csv_path, target_column)
     return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
 
-def evaluate_models(X_train, X_test, y_train, y_test, disease_name):
-    """Evaluate multiple models"""
-    
-    # Scale features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    # Define models
-    models = {
+
+def build_candidates():
+    """Candidate classifiers compared for every disease"""
+    return {
         'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
         'XGBoost': XGBClassifier(n_estimators=100, random_state=42, eval_metric='logloss'),
         'LightGBM': LGBMClassifier(n_estimators=100, random_state=42, verbose=-1),
@@ -65,96 +93,344 @@ def evaluate_models(X_train, X_test, y_train, y_test, disease_name):
         'KNN': KNeighborsClassifier(n_neighbors=5),
         'Naive Bayes': GaussianNB()
     }
-    
-    results = []
-    
-    print(f"\n{'='*70}")
-    print(f"Comparing Models for {disease_name.upper()}")
-    print(f"{'='*70}\n")
-    
-    for name, model in models.items():
-        print(f"Training {name}...", end=' ')
-        
+
+# ---------------------------------------------------------------------------
+# Parallel, resumable comparison harness
+#
+# Every (disease x model x fold) combination is an independent task executed in
+# a process pool. Folds are scaled once and shared with the workers through the
+# memory-mapped FoldCache. Finished tasks are appended to a JSONL results store keyed by
+# dataset hash, so an interrupted run picks up where it stopped. Candidates that
+# fail, or whose accumulated fit+predict time exceeds their budget, have their
+# remaining folds cancelled; a fold still running when its candidate's budget
+# runs out is killed with its worker process.
+# ---------------------------------------------------------------------------
+
+_WORKER_DATA = {}
+
+
+def _new_pool(n_jobs, fold_dirs):
+    # multiprocessing.Pool rather than ProcessPoolExecutor: terminate() is the
+    # only public way to stop a task that is already running.
+    return Pool(processes=n_jobs, initializer=_init_worker, initargs=(fold_dirs,))
+
+
+def _drain(completions):
+    """Return every completion already delivered to ``completions`` without blocking"""
+    items = []
+    while True:
         try:
-            # Train
-            model.fit(X_train_scaled, y_train)
-            
-            # Predict
-            y_pred = model.predict(X_test_scaled)
-            y_pred_proba = model.predict_proba(X_test_scaled)[:, 1] if hasattr(model, 'predict_proba') else None
-            
-            # Metrics
-            accuracy = accuracy_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred, average='weighted', zero_division=0)
-            recall = recall_score(y_test, y_pred, average='weighted', zero_division=0)
-            f1 = f1_score(y_test, y_pred, average='weighted', zero_division=0)
-            
+            items.append(completions.get_nowait())
+        except Empty:
+            return items
+
+
+def _task_key(disease, model_name, fold, n_splits, seed, data_hash):
+    return f"{disease}|{model_name}|{fold}/{n_splits}|{seed}|{data_hash}"
+
+
+def _init_worker(fold_dirs):
+    """Process pool initializer: record fold cache locations and pin BLAS/OpenMP to one thread"""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except Exception:
+        pass
+    _WORKER_DATA.update(fold_dirs)
+
+
+def _single_threaded(model):
+    """Limit estimator parallelism so the pool size is the only core budget"""
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+    return model
+
+
+def _run_fold_task(disease, model_name, fold, n_splits, seed):
+    """Fit and score one candidate on one CV fold (runs inside a worker process)"""
+    X_train, X_test, y_train, y_test = CachedSplits(_WORKER_DATA[disease]).fold(fold)
+
+    model = _single_threaded(clone(build_candidates()[model_name]))
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    y_pred_proba = model.predict_proba(X_test)[:, 1] if hasattr(model, 'predict_proba') else None
+    predict_time = time.perf_counter() - start
+
+    try:
+        roc_auc = roc_auc_score(y_test, y_pred_proba) if y_pred_proba is not None else 0
+    except Exception:
+        roc_auc = 0
+
+    return {
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'precision': float(precision_score(y_test, y_pred, average='weighted', zero_division=0)),
+        'recall': float(recall_score(y_test, y_pred, average='weighted', zero_division=0)),
+        'f1': float(f1_score(y_test, y_pred, average='weighted', zero_division=0)),
+        'roc_auc': float(roc_auc),
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+    }
+
+
+def _load_store(store_path):
+    """Read completed task records from the JSONL results store"""
+    records = {}
+    if store_path and os.path.exists(store_path):
+        with open(store_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Partially written line from an interrupted run
+                records[record["key"]] = record
+    return records
+
+
+def _append_store(store_path, record):
+    if not store_path:
+        return
+    with open(store_path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+
+
+def summarize_results(records):
+    """Aggregate per-fold records into one comparison row per (disease, model)"""
+    df = pd.DataFrame(records)
+    if df.empty:
+        return df
+
+    rows = []
+    for (disease, model_name), group in df.groupby(["disease", "model"], sort=False):
+        ok = group[group["status"] == "ok"]
+        if (group["status"] == "failed").any():
+            status = "failed"
+        elif (group["status"] == "over_budget").any() or len(ok) < group["n_splits"].iloc[0]:
+            status = "over_budget"
+        else:
+            status = "ok"
+        rows.append({
+            'Disease': disease,
+            'Model': model_name,
+            'Folds': len(ok),
+            'Accuracy': ok['accuracy'].mean() if len(ok) else np.nan,
+            'Accuracy Std': ok['accuracy'].std(ddof=0) if len(ok) else np.nan,
+            'Precision': ok['precision'].mean() if len(ok) else np.nan,
+            'Recall': ok['recall'].mean() if len(ok) else np.nan,
+            'F1-Score': ok['f1'].mean() if len(ok) else np.nan,
+            'ROC-AUC': ok['roc_auc'].mean() if len(ok) else np.nan,
+            'Fit Time (s)': ok['fit_time'].mean() if len(ok) else np.nan,
+            'Predict Time (s)': ok['predict_time'].mean() if len(ok) else np.nan,
+            'Status': status,
+        })
+
+    table = pd.DataFrame(rows)
+    return table.sort_values(['Disease', 'Accuracy'], ascending=[True, False]).reset_index(drop=True)
+
+
+def run_comparison(datasets=None, n_jobs=None, n_splits=5, seed=42, time_budget=None,
+                   store_path=DEFAULT_STORE, models=None, cache_dir=None):
+    """
+    Compare all candidates on all datasets with k-fold CV in a process pool.
+
+    Args:
+        datasets: {disease: (csv_path, target_column)}; defaults to the bundled datasets
+        n_jobs: worker processes (core budget); defaults to all CPUs
+        n_splits: number of StratifiedKFold folds
+        seed: shuffling seed for the folds
+        time_budget: per-candidate budget in seconds of summed fit+predict time;
+            remaining folds of a candidate over budget are cancelled, and a
+            running fold is killed once its wall-clock time exceeds what is
+            left of the budget (the pool is recycled and other in-flight
+            folds rerun)
+        store_path: JSONL results store used to resume interrupted runs (None disables)
+        models: optional subset of candidate names
+        cache_dir: FoldCache directory (default: data/processed/fold_cache)
+
+    Returns:
+        pandas.DataFrame with one row per (disease, model) including timings
+    """
+    datasets = datasets or DATASETS
+    model_names = list(models or build_candidates().keys())
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    cache = FoldCache(cache_dir)
+    fold_dirs, hashes = {}, {}
+    for disease, (csv_path, target_column) in datasets.items():
+        X, y = load_dataset(csv_path, target_column)
+        fold_dirs[disease] = cache.kfold(X, y, n_splits=n_splits, seed=seed, preprocess="standard").path
+        hashes[disease] = dataset_hash(X, y)
+
+    if store_path:
+        os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    done = _load_store(store_path)
+
+    records = []
+    spent = {}
+    stopped = set()
+    pending_tasks = []
+    # Fold-major order: every candidate's first fold finishes early, so budgets
+    # can cancel the remaining folds of slow candidates before they start.
+    for fold in range(n_splits):
+        for disease in fold_dirs:
+            for model_name in model_names:
+                key = _task_key(disease, model_name, fold, n_splits, seed, hashes[disease])
+                previous = done.get(key)
+                if previous and previous["status"] == "ok":
+                    records.append(previous)
+                    spent[(disease, model_name)] = spent.get((disease, model_name), 0.0) + \
+                        previous["fit_time"] + previous["predict_time"]
+                    continue
+                pending_tasks.append((key, disease, model_name, fold))
+
+    if records:
+        print(f"♻️  Resuming: {len(records)} fold results loaded from {store_path}")
+    print(f"🚀 Running {len(pending_tasks)} tasks on {n_jobs} worker(s)")
+
+    def _record(key, disease, model_name, fold, status, result=None, error=None):
+        record = {
+            "key": key, "disease": disease, "model": model_name, "fold": fold,
+            "n_splits": n_splits, "seed": seed, "data_hash": hashes[disease],
+            "status": status, "error": error,
+        }
+        record.update(result or {})
+        records.append(record)
+        if status == "ok":
+            _append_store(store_path, record)
+        return record
+
+    def _collect(task, result, error):
+        key, disease, model_name, fold = task
+        candidate = (disease, model_name)
+        if error is not None:
+            _record(key, disease, model_name, fold, "failed", error=str(error)[:200])
+            print(f"   ✗ {disease}/{model_name} fold {fold}: {str(error)[:50]}")
+            stopped.add(candidate)
+            return
+        _record(key, disease, model_name, fold, "ok", result)
+        spent[candidate] = spent.get(candidate, 0.0) + result["fit_time"] + result["predict_time"]
+        if time_budget is not None and spent[candidate] > time_budget and candidate not in stopped:
+            print(f"   ⏱️  {disease}/{model_name} exceeded {time_budget}s budget")
+            stopped.add(candidate)
+
+    # At most n_jobs tasks are submitted at a time, so a task starts when it is
+    # submitted and its deadline is measured in wall-clock time from there.
+    # Workers report back through pool callbacks as (key, result, error).
+    queue = deque(pending_tasks)
+    completions = SimpleQueue()
+    running = {}
+
+    def _finish(items):
+        for key, result, error in items:
+            if key in running:
+                _collect(running.pop(key)[0], result, error)
+
+    pool = _new_pool(n_jobs, fold_dirs)
+    try:
+        while queue or running:
+            while queue and len(running) < n_jobs:
+                task = queue.popleft()
+                key, disease, model_name, fold = task
+                candidate = (disease, model_name)
+                if candidate in stopped:
+                    _record(key, disease, model_name, fold, "over_budget")
+                    continue
+                deadline = None
+                if time_budget is not None:
+                    deadline = time.monotonic() + max(0.0, time_budget - spent.get(candidate, 0.0))
+                pool.apply_async(
+                    _run_fold_task, (disease, model_name, fold, n_splits, seed),
+                    callback=lambda result, key=key: completions.put((key, result, None)),
+                    error_callback=lambda error, key=key: completions.put((key, None, error)),
+                )
+                running[key] = (task, deadline)
+            if not running:
+                continue
+
+            deadlines = [d for _, d in running.values() if d is not None]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
             try:
-                roc_auc = roc_auc_score(y_test, y_pred_proba) if y_pred_proba is not None else 0
-            except:
-                roc_auc = 0
-            
-            # Cross-validation
-            cv_scores = cross_val_score(
-                model, X_train_scaled, y_train,
-                cv=StratifiedKFold(5, shuffle=True, random_state=42),
-                scoring='accuracy',
-                n_jobs=-1
-            )
-            
-            results.append({
-                'Model': name,
-                'Accuracy': accuracy,
-                'Precision': precision,
-                'Recall': recall,
-                'F1-Score': f1,
-                'ROC-AUC': roc_auc,
-                'CV Mean': cv_scores.mean(),
-                'CV Std': cv_scores.std()
-            })
-            
-            print(f"✓ Acc: {accuracy*100:.2f}%")
-            
-        except Exception as e:
-            print(f"✗ Error: {str(e)[:50]}")
-    
-    # Create results DataFrame
-    results_df = pd.DataFrame(results)
-    results_df = results_df.sort_values('Accuracy', ascending=False)
-    
-    print(f"\n{'='*70}")
-    print("Results (sorted by accuracy):")
-    print(f"{'='*70}\n")
-    print(results_df.to_string(index=False))
-    
-    # Best model
-    best_model = results_df.iloc[0]
-    print(f"\n{'='*70}")
-    print(f"🏆 Best Model: {best_model['Model']}")
-    print(f"   Accuracy: {best_model['Accuracy']*100:.2f}%")
-    print(f"   F1-Score: {best_model['F1-Score']*100:.2f}%")
-    print(f"   CV Score: {best_model['CV Mean']*100:.2f}% (+/- {best_model['CV Std']*2*100:.2f}%)")
-    print(f"{'='*70}\n")
-    
-    return results_df
+                _finish([completions.get(timeout=timeout)])
+            except Empty:
+                pass
+            _finish(_drain(completions))
+
+            now = time.monotonic()
+            expired = [k for k, (_, d) in running.items() if d is not None and d <= now]
+            if expired:
+                for key in expired:
+                    (key, disease, model_name, fold), _ = running.pop(key)
+                    print(f"   ⏱️  {disease}/{model_name} fold {fold} killed at the {time_budget}s budget")
+                    _record(key, disease, model_name, fold, "over_budget")
+                    stopped.add((disease, model_name))
+                pool.terminate()
+                # Folds that finished before the pool went down are kept
+                _finish(_drain(completions))
+                queue.extendleft(reversed([task for task, _ in running.values()]))
+                running = {}
+                pool = _new_pool(n_jobs, fold_dirs)
+    finally:
+        # Every submitted task has completed or been given up on by now
+        pool.terminate()
+        pool.join()
+
+    table = summarize_results(records)
+
+    if store_path and not table.empty:
+        table.to_csv(os.path.splitext(store_path)[0] + "_summary.csv", index=False)
+
+    return table
+
+
+def print_comparison(table):
+    """Pretty-print the comparison table per disease with the winning model"""
+    for disease, group in table.groupby("Disease", sort=False):
+        print(f"\n{'='*70}")
+        print(f"Results for {disease.upper()} (sorted by CV accuracy)")
+        print(f"{'='*70}\n")
+        print(group.drop(columns=["Disease"]).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        ok = group[group["Status"] == "ok"]
+        if not ok.empty:
+            best = ok.iloc[0]
+            print(f"\n🏆 Best Model: {best['Model']}")
+            print(f"   Accuracy: {best['Accuracy']*100:.2f}% (+/- {best['Accuracy Std']*2*100:.2f}%)")
+            print(f"   Fit: {best['Fit Time (s)']:.3f}s  Predict: {best['Predict Time (s)']:.4f}s per fold")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ML Model Comparison Tool")
+    parser.add_argument("--n-jobs", type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--folds", type=int, default=5, help="Number of CV folds")
+    parser.add_argument("--seed", type=int, default=42, help="Fold shuffling seed")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Per-candidate budget in seconds of fit+predict time; "
+                             "a fold still running when it runs out is killed")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="JSONL results store for resuming runs")
+    parser.add_argument("--fresh", action="store_true", help="Ignore and overwrite the results store")
+    parser.add_argument("--diseases", nargs="+", choices=sorted(DATASETS), default=list(DATASETS))
+    args = parser.parse_args()
+
     print("\n🔬 ML Model Comparison Tool")
     print("="*70)
-    
-    # Diabetes
-    print("\n1️⃣  DIABETES DATASET")
-    X_train, X_test, y_train, y_test = load_and_preprocess("data/raw/diabetes.csv", "Outcome")
-    diabetes_results = evaluate_models(X_train, X_test, y_train, y_test, "Diabetes")
-    
-    # Heart
-    print("\n2️⃣  HEART DISEASE DATASET")
-    X_train, X_test, y_train, y_test = load_and_preprocess("data/raw/heart.csv", "target")
-    heart_results = evaluate_models(X_train, X_test, y_train, y_test, "Heart Disease")
-    
-    # Kidney
-    print("\n3️⃣  KIDNEY DISEASE DATASET")
-    X_train, X_test, y_train, y_test = load_and_preprocess("data/raw/kidney.csv", "classification")
-    kidney_results = evaluate_models(X_train, X_test, y_train, y_test, "Kidney Disease")
-    
+
+    if args.fresh and os.path.exists(args.store):
+        os.remove(args.store)
+
+    results = run_comparison(
+        datasets={d: DATASETS[d] for d in args.diseases},
+        n_jobs=args.n_jobs,
+        n_splits=args.folds,
+        seed=args.seed,
+        time_budget=args.time_budget,
+        store_path=args.store,
+    )
+    print_comparison(results)
+
     print("\n✅ Comparison complete!")
@@ -3,7 +3,7 @@ import numpy as np
 import joblib
 import os
 import warnings
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, StratifiedKFold
+from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
 from sklearn.metrics import (accuracy_score, precision_score, recall_score, 
@@ -12,6 +12,15 @@ from sklearn.metrics import (accuracy_score, precision_score, recall_score,
 from xgboost import XGBClassifier
 from lightgbm import LGBMClassifier
 import json
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.data_processing.fold_cache import FoldCache
+from src.utils.profiling import TrainingProfiler, fit_voting_members
 
 warnings.filterwarnings('ignore')
 
@@ -141,7 +150,8 @@ def evaluate_model(model, X_test, y_test, model_name):
     
     return metrics
 
-def train_and_save_model(csv_path, target_column, model_name, use_ensemble=True, remove_outliers_flag=False):
+def train_and_save_model(csv_path, target_column, model_name, use_ensemble=True, remove_outliers_flag=False,
+                         profile=False):
     """
     Enhanced model training with multiple improvements:
     - Data cleaning and preprocessing
@@ -150,16 +160,24 @@ def train_and_save_model(csv_path, target_column, model_name, use_ensemble=True,
     - Ensemble modeling (RF, XGBoost, LightGBM, GradientBoosting)
     - Cross-validation
     - Comprehensive evaluation metrics
+    
+    With profile=True, wall/CPU time and peak RSS are recorded for every stage and
+    every ensemble member, and written to {model_name}_profile.json (plus a cProfile
+    dump of the slowest stage) next to the metadata file.
     """
     print(f"\n{'='*60}")
     print(f"🔹 Training {model_name.upper()} Model")
     print(f"{'='*60}")
     
+    profiler = TrainingProfiler(model_name, enabled=profile)
+    
     # Load data
-    df = pd.read_csv(csv_path)
+    with profiler.stage("load"):
+        df = pd.read_csv(csv_path)
     
     # Clean data
-    df, label_encoders = clean_data(df, target_column, model_name)
+    with profiler.stage("clean"):
+        df, label_encoders = clean_data(df, target_column, model_name)
     
     # Prepare features and target
     X = df.drop(columns=[target_column])
@@ -168,22 +186,34 @@ def train_and_save_model(csv_path, target_column, model_name, use_ensemble=True,
     print(f"   📈 Class distribution:")
     print(f"      {y.value_counts().to_dict()}")
     
-    # Split data with stratification
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    print(f"   ✓ Train: {len(X_train)}, Test: {len(X_test)}")
-    
-    # Remove outliers (optional)
-    if remove_outliers_flag:
-        print(f"   🔍 Removing outliers...")
-        X_train, y_train = remove_outliers(X_train.values, y_train.values)
-        print(f"   ✓ After outlier removal: {len(X_train)} samples")
-    
-    # Feature scaling
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    fold_cache = FoldCache()
+    
+    with profiler.stage("split"):
+        if remove_outliers_flag:
+            # Split data with stratification
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
+            print(f"   ✓ Train: {len(X_train)}, Test: {len(X_test)}")
+            
+            # Remove outliers (optional)
+            print(f"   🔍 Removing outliers...")
+            X_train, y_train = remove_outliers(X_train.values, y_train.values)
+            print(f"   ✓ After outlier removal: {len(X_train)} samples")
+            
+            # Feature scaling
+            scaler = StandardScaler()
+            X_train_scaled = scaler.fit_transform(X_train)
+            X_test_scaled = scaler.transform(X_test)
+        else:
+            # Stratified split + scaling, reused from the fold cache when available
+            holdout = fold_cache.holdout(X, y, test_size=0.2, seed=42, preprocess="standard")
+            train_matrix, test_matrix, y_train, y_test = holdout.fold(0)
+            # Keep column names so the scaler and model see the same features as X
+            X_train_scaled = pd.DataFrame(train_matrix, columns=X.columns)
+            X_test_scaled = pd.DataFrame(test_matrix, columns=X.columns)
+            scaler = holdout.transformer(0)
+            print(f"   ✓ Train: {len(X_train_scaled)}, Test: {len(X_test_scaled)}")
     
     # Train model
     print(f"   🤖 Training {'ensemble' if use_ensemble else 'single'} model...")
@@ -198,30 +228,42 @@ def train_and_save_model(csv_path, target_column, model_name, use_ensemble=True,
             n_jobs=-1
         )
     
-    model.fit(X_train_scaled, y_train)
+    with profiler.stage("fit"):
+        if profile and isinstance(model, VotingClassifier):
+            # Fit members one by one so each gets its own timing
+            fit_voting_members(model, X_train_scaled, y_train, profiler)
+        else:
+            model.fit(X_train_scaled, y_train)
     print(f"   ✅ Training complete!")
     
     # Cross-validation
     print(f"\n   🔄 Cross-validation (5-fold)...")
-    cv_scores = cross_val_score(
-        model, X_train_scaled, y_train, 
-        cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=42),
-        scoring='accuracy',
-        n_jobs=-1
-    )
+    with profiler.stage("cv"):
+        cv_splits = fold_cache.kfold(X_train_scaled, y_train, n_splits=5, seed=42, indices_only=True)
+        cv_scores = cross_val_score(
+            model, X_train_scaled, y_train, 
+            cv=cv_splits.indices(),
+            scoring='accuracy',
+            n_jobs=-1
+        )
     print(f"      CV Accuracy: {cv_scores.mean()*100:.2f}% (+/- {cv_scores.std()*2*100:.2f}%)")
     
     # Evaluate on test set
-    metrics = evaluate_model(model, X_test_scaled, y_test, model_name)
+    with profiler.stage("evaluate"):
+        metrics = evaluate_model(model, X_test_scaled, y_test, model_name)
     
     # Save models and metadata
     os.makedirs("models/saved_models", exist_ok=True)
     model_path = f"models/saved_models/{model_name}_model.joblib"
     scaler_path = f"models/saved_models/{model_name}_scaler.joblib"
     metadata_path = f"models/saved_models/{model_name}_metadata.json"
+    encoders_path = f"models/saved_models/{model_name}_encoders.joblib"
     
-    joblib.dump(model, model_path)
-    joblib.dump(scaler, scaler_path)
+    with profiler.stage("dump"):
+        joblib.dump(model, model_path)
+        joblib.dump(scaler, scaler_path)
+        # Needed to encode new batches consistently for incremental updates
+        joblib.dump(label_encoders, encoders_path)
     
     # Save metadata
     metadata = {
@@ -229,8 +271,8 @@ def train_and_save_model(csv_path, target_column, model_name, use_ensemble=True,
         'model_type': 'Ensemble (RF+XGB+LGBM+GB)' if use_ensemble else 'RandomForest',
         'features': list(X.columns),
         'n_features': len(X.columns),
-        'n_samples_train': len(X_train),
-        'n_samples_test': len(X_test),
+        'n_samples_train': len(X_train_scaled),
+        'n_samples_test': len(X_test_scaled),
         'metrics': metrics,
         'cv_scores': {
             'mean': float(cv_scores.mean()),
@@ -241,14 +283,32 @@ def train_and_save_model(csv_path, target_column, model_name, use_ensemble=True,
     with open(metadata_path, 'w') as f:
         json.dump(metadata, f, indent=2)
     
+    if profile:
+        profile_paths = profiler.write(os.path.dirname(metadata_path))
+        report = profiler.report()
+        print(f"\n   ⏱️  Profile (slowest stage: {report['slowest_stage']}):")
+        for stage in report['stages']:
+            indent = "      " + "  " * stage['depth']
+            print(f"{indent}{stage['name']:<20} wall {stage['wall_s']:7.2f}s  cpu {stage['cpu_s']:7.2f}s  "
+                  f"peak {stage['peak_rss_mb']:8.1f} MB")
+        print(f"      Report:   {os.path.basename(profile_paths['json'])}")
+    
     print(f"\n   💾 Saved:")
     print(f"      Model:    {os.path.basename(model_path)}")
     print(f"      Scaler:   {os.path.basename(scaler_path)}")
     print(f"      Metadata: {os.path.basename(metadata_path)}")
+    print(f"      Encoders: {os.path.basename(encoders_path)}")
     
     return model, scaler, metrics
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train disease risk models")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-stage timings/memory to <model>_profile.json")
+    args = parser.parse_args()
+    
     print("\n🏥 Smart Patient Health Assistant - Model Training")
     print("=" * 60)
     print("Training improved ML models with:")
@@ -265,7 +325,8 @@ if __name__ == "__main__":
             "Outcome", 
             "diabetes",
             use_ensemble=True,
-            remove_outliers_flag=False
+            remove_outliers_flag=False,
+            profile=args.profile
         )
     except Exception as e:
         print(f"❌ Error training diabetes model: {e}")
@@ -276,7 +337,8 @@ if __name__ == "__main__":
             "target", 
             "heart",
             use_ensemble=True,
-            remove_outliers_flag=False
+            remove_outliers_flag=False,
+            profile=args.profile
         )
     except Exception as e:
         print(f"❌ Error training heart model: {e}")
@@ -287,7 +349,8 @@ if __name__ == "__main__":
             "classification", 
             "kidney",
             use_ensemble=True,
-            remove_outliers_flag=False
+            remove_outliers_flag=False,
+            profile=args.profile
         )
     except Exception as e:
         print(f"❌ Error training kidney model: {e}")
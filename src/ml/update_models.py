@@ -0,0 +1,256 @@
+"""
+Incremental model updates from newly labelled patient records.
+
+Instead of a full retrain via ``train_and_save_model``, the ensemble members that
+support it are continued on the new batch only:
+
+- XGBoost: additional boosting rounds via ``fit(..., xgb_model=<booster>)``
+- LightGBM: additional boosting rounds via ``fit(..., init_model=<booster>)``
+- sklearn GradientBoosting: additional stages via ``warm_start=True``
+- RandomForest: additional trees via ``warm_start=True``
+
+Other members (e.g. logistic regression) are kept unchanged. Update cost is
+therefore proportional to the size of the new batch, not the full history.
+Every update is written as a new versioned artifact under
+``models/saved_models/versions`` with before/after metrics; ``--promote``
+also replaces the serving model.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.model_selection import train_test_split
+
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.ml.train_models import evaluate_model
+
+SAVE_DIR = "models/saved_models"
+VERSIONS_DIR = os.path.join(SAVE_DIR, "versions")
+
+
+def _continue_member(member, X_new, y_new, extra_rounds, extra_trees):
+    """Return (updated member, description) continuing ``member`` on the new batch"""
+    kind = type(member).__name__
+
+    if kind == "XGBClassifier":
+        updated = clone(member).set_params(n_estimators=extra_rounds)
+        updated.fit(X_new, y_new, xgb_model=member.get_booster(), verbose=False)
+        return updated, f"+{extra_rounds} boosting rounds"
+
+    if kind == "LGBMClassifier":
+        updated = clone(member).set_params(n_estimators=extra_rounds)
+        updated.fit(X_new, y_new, init_model=member.booster_)
+        return updated, f"+{extra_rounds} boosting rounds"
+
+    if isinstance(member, GradientBoostingClassifier):
+        member.set_params(warm_start=True, n_estimators=member.n_estimators_ + extra_rounds)
+        member.fit(X_new, y_new)
+        return member, f"+{extra_rounds} stages (warm start)"
+
+    if isinstance(member, RandomForestClassifier):
+        member.set_params(warm_start=True, n_estimators=len(member.estimators_) + extra_trees)
+        member.fit(X_new, y_new)
+        return member, f"+{extra_trees} trees (warm start)"
+
+    return member, "unchanged (no incremental fit)"
+
+
+def update_ensemble(model, X_new, y_new, extra_rounds=50, extra_trees=50):
+    """
+    Continue a fitted model on a new labelled batch.
+
+    Args:
+        model: fitted VotingClassifier (or a single supported member)
+        X_new: preprocessed features of the new batch
+        y_new: labels of the new batch
+        extra_rounds: boosting rounds/stages to add to XGB, LightGBM and GB members
+        extra_trees: trees to add to RandomForest members
+
+    Returns:
+        (updated model, {member name: description})
+    """
+    if not isinstance(model, VotingClassifier):
+        updated, note = _continue_member(model, X_new, y_new, extra_rounds, extra_trees)
+        return updated, {"model": note}
+
+    y_encoded = model.le_.transform(y_new)
+    changes = {}
+    fitted = []
+    names = [name for name, est in model.estimators if est != "drop"]
+    for name, member in zip(names, model.estimators_):
+        updated, note = _continue_member(member, X_new, y_encoded, extra_rounds, extra_trees)
+        fitted.append(updated)
+        model.named_estimators_[name] = updated
+        changes[name] = note
+    model.estimators_ = fitted
+    return model, changes
+
+
+def prepare_batch(df, target_column, feature_columns, label_encoders=None):
+    """Clean a new batch the same way as training and align it to the model's features"""
+    df = df.copy()
+
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].str.strip()
+
+    missing_cols = [c for c in feature_columns if c not in df.columns]
+    if missing_cols:
+        raise ValueError(f"New batch is missing feature columns: {missing_cols}")
+
+    for col in df.columns:
+        if df[col].isnull().sum() > 0:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].fillna(df[col].median())
+            else:
+                df[col] = df[col].fillna(df[col].mode()[0])
+
+    # Reuse the training label encoders so categories keep the same codes;
+    # unseen categories map to the first known class.
+    label_encoders = label_encoders or {}
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        le = label_encoders.get(col)
+        if le is None:
+            raise ValueError(f"No label encoder saved for column '{col}'; retrain with train_models.py")
+        mapping = {label: code for code, label in enumerate(le.classes_)}
+        df[col] = df[col].astype(str).map(mapping).fillna(0).astype(int)
+
+    return df[feature_columns], df[target_column]
+
+
+def _next_version(model_name):
+    versions = [0]
+    for path in glob.glob(os.path.join(VERSIONS_DIR, f"{model_name}_model_v*.joblib")):
+        match = re.search(r"_v(\d+)\.joblib$", path)
+        if match:
+            versions.append(int(match.group(1)))
+    return max(versions) + 1
+
+
+def _latest_artifact(model_name):
+    """(model path, metadata path, version) of the newest versioned model, or the serving model"""
+    version = _next_version(model_name) - 1
+    if version > 0:
+        return (os.path.join(VERSIONS_DIR, f"{model_name}_model_v{version}.joblib"),
+                os.path.join(VERSIONS_DIR, f"{model_name}_metadata_v{version}.json"), version)
+    return (os.path.join(SAVE_DIR, f"{model_name}_model.joblib"),
+            os.path.join(SAVE_DIR, f"{model_name}_metadata.json"), 0)
+
+
+def update_and_save_model(csv_path, target_column, model_name, extra_rounds=50, extra_trees=50,
+                          eval_size=0.2, promote=False):
+    """
+    Incrementally update a trained model with a batch of newly labelled records.
+
+    The batch is split into an update part and an evaluation part; the model is
+    scored on the evaluation part before and after the update. A new versioned
+    artifact plus metadata is written to models/saved_models/versions.
+    """
+    print(f"\n{'='*60}")
+    print(f"🔁 Updating {model_name.upper()} Model")
+    print(f"{'='*60}")
+
+    # Chain on the newest version so unpromoted updates are not lost
+    base_path, base_metadata_path, base_version = _latest_artifact(model_name)
+    with open(base_metadata_path, "r") as f:
+        base_metadata = json.load(f)
+    model = joblib.load(base_path)
+    scaler = joblib.load(os.path.join(SAVE_DIR, f"{model_name}_scaler.joblib"))
+    encoders_path = os.path.join(SAVE_DIR, f"{model_name}_encoders.joblib")
+    label_encoders = joblib.load(encoders_path) if os.path.exists(encoders_path) else {}
+    print(f"   📦 Base: {os.path.basename(base_path)} (v{base_version})")
+
+    df = pd.read_csv(csv_path)
+    X, y = prepare_batch(df, target_column, base_metadata["features"], label_encoders)
+    X_update, X_eval, y_update, y_eval = train_test_split(
+        X, y, test_size=eval_size, random_state=42, stratify=y
+    )
+    # Keep the training scaler: the existing trees were fitted on its scale
+    X_update_scaled = scaler.transform(X_update)
+    X_eval_scaled = scaler.transform(X_eval)
+    print(f"   ✓ New batch: {len(X)} rows (update: {len(X_update)}, eval: {len(X_eval)})")
+
+    print("\n   📏 Before update:")
+    metrics_before = evaluate_model(model, X_eval_scaled, y_eval, model_name)
+
+    start = time.perf_counter()
+    model, changes = update_ensemble(model, X_update_scaled, y_update, extra_rounds, extra_trees)
+    update_seconds = time.perf_counter() - start
+    for name, note in changes.items():
+        print(f"      {name}: {note}")
+    print(f"   ✅ Update complete in {update_seconds:.2f}s")
+
+    print("\n   📏 After update:")
+    metrics_after = evaluate_model(model, X_eval_scaled, y_eval, model_name)
+
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    version = _next_version(model_name)
+    model_path = os.path.join(VERSIONS_DIR, f"{model_name}_model_v{version}.joblib")
+    metadata_path = os.path.join(VERSIONS_DIR, f"{model_name}_metadata_v{version}.json")
+
+    joblib.dump(model, model_path)
+
+    metadata = dict(base_metadata)
+    metadata.update({
+        'version': version,
+        'parent_version': base_version,
+        'updated_at': datetime.now().isoformat(timespec="seconds"),
+        'update_source': os.path.basename(csv_path),
+        'n_samples_update': len(X_update),
+        'n_samples_eval': len(X_eval),
+        'update_seconds': update_seconds,
+        'member_updates': changes,
+        'metrics_before': {k: float(v) for k, v in metrics_before.items()},
+        'metrics': {k: float(v) for k, v in metrics_after.items()},
+    })
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    print("\n   💾 Saved:")
+    print(f"      Model:    {os.path.relpath(model_path, SAVE_DIR)}")
+    print(f"      Metadata: {os.path.relpath(metadata_path, SAVE_DIR)}")
+
+    if promote:
+        joblib.dump(model, os.path.join(SAVE_DIR, f"{model_name}_model.joblib"))
+        with open(os.path.join(SAVE_DIR, f"{model_name}_metadata.json"), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        print(f"   🚀 Promoted v{version} to {model_name}_model.joblib")
+
+    return model, metadata
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally update a trained model with new labelled data")
+    parser.add_argument("model_name", choices=["diabetes", "heart", "kidney"])
+    parser.add_argument("csv_path", help="CSV with newly labelled records (same columns as the training data)")
+    parser.add_argument("--target", default=None, help="Target column (default: per-disease training target)")
+    parser.add_argument("--extra-rounds", type=int, default=50, help="Boosting rounds/stages to add")
+    parser.add_argument("--extra-trees", type=int, default=50, help="RandomForest trees to add")
+    parser.add_argument("--promote", action="store_true", help="Replace the serving model with the update")
+    args = parser.parse_args()
+
+    default_targets = {"diabetes": "Outcome", "heart": "target", "kidney": "classification"}
+    update_and_save_model(
+        args.csv_path,
+        args.target or default_targets[args.model_name],
+        args.model_name,
+        extra_rounds=args.extra_rounds,
+        extra_trees=args.extra_trees,
+        promote=args.promote,
+    )
@@ -1,11 +1,30 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 import shap
+from sklearn.cluster import KMeans
+
+
+# Ensemble members that TreeExplainer can explain exactly
+TREE_MEMBER_TYPES = {
+    "DecisionTreeClassifier",
+    "RandomForestClassifier",
+    "ExtraTreesClassifier",
+    "GradientBoostingClassifier",
+    "XGBClassifier",
+    "LGBMClassifier",
+}
+
+DEFAULT_BACKGROUND_SIZE = 50
+DEFAULT_MAX_EXPLAINERS = 6
 
 
 def _get_feature_names(bundle: Dict[str, Any]) -> List[str]:
@@ -17,30 +36,373 @@ def _get_feature_names(bundle: Dict[str, Any]) -> List[str]:
         return [f"f{i}" for i in range(pipeline.named_steps["preprocess"].transform(pd.DataFrame([{}])).shape[1])]
 
 
-def shap_explain_instance(bundle: Dict[str, Any], X: pd.DataFrame, top_k: int = 10) -> Dict[str, Any]:
-    pipeline = bundle["pipeline"]
+def _is_tree_member(estimator: Any) -> bool:
+    return type(estimator).__name__ in TREE_MEMBER_TYPES
+
+
+def _is_tree_ensemble(clf: Any) -> bool:
+    """True for a fitted soft VotingClassifier with at least one tree member."""
+    if type(clf).__name__ != "VotingClassifier" or getattr(clf, "voting", None) != "soft":
+        return False
+    return any(_is_tree_member(est) for est in getattr(clf, "estimators_", []))
+
+
+def _supports_tree_path(pipeline: Any) -> bool:
+    """True for preprocess -> soft VotingClassifier pipelines with at least one tree member."""
+    steps = getattr(pipeline, "named_steps", {})
+    return "preprocess" in steps and _is_tree_ensemble(steps.get("clf"))
+
+
+def _transformed_feature_owners(preprocess: Any, raw_columns: List[str]) -> np.ndarray:
+    """Index of the raw input column behind each column of the preprocessed matrix."""
+    owners: List[str] = []
+    for name, transformer, cols in preprocess.transformers_:
+        width = preprocess.output_indices_[name].stop - preprocess.output_indices_[name].start
+        if width == 0 or transformer == "drop":
+            continue
+        cols = [raw_columns[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+        last = transformer.steps[-1][1] if hasattr(transformer, "steps") else transformer
+        if hasattr(last, "categories_"):
+            # One-hot block: one output column per category of each input
+            for col, categories in zip(cols, last.categories_):
+                owners.extend([col] * len(categories))
+        else:
+            owners.extend(cols)
+    if len(owners) != sum(s.stop - s.start for s in preprocess.output_indices_.values()):
+        raise ValueError("Could not map preprocessed features back to input columns")
+    return np.array([raw_columns.index(c) for c in owners])
+
+
+def _member_explainer(estimator: Any, background_t: np.ndarray) -> Any:
+    """Explainer of one ensemble member's positive-class probability in preprocessed space."""
+    if _is_tree_member(estimator):
+        # Exact interventional TreeSHAP against the same background as the
+        # model-agnostic explainer, so both explain P(class=1).
+        return shap.TreeExplainer(
+            estimator,
+            data=background_t,
+            feature_perturbation="interventional",
+            model_output="probability",
+        )
+    # Linear/other members: sampling explainer over the member's probability
+    return shap.Explainer(lambda d: estimator.predict_proba(d)[:, 1], background_t)
+
+
+def _member_values(explainer: Any, X_t: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Run a member explainer from ``_member_explainer`` on preprocessed rows."""
+    if isinstance(explainer, shap.TreeExplainer):
+        values = np.asarray(explainer.shap_values(X_t, check_additivity=False))
+        expected = np.ravel(explainer.expected_value)
+        if values.ndim == 3:  # (n, features, classes)
+            return values[..., 1], float(expected[1])
+        return values, float(expected[-1])
+
+    explanation = explainer(X_t)
+    return np.asarray(explanation.values), float(np.ravel(explanation.base_values)[0])
+
 
+def _member_shap(estimator: Any, X_t: np.ndarray, background_t: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Positive-class probability SHAP values of one ensemble member in preprocessed space."""
+    return _member_values(_member_explainer(estimator, background_t), X_t)
+
+
+def _voting_weights(clf: Any) -> np.ndarray:
+    weights = np.ones(len(clf.estimators_)) if clf.weights is None else np.asarray(
+        [w for (_, est), w in zip(clf.estimators, clf.weights) if est != "drop"], dtype=float
+    )
+    return weights / weights.sum()
+
+
+def _tree_ensemble_shap(pipeline: Any, X: pd.DataFrame, background: pd.DataFrame) -> Tuple[np.ndarray, float]:
+    """
+    SHAP values of the soft-voting ensemble for the rows of ``X``, in raw feature space.
+
+    Soft voting averages member probabilities with the voting weights, so the
+    ensemble's SHAP values are the same weighted average of member SHAP values.
+    One-hot columns are summed back onto their input feature.
+    """
+    preprocess = pipeline.named_steps["preprocess"]
+    clf = pipeline.named_steps["clf"]
+    X_t = np.asarray(preprocess.transform(X), dtype=float)
+    background_t = np.asarray(preprocess.transform(background), dtype=float)
+
+    values_t = np.zeros_like(X_t)
+    expected = 0.0
+    for weight, member in zip(_voting_weights(clf), clf.estimators_):
+        member_values, member_expected = _member_shap(member, X_t, background_t)
+        values_t += weight * member_values
+        expected += weight * member_expected
+
+    raw_columns = X.columns.tolist()
+    owners = _transformed_feature_owners(preprocess, raw_columns)
+    values = np.zeros((X_t.shape[0], len(raw_columns)))
+    np.add.at(values, (slice(None), owners), values_t)
+    return values, expected
+
+
+def _model_agnostic_shap(pipeline: Any, X: pd.DataFrame, background: pd.DataFrame) -> Tuple[np.ndarray, float]:
     # Build a prediction function over the transformed features
     def predict_proba_fn(df: pd.DataFrame) -> np.ndarray:
         return pipeline.predict_proba(df)[:, 1]
 
     # Use SHAP Explainer (model-agnostic) on the pipeline directly
-    explainer = shap.Explainer(predict_proba_fn, X)
-    shap_values = explainer(X.iloc[[0]])
+    explainer = shap.Explainer(predict_proba_fn, background)
+    shap_values = explainer(X)
+    expected = float(np.ravel(shap_values.base_values)[0]) if hasattr(shap_values, "base_values") else None
+    return np.asarray(shap_values.values), expected
 
-    feature_names = X.columns.tolist()
-    values = shap_values.values[0]
-    abs_order = np.argsort(np.abs(values))[::-1]
-    top_idx = abs_order[:top_k]
 
-    contributions = [
-        {"feature": feature_names[i], "shap_value": float(values[i])}
-        for i in top_idx
-    ]
+def summarize_background(X: np.ndarray, size: int, seed: int = 0) -> np.ndarray:
+    """
+    K-means summary of a numeric background matrix (``size`` representative rows).
 
-    return {
-        "contributions": contributions,
-        "expected_value": float(np.ravel(shap_values.base_values)[0]) if hasattr(shap_values, "base_values") else None,
-    }
+    Each centroid coordinate is snapped to the nearest value observed in that
+    column, so discrete and one-hot features keep valid values.
+    """
+    X = np.asarray(X, dtype=float)
+    if size <= 0 or len(X) <= size:
+        return X
+    col_means = np.nanmean(X, axis=0)
+    X = np.where(np.isnan(X), col_means, X)
+    centers = KMeans(n_clusters=size, random_state=seed, n_init=4).fit(X).cluster_centers_
+    for j in range(X.shape[1]):
+        nearest = np.abs(X[:, j][:, None] - centers[:, j][None, :]).argmin(axis=0)
+        centers[:, j] = X[nearest, j]
+    return centers
+
+
+def _rank_contributions(values: np.ndarray, feature_names: List[str], top_k: int) -> List[Dict[str, Any]]:
+    top_idx = np.argsort(np.abs(values))[::-1][:top_k]
+    return [{"feature": feature_names[i], "shap_value": float(values[i])} for i in top_idx]
+
+
+class CachedExplainer:
+    """
+    SHAP explainer for one fitted model, built once against a summarized background.
+
+    Accepts a ``preprocess -> VotingClassifier`` pipeline or a bare soft
+    VotingClassifier. Tree ensembles get one explainer per member over the
+    k-means background in preprocessed space; anything else gets a single
+    model-agnostic explainer over a background sample. ``explain`` only runs
+    the per-instance computation.
+    """
 
+    def __init__(
+        self,
+        model: Any,
+        background: pd.DataFrame,
+        background_size: int = DEFAULT_BACKGROUND_SIZE,
+        seed: int = 0,
+    ) -> None:
+        self.feature_columns = background.columns.tolist()
+        self.background_size = background_size
+        steps = getattr(model, "named_steps", {})
+        self.preprocess = steps.get("preprocess")
+        clf = steps.get("clf", model)
 
+        if _supports_tree_path(model) or (not steps and _is_tree_ensemble(clf)):
+            self.method = "tree"
+            background_t = self._transform(background)
+            summary = summarize_background(background_t, background_size, seed)
+            self.weights = _voting_weights(clf)
+            self.members = [_member_explainer(est, summary) for est in clf.estimators_]
+            if self.preprocess is not None:
+                self.owners = _transformed_feature_owners(self.preprocess, self.feature_columns)
+            else:
+                self.owners = np.arange(len(self.feature_columns))
+        else:
+            self.method = "sampling"
+            if all(pd.api.types.is_numeric_dtype(t) for t in background.dtypes):
+                summary = pd.DataFrame(
+                    summarize_background(background.to_numpy(), background_size, seed),
+                    columns=self.feature_columns,
+                )
+            else:
+                summary = background.sample(min(len(background), background_size), random_state=seed)
+
+            def predict_proba_fn(df: pd.DataFrame) -> np.ndarray:
+                if not isinstance(df, pd.DataFrame):
+                    df = pd.DataFrame(df, columns=self.feature_columns)
+                return model.predict_proba(df)[:, 1]
+
+            self.explainer = shap.Explainer(predict_proba_fn, summary)
+
+        # Warm up once at build time (shap JIT-compiles its sampling kernels on
+        # first use), so the first request does not pay for it.
+        self.shap_values(background.iloc[:1])
+
+    def _transform(self, X: pd.DataFrame) -> np.ndarray:
+        if self.preprocess is None:
+            return np.asarray(X[self.feature_columns], dtype=float)
+        return np.asarray(self.preprocess.transform(X[self.feature_columns]), dtype=float)
+
+    def shap_values(self, X: pd.DataFrame) -> Tuple[np.ndarray, float]:
+        """SHAP values (rows x input features) and the expected value for the rows of ``X``."""
+        if self.method == "sampling":
+            explanation = self.explainer(X[self.feature_columns])
+            return np.asarray(explanation.values), float(np.ravel(explanation.base_values)[0])
+
+        X_t = self._transform(X)
+        values_t = np.zeros_like(X_t)
+        expected = 0.0
+        for weight, member in zip(self.weights, self.members):
+            member_values, member_expected = _member_values(member, X_t)
+            values_t += weight * member_values
+            expected += weight * member_expected
+        values = np.zeros((X_t.shape[0], len(self.feature_columns)))
+        np.add.at(values, (slice(None), self.owners), values_t)
+        return values, expected
+
+    def explain(self, X: pd.DataFrame, top_k: int = 10) -> List[Dict[str, Any]]:
+        """Top-``top_k`` contributions for every row of ``X``."""
+        values, expected = self.shap_values(X)
+        return [
+            {
+                "contributions": _rank_contributions(row, self.feature_columns, top_k),
+                "expected_value": expected,
+                "method": self.method,
+            }
+            for row in values
+        ]
+
+
+def model_version(model_path: str) -> str:
+    """
+    Version tag of a saved model: the metadata ``version`` written by
+    incremental updates, otherwise the artifact's modification time.
+    """
+    # Only the file name changes: models/saved_models/heart_model.joblib
+    # -> models/saved_models/heart_metadata.json
+    name = os.path.basename(model_path)
+    metadata_path = None
+    if name.endswith("_model.joblib"):
+        metadata_path = os.path.join(
+            os.path.dirname(model_path), name[: -len("_model.joblib")] + "_metadata.json"
+        )
+    if metadata_path is not None and os.path.exists(metadata_path):
+        try:
+            with open(metadata_path, "r") as f:
+                version = json.load(f).get("version")
+            if version is not None:
+                return f"v{version}"
+        except (OSError, ValueError):
+            pass
+    return f"mtime{int(os.path.getmtime(model_path))}"
+
+
+class ExplainerRegistry:
+    """
+    Process-wide cache of ``CachedExplainer`` objects keyed by (disease, model version).
+
+    Least recently used entries are evicted beyond ``max_entries``, and
+    registering a new version of a disease drops its older versions.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_EXPLAINERS,
+        background_size: int = DEFAULT_BACKGROUND_SIZE,
+        seed: int = 0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.background_size = background_size
+        self.seed = seed
+        self._entries: "OrderedDict[Tuple[str, str], CachedExplainer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._entries
+
+    def get(
+        self, disease: str, version: str, model: Any, background: Optional[pd.DataFrame] = None
+    ) -> CachedExplainer:
+        """
+        Explainer for ``(disease, version)``, building it on first use.
+
+        ``background`` (training rows) is only needed for the first call; the
+        model bundle's stored ``background`` is used when ``model`` is a bundle.
+        """
+        key = (disease, str(version))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Build outside the registry lock so other diseases stay available;
+        # concurrent requests for the same key wait for a single build.
+        with build_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key]
+
+            if isinstance(model, dict):
+                background = model.get("background") if background is None else background
+                model = model["pipeline"]
+            if background is None:
+                raise ValueError(f"No background data available to build the {disease} explainer")
+            explainer = CachedExplainer(model, background, self.background_size, self.seed)
+
+            with self._lock:
+                for old in [k for k in self._entries if k[0] == disease]:
+                    del self._entries[old]
+                self._entries[key] = explainer
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._build_locks.pop(key, None)
+        return explainer
+
+    def evict(self, disease: Optional[str] = None) -> None:
+        """Drop cached explainers for ``disease`` (all when None)."""
+        with self._lock:
+            for key in [k for k in self._entries if disease is None or k[0] == disease]:
+                del self._entries[key]
+
+
+def shap_explain_instance(
+    bundle: Dict[str, Any],
+    X: pd.DataFrame,
+    top_k: int = 10,
+    method: str = "auto",
+    explainer: Optional[CachedExplainer] = None,
+) -> Dict[str, Any]:
+    """
+    Explain the first row of ``X``.
+
+    With a prebuilt ``explainer`` (see ``ExplainerRegistry``) only the
+    per-instance computation runs. Otherwise an explainer is built for this
+    call with ``X`` as background data: ``method="auto"`` uses exact TreeSHAP
+    per tree member of the voting ensemble (sampling only for non-tree members)
+    and falls back to the model-agnostic explainer when the pipeline is not a
+    tree ensemble; ``"tree"`` and ``"sampling"`` force one path.
+    """
+    if explainer is not None:
+        return explainer.explain(X.iloc[[0]], top_k=top_k)[0]
+
+    pipeline = bundle["pipeline"]
+    row = X.iloc[[0]]
+
+    used = "sampling"
+    if method in ("auto", "tree") and _supports_tree_path(pipeline):
+        try:
+            values, expected = _tree_ensemble_shap(pipeline, row, X)
+            used = "tree"
+        except Exception:
+            if method == "tree":
+                raise
+    elif method == "tree":
+        raise ValueError("Pipeline has no tree members in a soft VotingClassifier")
+
+    if used == "sampling":
+        values, expected = _model_agnostic_shap(pipeline, row, X)
+
+    return {
+        "contributions": _rank_contributions(values[0], X.columns.tolist(), top_k),
+        "expected_value": expected,
+        "method": used,
+    }
@@ -0,0 +1,246 @@
+"""
+Population-level SHAP importance for a trained model.
+
+Computed once after training (see ``ModelTrainer.train_and_save``) and stored as
+``<condition>_importance.json`` in the model directory, so dashboards can show
+"what drives risk" without running SHAP at request time:
+
+- mean |SHAP| per feature over the training set
+- mean SHAP per feature within each Green/Yellow/Red zone
+- pairwise interaction strength (TreeSHAP interaction values of the tree
+  members on a subsample, normalized per member)
+
+SHAP values are computed in row chunks across worker processes; each worker
+builds its explainer once in the pool initializer.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import shap
+
+from src.models.explain import (
+    CachedExplainer,
+    _is_tree_member,
+    _transformed_feature_owners,
+    _voting_weights,
+)
+
+
+ZONES = ("Green", "Yellow", "Red")
+
+# Upper risk-score bounds (0-100) of the Green and Yellow zones, as in the API
+DEFAULT_ZONE_BOUNDS = (30.0, 70.0)
+
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def risk_zones(risk: np.ndarray, zone_bounds: Tuple[float, float] = DEFAULT_ZONE_BOUNDS) -> np.ndarray:
+    """Green/Yellow/Red label for each 0-100 risk score"""
+    risk = np.asarray(risk, dtype=float)
+    return np.where(risk <= zone_bounds[0], "Green", np.where(risk <= zone_bounds[1], "Yellow", "Red"))
+
+
+def importance_path(save_dir: str, condition: str) -> str:
+    return os.path.join(save_dir, f"{condition}_importance.json")
+
+
+def _init_importance_worker(
+    model: Any, background: pd.DataFrame, background_size: int, single_thread: bool = True
+) -> None:
+    """Pool initializer: pin BLAS/OpenMP to one thread and build the explainer once per worker"""
+    if single_thread:
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(1)
+        except Exception:
+            pass
+    steps = getattr(model, "named_steps", {})
+    _WORKER_STATE["explainer"] = CachedExplainer(model, background, background_size)
+    _WORKER_STATE["members"] = steps.get("clf", model).estimators_
+
+
+def _shap_chunk(rows: pd.DataFrame) -> Tuple[np.ndarray, float]:
+    return _WORKER_STATE["explainer"].shap_values(rows)
+
+
+def _interaction_chunk(member_index: int, X_t: np.ndarray) -> np.ndarray:
+    """Sum over rows of |TreeSHAP interaction values| of one member (preprocessed space)"""
+    member = _WORKER_STATE["members"][member_index]
+    interactions = np.asarray(shap.TreeExplainer(member).shap_interaction_values(X_t))
+    if interactions.ndim == 4:  # (n, f, f, classes)
+        interactions = interactions[..., 1]
+    return np.abs(interactions).sum(axis=0)
+
+
+def _chunks(X: Any, chunk_size: int) -> List[Any]:
+    if isinstance(X, pd.DataFrame):
+        return [X.iloc[start:start + chunk_size] for start in range(0, len(X), chunk_size)]
+    return [X[start:start + chunk_size] for start in range(0, len(X), chunk_size)]
+
+
+def _interaction_setup(model: Any, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, List[int], np.ndarray]:
+    """Preprocessed rows, fold matrix onto input features, tree member indices and voting weights"""
+    steps = getattr(model, "named_steps", {})
+    preprocess = steps.get("preprocess")
+    clf = steps.get("clf", model)
+    columns = X.columns.tolist()
+    if preprocess is not None:
+        X_t = np.asarray(preprocess.transform(X), dtype=float)
+        owners = _transformed_feature_owners(preprocess, columns)
+    else:
+        X_t = np.asarray(X, dtype=float)
+        owners = np.arange(len(columns))
+    fold = np.zeros((X_t.shape[1], len(columns)))
+    fold[np.arange(X_t.shape[1]), owners] = 1.0
+    tree_members = [i for i, est in enumerate(clf.estimators_) if _is_tree_member(est)]
+    return X_t, fold, tree_members, _voting_weights(clf)
+
+
+def _combine_interactions(
+    sums: Dict[int, np.ndarray], n_rows: int, fold: np.ndarray, weights: np.ndarray
+) -> Optional[np.ndarray]:
+    """
+    Voting-weighted mean |interaction| between input features (diagonal zeroed).
+
+    Members explain in their own output units (margin or probability), so each
+    member's matrix is normalized to sum to 1 before averaging.
+    """
+    total = np.zeros((fold.shape[1], fold.shape[1]))
+    used = 0.0
+    for index, summed in sums.items():
+        # Fold transformed columns onto their input feature: F^T A F
+        strength = fold.T @ (summed / n_rows) @ fold
+        np.fill_diagonal(strength, 0.0)
+        if strength.sum() > 0:
+            total += weights[index] * strength / strength.sum()
+            used += weights[index]
+    return total / used if used else None
+
+
+def compute_global_importance(
+    model: Any,
+    X: pd.DataFrame,
+    background: Optional[pd.DataFrame] = None,
+    background_size: int = 20,
+    zone_bounds: Tuple[float, float] = DEFAULT_ZONE_BOUNDS,
+    n_jobs: int = -1,
+    chunk_size: int = 64,
+    interaction_rows: int = 100,
+    top_interactions: int = 20,
+    max_rows: int = 5000,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    Mean |SHAP|, per-zone mean SHAP and interaction strength of ``model`` over ``X``.
+
+    Args:
+        model: fitted pipeline (or bare VotingClassifier) explained as in ``CachedExplainer``
+        X: rows to summarize, normally the training set
+        background: explainer background rows (defaults to ``X``)
+        background_size: k-means background rows; interventional TreeSHAP cost is
+            linear in it, so the offline default is smaller than the API's
+        zone_bounds: upper risk-score bounds of the Green and Yellow zones
+        n_jobs: worker processes for SHAP chunks and interaction blocks (-1 = all cores)
+        interaction_rows: subsample size for interaction values (0 disables them)
+        max_rows: larger inputs are subsampled to this many rows
+    """
+    if len(X) > max_rows:
+        X = X.sample(n=max_rows, random_state=seed)
+    X = X.reset_index(drop=True)
+    background = X if background is None else background
+    columns = X.columns.tolist()
+
+    shap_chunks = _chunks(X, chunk_size)
+    interaction_tasks: List[Tuple[int, np.ndarray]] = []
+    if interaction_rows > 0 and hasattr(getattr(model, "named_steps", {}).get("clf", model), "estimators_"):
+        sample = X.sample(n=min(len(X), interaction_rows), random_state=seed)
+        X_t, fold, tree_members, weights = _interaction_setup(model, sample)
+        interaction_tasks = [
+            (index, block) for index in tree_members for block in _chunks(X_t, max(1, chunk_size // 2))
+        ]
+
+    n_jobs = (os.cpu_count() or 1) if n_jobs in (None, -1) else n_jobs
+    n_jobs = max(1, min(n_jobs, len(shap_chunks) + len(interaction_tasks)))
+    if n_jobs == 1:
+        _init_importance_worker(model, background, background_size, single_thread=False)
+        shap_parts = [_shap_chunk(chunk) for chunk in shap_chunks]
+        interaction_parts = [_interaction_chunk(index, block) for index, block in interaction_tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_importance_worker,
+            initargs=(model, background, background_size),
+        ) as pool:
+            # Submit everything up front so SHAP chunks and interaction blocks share the pool
+            shap_futures = [pool.submit(_shap_chunk, chunk) for chunk in shap_chunks]
+            interaction_futures = [pool.submit(_interaction_chunk, i, block) for i, block in interaction_tasks]
+            shap_parts = [f.result() for f in shap_futures]
+            interaction_parts = [f.result() for f in interaction_futures]
+
+    values = np.vstack([part[0] for part in shap_parts])
+    expected = shap_parts[0][1]
+    risk = np.clip(model.predict_proba(X)[:, 1] * 100, 0, 100)
+    zones = risk_zones(risk, zone_bounds)
+
+    mean_abs = np.abs(values).mean(axis=0)
+    order = np.argsort(mean_abs)[::-1]
+    report: Dict[str, Any] = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "n_rows": int(len(X)),
+        "background_size": int(background_size),
+        "expected_value": float(expected),
+        "mean_abs_shap": [{"feature": columns[i], "value": float(mean_abs[i])} for i in order],
+        "zones": {},
+        "interactions": [],
+    }
+
+    for zone in ZONES:
+        mask = zones == zone
+        entry: Dict[str, Any] = {"count": int(mask.sum())}
+        if mask.any():
+            zone_mean = values[mask].mean(axis=0)
+            zone_abs = np.abs(values[mask]).mean(axis=0)
+            entry["mean_risk_score"] = float(risk[mask].mean())
+            entry["mean_shap"] = {columns[i]: float(zone_mean[i]) for i in order}
+            entry["mean_abs_shap"] = {columns[i]: float(zone_abs[i]) for i in order}
+        report["zones"][zone] = entry
+
+    if interaction_tasks:
+        sums: Dict[int, np.ndarray] = {}
+        for (index, _), part in zip(interaction_tasks, interaction_parts):
+            sums[index] = sums.get(index, 0) + part
+        strength = _combine_interactions(sums, len(sample), fold, weights)
+        if strength is not None:
+            i_idx, j_idx = np.triu_indices(len(columns), k=1)
+            pair_values = strength[i_idx, j_idx] + strength[j_idx, i_idx]
+            top = np.argsort(pair_values)[::-1][:top_interactions]
+            report["interactions"] = [
+                {"features": [columns[i_idx[k]], columns[j_idx[k]]], "strength": float(pair_values[k])}
+                for k in top
+            ]
+    return report
+
+
+def save_importance(report: Dict[str, Any], save_dir: str, condition: str) -> str:
+    os.makedirs(save_dir, exist_ok=True)
+    path = importance_path(save_dir, condition)
+    with open(path, "w") as f:
+        json.dump(dict(report, condition=condition), f, indent=2)
+    return path
+
+
+def load_importance(save_dir: str, condition: str) -> Dict[str, Any]:
+    path = importance_path(save_dir, condition)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Importance file not found: {path}. Train the model first.")
+    with open(path, "r") as f:
+        return json.load(f)
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from typing import Dict, Tuple, Any
+from typing import Dict, Optional, Tuple, Any
 
 import joblib
 import numpy as np
@@ -15,13 +15,15 @@ import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.metrics import roc_auc_score, accuracy_score
-from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, VotingClassifier
 
+from src.data_processing.fold_cache import FoldCache
+from src.models.importance import compute_global_importance, save_importance
 from src.utils import load_config, ensure_dir
+from src.utils.profiling import TrainingProfiler, fit_voting_members
 
 
 TARGET_CANDIDATES = ["Outcome", "target", "classification", "class"]
@@ -207,53 +209,126 @@ def _encode_target_series(y: pd.Series, condition: str) -> Tuple[pd.Series, Dict
     return y_mapped.astype(int), mapping
 
 
+# Training rows stored with each model for explainer backgrounds
+BACKGROUND_ROWS = 500
+
+
 @dataclass
 class TrainResult:
     condition: str
     model_path: str
     metrics: Dict[str, float]
+    importance_path: Optional[str] = None
 
 
 class ModelTrainer:
-    def __init__(self, config_path: str | None = None) -> None:
+    def __init__(self, config_path: str | None = None, fold_cache_dir: str | None = None) -> None:
         self.config = load_config(config_path)
         # Use 'paths' key from config.yaml
-        self.save_dir = self.config.get("paths", {}).get("models", "models/saved_models")
+        paths = self.config.get("paths", {})
+        self.save_dir = paths.get("models", "models/saved_models")
         ensure_dir(self.save_dir)
-
-    def train_and_save(self, condition: str, df: pd.DataFrame) -> TrainResult:
-        target_col = _detect_target_column(df)
-        X, y = _split_features(df, target_col)
-        y_encoded, label_mapping = _encode_target_series(y, condition)
-
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y_encoded,
-            test_size=0.2,
-            random_state=42,
-            stratify=y_encoded if y_encoded.nunique() <= 10 else None,
+        # Split indices are cached under paths.fold_cache (default: <processed_data>/fold_cache)
+        self.fold_cache = FoldCache(
+            fold_cache_dir
+            or paths.get("fold_cache")
+            or os.path.join(paths.get("processed_data", "data/processed"), "fold_cache")
         )
 
-        pipe = _build_pipeline(X)
-        pipe.fit(X_train, y_train)
-
-        y_prob = pipe.predict_proba(X_test)[:, 1]
-        y_pred = (y_prob >= 0.5).astype(int)
+    def train_and_save(
+        self, condition: str, df: pd.DataFrame, profile: bool = False, importance: Optional[bool] = None
+    ) -> TrainResult:
+        """
+        Train the ensemble pipeline for ``condition`` and persist it.
+
+        With ``profile=True`` per-stage (and per ensemble member) wall/CPU time and
+        peak RSS are written to ``<condition>_profile.json`` in the save directory.
+        With ``importance=True`` population SHAP importance over the training set
+        is written to ``<condition>_importance.json`` (see ``src.models.importance``).
+        It is a full SHAP pass, so it defaults to ``explain.importance_after_training``
+        (off unless configured).
+        """
+        explain_config = self.config.get("explain", {}) or {}
+        if importance is None:
+            importance = bool(explain_config.get("importance_after_training", False))
+        profiler = TrainingProfiler(condition, enabled=profile)
+
+        with profiler.stage("clean"):
+            target_col = _detect_target_column(df)
+            X, y = _split_features(df, target_col)
+            y_encoded, label_mapping = _encode_target_series(y, condition)
+
+        with profiler.stage("split"):
+            # Split indices are shared with other runs on the same data via the fold cache;
+            # preprocessing itself stays inside the persisted pipeline.
+            holdout = self.fold_cache.holdout(
+                X, y_encoded,
+                test_size=0.2,
+                seed=42,
+                stratify=y_encoded.nunique() <= 10,
+                indices_only=True,
+            )
+            train_idx, test_idx = holdout.indices()[0]
+            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+            y_train, y_test = y_encoded.iloc[train_idx], y_encoded.iloc[test_idx]
 
-        metrics = {
-            "roc_auc": float(roc_auc_score(y_test, y_prob)),
-            "accuracy": float(accuracy_score(y_test, y_pred)),
-        }
+        pipe = _build_pipeline(X)
+        with profiler.stage("fit"):
+            if profile:
+                preprocess, clf = pipe.named_steps["preprocess"], pipe.named_steps["clf"]
+                with profiler.stage("preprocess"):
+                    X_train_t = preprocess.fit_transform(X_train, y_train)
+                fit_voting_members(clf, X_train_t, y_train, profiler)
+            else:
+                pipe.fit(X_train, y_train)
+
+        with profiler.stage("evaluate"):
+            y_prob = pipe.predict_proba(X_test)[:, 1]
+            y_pred = (y_prob >= 0.5).astype(int)
+
+            metrics = {
+                "roc_auc": float(roc_auc_score(y_test, y_prob)),
+                "accuracy": float(accuracy_score(y_test, y_pred)),
+            }
 
         model_path = os.path.join(self.save_dir, f"{condition}_model.joblib")
-        joblib.dump({
-            "pipeline": pipe,
-            "target_col": target_col,
-            "feature_columns": X.columns.tolist(),
-            "metrics": metrics,
-            "label_mapping": label_mapping,
-        }, model_path)
+        with profiler.stage("dump"):
+            joblib.dump({
+                "pipeline": pipe,
+                "target_col": target_col,
+                "feature_columns": X.columns.tolist(),
+                "metrics": metrics,
+                "label_mapping": label_mapping,
+                # Training rows the SHAP explainer registry summarizes as background
+                "background": X_train.sample(n=min(len(X_train), BACKGROUND_ROWS), random_state=42),
+            }, model_path)
+
+        importance_path = None
+        if importance:
+            with profiler.stage("importance"):
+                report = compute_global_importance(
+                    pipe,
+                    X_train,
+                    background_size=int(explain_config.get("importance_background_size", 20)),
+                    zone_bounds=self._zone_bounds(),
+                    n_jobs=int(explain_config.get("importance_jobs", -1)),
+                )
+                importance_path = save_importance(report, self.save_dir, condition)
+
+        if profile:
+            profiler.write(self.save_dir)
+
+        return TrainResult(
+            condition=condition, model_path=model_path, metrics=metrics, importance_path=importance_path
+        )
 
-        return TrainResult(condition=condition, model_path=model_path, metrics=metrics)
+    def _zone_bounds(self) -> Tuple[float, float]:
+        """Upper bounds of the Green and Yellow zones from ``risk_thresholds``"""
+        thresholds = self.config.get("risk_thresholds", {}) or {}
+        try:
+            return float(thresholds["green"][1]), float(thresholds["yellow"][1])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return 30.0, 70.0
 
 
 def load_trained_model(condition: str, config_path: str | None = None) -> Dict[str, Any]:
@@ -265,3 +340,23 @@ def load_trained_model(condition: str, config_path: str | None = None) -> Dict[s
     return joblib.load(model_path)
 
 
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train and persist a disease risk pipeline")
+    parser.add_argument("condition", help="Model name, e.g. diabetes, heart or kidney")
+    parser.add_argument("csv_path", help="Training CSV including the target column")
+    parser.add_argument("--config", default="config/config.yaml", help="Config file")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-stage timings/memory to <condition>_profile.json")
+    parser.add_argument("--importance", action="store_true", default=None,
+                        help="Write population SHAP importance to <condition>_importance.json "
+                             "(default: explain.importance_after_training)")
+    args = parser.parse_args()
+
+    result = ModelTrainer(args.config).train_and_save(
+        args.condition, pd.read_csv(args.csv_path), profile=args.profile, importance=args.importance
+    )
+    print(f"✅ Saved {result.model_path}: {result.metrics}")
+    if result.importance_path:
+        print(f"   Importance: {result.importance_path}")
@@ -0,0 +1,170 @@
+"""
+What-if / sensitivity analysis for a single patient.
+
+A base patient plus one or more feature sweeps (e.g. Glucose 80-200 step 5)
+is expanded into one NumPy block holding
+
+- the base row,
+- one curve per sweep (that feature varied, everything else at base), and
+- with two or more sweeps, the full cartesian grid of all swept values,
+
+which is scored with a single ``predict_proba`` call. Curves report the
+feature values where the risk crosses a Green/Yellow/Red zone boundary.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.models.importance import DEFAULT_ZONE_BOUNDS, risk_zones
+
+
+MAX_SWEEP_POINTS = 1000
+MAX_GRID_ROWS = 50_000
+
+
+@dataclass
+class Sweep:
+    feature: str
+    values: np.ndarray
+
+
+def parse_sweep(spec: Dict[str, Any], features: Sequence[str]) -> Sweep:
+    """
+    Sweep from ``{"feature", "values": [...]}`` or ``{"feature", "start", "stop", "step"}``.
+
+    ``stop`` is inclusive. Raises ValueError for unknown features or bad ranges.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Each sweep must be an object")
+    feature = spec.get("feature")
+    if feature not in features:
+        raise ValueError(f"Unknown sweep feature '{feature}'. Expected one of: {list(features)}")
+
+    try:
+        if "values" in spec:
+            values = np.asarray(spec["values"], dtype=float).ravel()
+        else:
+            start, stop, step = float(spec["start"]), float(spec["stop"]), float(spec["step"])
+            if step == 0 or (stop - start) / step < 0:
+                raise ValueError(f"Sweep step for '{feature}' must move from start towards stop")
+            n_points = int(np.floor((stop - start) / step + 1e-9)) + 1
+            if n_points > MAX_SWEEP_POINTS:
+                raise ValueError(f"Sweep for '{feature}' has more than {MAX_SWEEP_POINTS} points")
+            values = start + step * np.arange(n_points)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Sweep for '{feature}' needs 'values' or 'start', 'stop' and 'step'") from e
+
+    if values.size == 0 or values.size > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep for '{feature}' must have 1-{MAX_SWEEP_POINTS} values")
+    if not np.isfinite(values).all():
+        raise ValueError(f"Sweep for '{feature}' contains NaN or infinite values")
+    return Sweep(feature=feature, values=values)
+
+
+def build_block(
+    base: np.ndarray, sweeps: List[Sweep], features: Sequence[str], max_rows: int = MAX_GRID_ROWS
+) -> Tuple[np.ndarray, List[slice], slice]:
+    """
+    Stack base row, per-sweep curves and the full grid into one matrix.
+
+    Returns the block, the row slice of each curve and the row slice of the grid
+    (empty for a single sweep).
+    """
+    columns = {name: i for i, name in enumerate(features)}
+    curve_rows = sum(s.values.size for s in sweeps)
+    grid_rows = int(np.prod([s.values.size for s in sweeps])) if len(sweeps) > 1 else 0
+    n_rows = 1 + curve_rows + grid_rows
+    if n_rows > max_rows:
+        raise ValueError(f"What-if grid has {n_rows} rows; the limit is {max_rows}")
+
+    block = np.repeat(base[None, :], n_rows, axis=0)
+    curves: List[slice] = []
+    offset = 1
+    for sweep in sweeps:
+        rows = slice(offset, offset + sweep.values.size)
+        block[rows, columns[sweep.feature]] = sweep.values
+        curves.append(rows)
+        offset = rows.stop
+
+    grid = slice(offset, offset + grid_rows)
+    if grid_rows:
+        mesh = np.meshgrid(*[s.values for s in sweeps], indexing="ij")
+        for sweep, axis_values in zip(sweeps, mesh):
+            block[grid, columns[sweep.feature]] = axis_values.ravel()
+    return block, curves, grid
+
+
+def zone_crossings(
+    values: np.ndarray, risk: np.ndarray, zone_bounds: Tuple[float, float] = DEFAULT_ZONE_BOUNDS
+) -> List[Dict[str, Any]]:
+    """Feature values where a risk curve crosses a zone boundary (linear interpolation)."""
+    zones = risk_zones(risk, zone_bounds)
+    crossings = []
+    for i in np.flatnonzero(zones[1:] != zones[:-1]):
+        r0, r1 = risk[i], risk[i + 1]
+        # One step may cross both boundaries; report each in sweep order
+        bounds = [b for b in zone_bounds if min(r0, r1) <= b < max(r0, r1)]
+        for bound in sorted(bounds, reverse=bool(r1 < r0)):
+            at = values[i] + (bound - r0) * (values[i + 1] - values[i]) / (r1 - r0)
+            below, above = risk_zones([bound], zone_bounds)[0], risk_zones([bound + 1e-9], zone_bounds)[0]
+            crossings.append({
+                "from": str(below if r1 > r0 else above),
+                "to": str(above if r1 > r0 else below),
+                "at": float(at),
+            })
+    return crossings
+
+
+def _to_scores(proba: np.ndarray) -> np.ndarray:
+    scores = np.clip(np.asarray(proba, dtype=float) * 100, 0.0, 100.0)
+    # Same fallback as /predict for invalid model output
+    return np.where(np.isfinite(scores), scores, 50.0)
+
+
+def score_sweeps(
+    model: Any,
+    patient: Dict[str, float],
+    sweep_specs: List[Dict[str, Any]],
+    features: Sequence[str],
+    zone_bounds: Tuple[float, float] = DEFAULT_ZONE_BOUNDS,
+    max_rows: int = MAX_GRID_ROWS,
+) -> Dict[str, Any]:
+    """Risk curves, zone crossings and (for 2+ sweeps) the full risk grid for one patient."""
+    if not sweep_specs:
+        raise ValueError("At least one sweep is required")
+    sweeps = [parse_sweep(spec, features) for spec in sweep_specs]
+    if len({s.feature for s in sweeps}) != len(sweeps):
+        raise ValueError("Each feature can only be swept once")
+
+    base = np.array([float(patient[f]) for f in features])
+    block, curves, grid = build_block(base, sweeps, features, max_rows)
+    scores = _to_scores(model.predict_proba(pd.DataFrame(block, columns=list(features)))[:, 1])
+    zones = risk_zones(scores, zone_bounds)
+
+    result: Dict[str, Any] = {
+        "base": {"risk_score": round(float(scores[0]), 2), "zone": str(zones[0])},
+        "curves": [],
+        "rows_scored": int(len(block)),
+    }
+    for sweep, rows in zip(sweeps, curves):
+        result["curves"].append({
+            "feature": sweep.feature,
+            "base_value": float(base[list(features).index(sweep.feature)]),
+            "values": sweep.values.tolist(),
+            "risk_scores": np.round(scores[rows], 2).tolist(),
+            "zones": zones[rows].tolist(),
+            "crossings": zone_crossings(sweep.values, scores[rows], zone_bounds),
+        })
+    if grid.stop > grid.start:
+        shape = [s.values.size for s in sweeps]
+        result["grid"] = {
+            "features": [s.feature for s in sweeps],
+            "shape": shape,
+            "risk_scores": np.round(scores[grid], 2).reshape(shape).tolist(),
+        }
+    return result
@@ -2,10 +2,12 @@
 Recommendation engine for personalized guidance and risk stratification.
 """
 
-from .engine import generate_recommendations, risk_band
+from .engine import generate_recommendations, generate_recommendations_batch, risk_band, risk_bands
 
 __all__ = [
     "generate_recommendations",
+    "generate_recommendations_batch",
     "risk_band",
+    "risk_bands",
 ]
 
@@ -4,42 +4,66 @@ Simple rules-based recommendation engine with risk stratification.
 
 from __future__ import annotations
 
-from typing import Dict, Any, List
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Sequence, Tuple
 
-from src.utils import load_config
+import numpy as np
 
+from src.utils import get_settings
+from src.utils.settings import RiskThresholds
+from src.recommendation.rules import Rule, get_rule_engine
 
-def risk_band(score_0_100: float, config_path: str | None = None) -> str:
-    """Determine risk band from score with granular levels"""
+
+def _configured_thresholds(config_path: str | None) -> RiskThresholds | None:
+    """
+    Coarse green/yellow/red thresholds from an explicit config file.
+
+    ``None`` (no config path, or a config that cannot be loaded) selects the
+    granular bands the recommendation tables are keyed on.
+    """
+    if config_path is None:
+        return None
     try:
-        config = load_config(config_path)
-        thresholds = config["risk_thresholds"]
-        score = float(score_0_100)
-        g0, g1 = thresholds["green"]
-        y0, y1 = thresholds["yellow"]
-        r0, r1 = thresholds["red"]
-        if g0 <= score <= g1:
-            return "green"
-        if y0 <= score <= y1:
-            return "yellow"
-        if r0 <= score <= r1:
-            return "red"
+        return get_settings(config_path).risk_thresholds
     except Exception:
-        # Fallback to granular thresholds if config fails
-        score = float(score_0_100)
-        if score <= 25:
-            return "green_low"
-        elif score <= 40:
-            return "green_high"
-        elif score <= 55:
-            return "yellow_low"
-        elif score <= 70:
-            return "yellow_high"
-        elif score <= 85:
-            return "red_low"
-        else:
-            return "red_high"
-    return "unknown"
+        return None
+
+
+def risk_band(score_0_100: float, config_path: str | None = None) -> str:
+    """Determine risk band from score with granular levels"""
+    score = float(score_0_100)
+    thresholds = _configured_thresholds(config_path)
+    if thresholds is not None:
+        return thresholds.band(score)
+    # Fallback to granular thresholds if config fails
+    if score <= 25:
+        return "green_low"
+    elif score <= 40:
+        return "green_high"
+    elif score <= 55:
+        return "yellow_low"
+    elif score <= 70:
+        return "yellow_high"
+    elif score <= 85:
+        return "red_low"
+    else:
+        return "red_high"
+
+
+# Upper bounds (inclusive) of the granular fallback bands, for vectorized lookup
+_GRANULAR_EDGES = np.array([25.0, 40.0, 55.0, 70.0, 85.0])
+_GRANULAR_LABELS = np.array(["green_low", "green_high", "yellow_low", "yellow_high", "red_low", "red_high"])
+
+
+def risk_bands(scores_0_100: Sequence[float], config_path: str | None = None) -> np.ndarray:
+    """Vectorized ``risk_band``: one band label per score, same thresholds and fallback."""
+    scores = np.asarray(scores_0_100, dtype=float).ravel()
+    thresholds = _configured_thresholds(config_path)
+    if thresholds is not None:
+        return thresholds.bands(scores)
+    return _GRANULAR_LABELS[np.searchsorted(_GRANULAR_EDGES, scores, side="left")]
 
 
 def _get_recommendations_by_risk(condition: str, band: str) -> Dict[str, List[str]]:
@@ -207,44 +231,173 @@ def _get_recommendations_by_risk(condition: str, band: str) -> Dict[str, List[st
     return base
 
 
-def generate_recommendations(condition: str, risk_score_0_100: float, config_path: str | None = None) -> Dict[str, Any]:
-    """Generate comprehensive categorized recommendations based on disease and risk level"""
-    band = risk_band(risk_score_0_100, config_path=config_path)
-    
-    # Get categorized recommendations
+# Score-dependent urgency line added to each granular band: (category, text)
+_BAND_HEADERS = {
+    "green_low": ("lifestyle", "✅ Excellent health indicators - maintain current habits"),
+    "green_high": ("lifestyle", "⚠️ Good health but some risk factors detected - focus on prevention"),
+    "yellow_low": ("medical", "⚡ Moderate risk detected - schedule medical consultation within 3-4 weeks"),
+    "yellow_high": ("medical", "⚡ Elevated risk - schedule medical consultation within 1-2 weeks"),
+    "red_low": ("medical", "🚨 High risk detected - seek medical attention within 3-5 days"),
+    "red_high": ("medical", "🚨 CRITICAL RISK - Seek immediate medical attention (within 24-48 hours)"),
+}
+
+CONDITIONS = ("diabetes", "heart", "kidney")
+GRANULAR_BANDS = tuple(_BAND_HEADERS)
+
+# Table key for conditions / bands without specific content
+_ANY_CONDITION = "*"
+_OTHER_BAND = "unknown"
+
+
+@dataclass(frozen=True)
+class CompiledRecommendations:
+    """Fully materialized recommendations for one (condition, band), plus their JSON encoding."""
+    recommendations: Mapping[str, Tuple[str, ...]]
+    json: bytes
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {category: list(items) for category, items in self.recommendations.items()}
+
+
+def _build_recommendations(condition: str, band: str) -> Dict[str, List[str]]:
+    """Recommendations for (condition, band) including the band's urgency line"""
     recommendations = _get_recommendations_by_risk(condition, band)
-    
-    # Add intensity/urgency markers based on granular band
-    if band == "green_low":
-        recommendations["lifestyle"].insert(0, "✅ Excellent health indicators - maintain current habits")
-    elif band == "green_high":
-        recommendations["lifestyle"].insert(0, "⚠️ Good health but some risk factors detected - focus on prevention")
-    elif band == "yellow_low":
-        recommendations["medical"].insert(0, "⚡ Moderate risk detected - schedule medical consultation within 3-4 weeks")
-    elif band == "yellow_high":
-        recommendations["medical"].insert(0, "⚡ Elevated risk - schedule medical consultation within 1-2 weeks")
-    elif band == "red_low":
-        recommendations["medical"].insert(0, "🚨 High risk detected - seek medical attention within 3-5 days")
-    elif band == "red_high":
-        recommendations["medical"].insert(0, "🚨 CRITICAL RISK - Seek immediate medical attention (within 24-48 hours)")
-    
-    # Determine zone name with score context
-    score = float(risk_score_0_100)
+    header = _BAND_HEADERS.get(band)
+    if header is not None:
+        category, text = header
+        recommendations[category].insert(0, text)
+    return recommendations
+
+
+def _compile_recommendation_table() -> Mapping[Tuple[str, str], CompiledRecommendations]:
+    table = {}
+    for condition in CONDITIONS + (_ANY_CONDITION,):
+        for band in GRANULAR_BANDS + (_OTHER_BAND,):
+            recommendations = _build_recommendations(condition, band)
+            table[(condition, band)] = CompiledRecommendations(
+                recommendations=MappingProxyType({k: tuple(v) for k, v in recommendations.items()}),
+                json=json.dumps(recommendations).encode("utf-8"),
+            )
+    return MappingProxyType(table)
+
+
+# Compiled once at import; every response is a lookup in this table
+RECOMMENDATION_TABLE = _compile_recommendation_table()
+
+
+def compiled_recommendations(condition: str, band: str) -> CompiledRecommendations:
+    """Precompiled entry for ``condition`` and ``band`` (any band risk_band can return)"""
+    condition = condition.lower()
+    return RECOMMENDATION_TABLE[(
+        condition if condition in CONDITIONS else _ANY_CONDITION,
+        band if band in _BAND_HEADERS else _OTHER_BAND,
+    )]
+
+
+def _zone_name(band: str, score: float) -> str:
+    """Determine zone name with score context"""
     if band.startswith("green"):
-        zone_name = f"Green Zone (Low Risk - {score:.1f}%)"
+        return f"Green Zone (Low Risk - {score:.1f}%)"
     elif band.startswith("yellow"):
-        zone_name = f"Yellow Zone (Moderate Risk - {score:.1f}%)"
+        return f"Yellow Zone (Moderate Risk - {score:.1f}%)"
     elif band.startswith("red"):
-        zone_name = f"Red Zone (High Risk - {score:.1f}%)"
-    else:
-        zone_name = "Unknown Zone"
-    
-    return {
+        return f"Red Zone (High Risk - {score:.1f}%)"
+    return "Unknown Zone"
+
+
+def apply_rule_matches(result: Dict[str, Any], matches: List[Rule]) -> Dict[str, Any]:
+    """Append matched feature rules to a recommendation result (in place)"""
+    recommendations = result["recommendations"]
+    for rule in matches:
+        recommendations.setdefault(rule.category, []).append(rule.text)
+    result["matched_rules"] = [rule.to_dict() for rule in matches]
+    return result
+
+
+def generate_recommendations(
+    condition: str,
+    risk_score_0_100: float,
+    config_path: str | None = None,
+    features: Mapping[str, Any] | None = None,
+) -> Dict[str, Any]:
+    """
+    Generate comprehensive categorized recommendations based on disease and risk level.
+
+    With ``features`` (the patient's input values) recommendations from the
+    data-driven rule files are added and listed under ``matched_rules``.
+    """
+    band = risk_band(risk_score_0_100, config_path=config_path)
+    score = float(risk_score_0_100)
+
+    result = {
         "disease": condition,
         "risk_score": score,
-        "zone": zone_name,
+        "zone": _zone_name(band, score),
         "risk_level": band,  # Include granular band for reference
-        "recommendations": recommendations,
+        "recommendations": compiled_recommendations(condition, band).as_dict(),
     }
+    if features is not None:
+        matches = get_rule_engine().match(dict(features, risk_score=score), condition)
+        apply_rule_matches(result, matches)
+    return result
+
+
+def generate_recommendations_json(
+    condition: str,
+    risk_score_0_100: float,
+    config_path: str | None = None,
+    features: Mapping[str, Any] | None = None,
+) -> bytes:
+    """
+    ``generate_recommendations`` serialized to JSON bytes.
+
+    Only the small score-dependent header is encoded per call; the
+    recommendations body is spliced in from the precompiled table.
+    """
+    if features is not None:
+        return json.dumps(generate_recommendations(condition, risk_score_0_100, config_path, features)).encode("utf-8")
+    band = risk_band(risk_score_0_100, config_path=config_path)
+    score = float(risk_score_0_100)
+    header = json.dumps({
+        "disease": condition,
+        "risk_score": score,
+        "zone": _zone_name(band, score),
+        "risk_level": band,
+    })
+    body = compiled_recommendations(condition, band).json
+    return header[:-1].encode("utf-8") + b', "recommendations": ' + body + b"}"
+
+
+def generate_recommendations_batch(
+    items: Sequence[Mapping[str, Any]],
+    config_path: str | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    ``generate_recommendations`` for many ``{"disease", "risk_score"[, "features"]}`` items.
+
+    Bands are computed in one vectorized pass and feature rules are matched
+    with one ``match_batch`` call per condition.
+    """
+    scores = [float(item["risk_score"]) for item in items]
+    bands = risk_bands(scores, config_path=config_path)
 
+    results: List[Dict[str, Any]] = []
+    with_features: Dict[str, List[int]] = {}
+    for i, (item, score, band) in enumerate(zip(items, scores, bands.tolist())):
+        condition = item["disease"]
+        results.append({
+            "disease": condition,
+            "risk_score": score,
+            "zone": _zone_name(band, score),
+            "risk_level": band,
+            "recommendations": compiled_recommendations(condition, band).as_dict(),
+        })
+        if item.get("features") is not None:
+            with_features.setdefault(condition, []).append(i)
 
+    engine = get_rule_engine()
+    for condition, indices in with_features.items():
+        patients = [dict(items[i]["features"], risk_score=scores[i]) for i in indices]
+        for i, matches in zip(indices, engine.match_batch(patients, condition)):
+            apply_rule_matches(results[i], matches)
+    return results
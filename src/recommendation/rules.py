@@ -0,0 +1,409 @@
+"""
+Data-driven recommendation rules.
+
+Rules live in YAML or JSON files (default: ``config/rules``), e.g.::
+
+    rules:
+      - id: heart_high_chol_over_50
+        condition: heart            # optional, default: every condition
+        when:
+          chol: {gt: 240}
+          age: {gt: 50}
+        category: diet
+        text: "Cholesterol above 240 mg/dL after 50: ask about a lipid-lowering plan"
+        priority: 10                # optional, higher first
+
+Supported operators per feature are ``gt``, ``ge``, ``lt``, ``le``, ``eq`` and
+``between: [low, high]`` (inclusive); operators on one feature are combined
+with AND, as are the features of a rule. ``risk_score`` (0-100) can be used
+like any patient feature.
+
+A ``RuleSet`` compiles all rules into an interval index per feature: the
+feature's rule boundaries split the number line into elementary segments,
+and each segment stores a packed bitmask of the rules it satisfies. Matching
+a patient is one binary search per feature plus a bitwise AND, independent
+of the number of rules, and ``match_batch`` does the same for many patients
+with NumPy. ``RuleEngine`` holds the active ``RuleSet`` and recompiles in the
+background on reload, so readers never wait. Rule file changes are picked up
+on use, checked at most every ``RULES_CHECK_INTERVAL`` seconds.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.utils import get_project_root, get_settings
+
+
+DEFAULT_RULES_DIR = os.path.join("config", "rules")
+# Seconds between rule file mtime checks made by RuleEngine reads
+RULES_CHECK_INTERVAL = 2.0
+RULE_FILE_PATTERNS = ("*.yaml", "*.yml", "*.json")
+OPERATORS = ("gt", "ge", "lt", "le", "eq", "between")
+
+
+@dataclass(frozen=True)
+class Interval:
+    low: float = -math.inf
+    high: float = math.inf
+    low_closed: bool = False
+    high_closed: bool = False
+
+    def contains(self, value: float) -> bool:
+        if value < self.low or (value == self.low and not self.low_closed):
+            return False
+        if value > self.high or (value == self.high and not self.high_closed):
+            return False
+        return True
+
+    def intersect(self, other: "Interval") -> "Interval":
+        if other.low > self.low or (other.low == self.low and not other.low_closed):
+            low, low_closed = other.low, other.low_closed
+        else:
+            low, low_closed = self.low, self.low_closed
+        if other.high < self.high or (other.high == self.high and not other.high_closed):
+            high, high_closed = other.high, other.high_closed
+        else:
+            high, high_closed = self.high, self.high_closed
+        return Interval(low, high, low_closed, high_closed)
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    text: str
+    category: str = "personalized"
+    condition: Optional[str] = None
+    priority: int = 0
+    when: Mapping[str, Interval] = field(default_factory=dict)
+    source: str = ""
+
+    def matches(self, patient: Mapping[str, Any]) -> bool:
+        """Direct (unindexed) evaluation; used to verify the index"""
+        for feature, interval in self.when.items():
+            value = _as_float(patient.get(feature))
+            if value is None or not interval.contains(value):
+                return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "category": self.category, "text": self.text, "priority": self.priority}
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def _parse_interval(feature: str, spec: Any, rule_id: str) -> Interval:
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError(f"Rule '{rule_id}': condition on '{feature}' must be a mapping like {{gt: 240}}")
+    interval = Interval()
+    for op, value in spec.items():
+        if op not in OPERATORS:
+            raise ValueError(f"Rule '{rule_id}': unknown operator '{op}' (use one of {', '.join(OPERATORS)})")
+        try:
+            if op == "between":
+                low, high = (float(v) for v in value)
+                bound = Interval(low, high, True, True)
+            else:
+                v = float(value)
+                bound = {
+                    "gt": Interval(low=v),
+                    "ge": Interval(low=v, low_closed=True),
+                    "lt": Interval(high=v),
+                    "le": Interval(high=v, high_closed=True),
+                    "eq": Interval(v, v, True, True),
+                }[op]
+        except (TypeError, ValueError):
+            raise ValueError(f"Rule '{rule_id}': invalid value for '{feature}.{op}': {value!r}")
+        interval = interval.intersect(bound)
+    return interval
+
+
+def parse_rule(spec: Mapping[str, Any], source: str = "") -> Rule:
+    """Validate one rule mapping from a rule file."""
+    if not isinstance(spec, Mapping):
+        raise ValueError(f"{source}: each rule must be a mapping")
+    rule_id = spec.get("id")
+    if not rule_id or not spec.get("text"):
+        raise ValueError(f"{source}: every rule needs an 'id' and a 'text'")
+    when = spec.get("when") or {}
+    if not isinstance(when, Mapping) or not when:
+        raise ValueError(f"Rule '{rule_id}': 'when' must map at least one feature to a condition")
+    condition = spec.get("condition")
+    return Rule(
+        id=str(rule_id),
+        text=str(spec["text"]),
+        category=str(spec.get("category", "personalized")),
+        condition=str(condition).lower() if condition else None,
+        priority=int(spec.get("priority", 0)),
+        when={str(f): _parse_interval(str(f), s, str(rule_id)) for f, s in when.items()},
+        source=source,
+    )
+
+
+def load_rule_file(path: str) -> List[Rule]:
+    with open(path, "r") as f:
+        data = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+    if data is None:
+        return []
+    specs = data.get("rules", []) if isinstance(data, dict) else data
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a list of rules under 'rules'")
+    return [parse_rule(spec, source=os.path.basename(path)) for spec in specs]
+
+
+def rule_files(paths: Iterable[str]) -> List[str]:
+    """Rule files in ``paths`` (files or directories), sorted for a stable rule order."""
+    found: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in RULE_FILE_PATTERNS:
+                found.extend(glob.glob(os.path.join(path, pattern)))
+        elif os.path.exists(path):
+            found.append(path)
+    return sorted(set(found))
+
+
+class _FeatureIndex:
+    """Elementary segments of one feature's number line with a packed rule mask each."""
+
+    def __init__(self, rules: Sequence[Rule], feature: str, n_rules: int) -> None:
+        constrained = [(i, r.when[feature]) for i, r in enumerate(rules) if feature in r.when]
+        bounds = sorted({b for _, iv in constrained for b in (iv.low, iv.high) if math.isfinite(b)})
+        self.bounds = np.asarray(bounds, dtype=float)
+
+        # Segments: (-inf, b0), [b0], (b0, b1), [b1], ..., (b_k-1, inf)
+        representatives = []
+        for i in range(2 * len(bounds) + 1):
+            if i % 2:
+                representatives.append(bounds[i // 2])
+            elif not bounds:
+                representatives.append(0.0)
+            elif i == 0:
+                representatives.append(bounds[0] - 1.0)
+            elif i == 2 * len(bounds):
+                representatives.append(bounds[-1] + 1.0)
+            else:
+                representatives.append((bounds[i // 2 - 1] + bounds[i // 2]) / 2)
+
+        # Rules that do not constrain this feature pass every segment
+        unconstrained = np.ones(n_rules, dtype=bool)
+        unconstrained[[i for i, _ in constrained]] = False
+        masks = np.tile(unconstrained, (len(representatives), 1))
+        for i, interval in constrained:
+            masks[:, i] = [interval.contains(v) for v in representatives]
+        self.masks = np.packbits(masks, axis=1)
+        # A missing value fails every rule that constrains the feature
+        self.missing_mask = np.packbits(unconstrained)
+
+    def lookup(self, values: np.ndarray) -> np.ndarray:
+        """Packed rule masks (n x bytes) for an array of values (NaN = missing)."""
+        idx = np.searchsorted(self.bounds, values, side="left")
+        on_bound = (idx < len(self.bounds)) & (self.bounds[np.minimum(idx, len(self.bounds) - 1)] == values)
+        segments = 2 * idx + on_bound.astype(int) if len(self.bounds) else np.zeros(len(values), dtype=int)
+        result = self.masks[segments]
+        missing = np.isnan(values)
+        if missing.any():
+            result[missing] = self.missing_mask
+        return result
+
+
+class RuleSet:
+    """Immutable compiled rule set."""
+
+    def __init__(self, rules: Sequence[Rule], sources: Sequence[str] = ()) -> None:
+        ids = [r.id for r in rules]
+        duplicates = sorted({i for i in ids if ids.count(i) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate rule ids: {duplicates}")
+
+        self.rules: Tuple[Rule, ...] = tuple(rules)
+        self.sources: Tuple[str, ...] = tuple(sources)
+        n = len(self.rules)
+        self.features: Tuple[str, ...] = tuple(sorted({f for r in self.rules for f in r.when}))
+        self._index = {f: _FeatureIndex(self.rules, f, n) for f in self.features}
+
+        conditions = {r.condition for r in self.rules if r.condition}
+        generic = np.array([r.condition is None for r in self.rules], dtype=bool)
+        self._generic_mask = np.packbits(generic)
+        self._condition_masks = {
+            c: np.packbits(generic | np.array([r.condition == c for r in self.rules], dtype=bool))
+            for c in conditions
+        }
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[str]) -> "RuleSet":
+        files = rule_files(paths)
+        rules: List[Rule] = []
+        for path in files:
+            rules.extend(load_rule_file(path))
+        return cls(rules, files)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _condition_mask(self, condition: Optional[str]) -> np.ndarray:
+        if condition is None:
+            return np.packbits(np.ones(len(self.rules), dtype=bool))
+        return self._condition_masks.get(condition.lower(), self._generic_mask)
+
+    def match_batch(
+        self, patients: Any, condition: Optional[str] = None
+    ) -> List[List[Rule]]:
+        """
+        Matching rules for each patient (DataFrame or sequence of mappings),
+        highest priority first. Missing features fail the rules that use them.
+        """
+        frame = patients if isinstance(patients, pd.DataFrame) else pd.DataFrame(list(patients))
+        columns = {
+            feature: pd.to_numeric(frame[feature], errors="coerce").to_numpy(dtype=float)
+            for feature in self.features if feature in frame.columns
+        }
+        return self._match_columns(columns, len(frame), condition)
+
+    def _match_columns(
+        self, columns: Mapping[str, np.ndarray], n: int, condition: Optional[str]
+    ) -> List[List[Rule]]:
+        if n == 0 or not self.rules:
+            return [[] for _ in range(n)]
+
+        packed = np.tile(self._condition_mask(condition), (n, 1))
+        for feature, index in self._index.items():
+            values = columns.get(feature)
+            packed &= index.lookup(np.full(n, np.nan) if values is None else values)
+
+        hits = np.unpackbits(packed, axis=1, count=len(self.rules)).astype(bool)
+        return [
+            sorted((self.rules[i] for i in np.flatnonzero(row)), key=lambda r: -r.priority)
+            for row in hits
+        ]
+
+    def match(self, patient: Mapping[str, Any], condition: Optional[str] = None) -> List[Rule]:
+        columns = {}
+        for feature in self.features:
+            value = _as_float(patient.get(feature))
+            columns[feature] = np.array([np.nan if value is None else value])
+        return self._match_columns(columns, 1, condition)[0]
+
+
+def group_by_category(rules: Iterable[Rule]) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {}
+    for rule in rules:
+        grouped.setdefault(rule.category, []).append(rule.text)
+    return grouped
+
+
+class RuleEngine:
+    """
+    Holds the active ``RuleSet``; reloads compile off to the side and swap it in.
+
+    Readers take a reference to the current rule set without locking, so a
+    reload (even a slow one over many files) never blocks requests. A rule
+    file that fails to compile leaves the previous rules active. Every
+    ``check_interval`` seconds (None: never) a read also checks the rule
+    files and starts a background reload when they changed.
+    """
+
+    def __init__(
+        self, paths: Optional[Sequence[str]] = None, check_interval: Optional[float] = RULES_CHECK_INTERVAL
+    ) -> None:
+        self.paths = list(paths) if paths is not None else [_default_rules_dir()]
+        self.check_interval = check_interval
+        self.last_error: Optional[str] = None
+        self._checked = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self._signature = self._files_signature()
+        self._ruleset = RuleSet.from_paths(self.paths)
+
+    @property
+    def ruleset(self) -> RuleSet:
+        self._check_files()
+        return self._ruleset
+
+    def _check_files(self) -> None:
+        if self.check_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            self.reload_if_changed()
+
+    def _files_signature(self) -> Tuple[Tuple[str, int], ...]:
+        signature = []
+        for path in rule_files(self.paths):
+            try:
+                signature.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(signature)
+
+    def reload(self) -> bool:
+        """Recompile now (in the calling thread) and swap; False if compiling failed."""
+        with self._reload_lock:
+            signature = self._files_signature()
+            try:
+                ruleset = RuleSet.from_paths(self.paths)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️  Rule reload failed, keeping {len(self._ruleset)} active rules: {e}")
+                return False
+            self._ruleset = ruleset
+            self._signature = signature
+            self.last_error = None
+            return True
+
+    def reload_async(self) -> threading.Thread:
+        """Recompile in a background thread; requests keep using the old rules meanwhile."""
+        thread = threading.Thread(target=self.reload, name="rules-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def reload_if_changed(self) -> Optional[threading.Thread]:
+        """Start a background reload when rule files were added, removed or modified."""
+        if self._reload_lock.locked() or self._files_signature() == self._signature:
+            return None
+        return self.reload_async()
+
+    def match(self, patient: Mapping[str, Any], condition: Optional[str] = None) -> List[Rule]:
+        return self.ruleset.match(patient, condition)
+
+    def match_batch(self, patients: Any, condition: Optional[str] = None) -> List[List[Rule]]:
+        return self.ruleset.match_batch(patients, condition)
+
+
+def _default_rules_dir() -> str:
+    try:
+        rules_dir = get_settings().rules_dir or DEFAULT_RULES_DIR
+    except Exception:
+        rules_dir = DEFAULT_RULES_DIR
+    return rules_dir if os.path.isabs(rules_dir) else os.path.join(get_project_root(), rules_dir)
+
+
+_default_engine: Optional[RuleEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """Process-wide rule engine over the configured rules directory."""
+    global _default_engine
+    if _default_engine is None:
+        with _default_engine_lock:
+            if _default_engine is None:
+                _default_engine = RuleEngine()
+    return _default_engine
@@ -0,0 +1,109 @@
+"""
+Geographic helpers for the hospital finders: great-circle distance (scalar
+and vectorized), nearest-first ranking and geohash tiles.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_INDEX = {c: i for i, c in enumerate(_GEOHASH_ALPHABET)}
+
+# Metres per degree of latitude / of longitude at the equator
+_M_PER_DEG_LAT = 110_574.0
+_M_PER_DEG_LNG = 111_320.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_many(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+    """Great-circle distances in metres from one point to many, in one NumPy pass"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=float))
+    dlmb = np.radians(np.asarray(lngs, dtype=float) - lng)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def nearest_order(distances: Sequence[float], k: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the ``k`` smallest distances, nearest first (all when k is None).
+
+    Uses ``argpartition`` so only the selected k are sorted: O(n + k log k).
+    NaN distances sort last.
+    """
+    distances = np.asarray(distances, dtype=float)
+    n = len(distances)
+    if k is None or k >= n:
+        return np.argsort(distances, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=int)
+    top = np.argpartition(distances, k - 1)[:k]
+    # Ties keep input order, so the result equals the first k of a full stable sort
+    return top[np.lexsort((top, distances[top]))]
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 6) -> str:
+    """Geohash of a point with ``precision`` characters"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        code = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (code >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_center(geohash: str) -> Tuple[float, float]:
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def geohash_half_diagonal_m(precision: int) -> float:
+    """Upper bound (at the equator) of the distance from a cell's center to its corner"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    height = 180.0 / 2 ** lat_bits * _M_PER_DEG_LAT
+    width = 360.0 / 2 ** lng_bits * _M_PER_DEG_LNG
+    return math.hypot(height, width) / 2
@@ -0,0 +1,301 @@
+"""
+Geo-tiled cache for hospital lookups.
+
+A query (lat, lng, radius) is mapped to a radius bucket (the next larger of
+``RADIUS_BUCKETS``) and to the geohash tile containing the point, at the
+coarsest precision whose tile is small relative to the bucket. The cached
+value is the raw facility set within ``bucket + tile half-diagonal`` of the
+tile center, which covers the search circle of every point in the tile, so
+nearby users share one upstream request and are answered by filtering the
+tile locally.
+
+Entries expire after a TTL and the number of tiles is bounded (least
+recently used tiles are evicted). An expired tile is kept until it is
+refetched: if the upstream request fails (e.g. the Overpass circuit is
+open) the stale tile is served instead of an error. The default backend is in memory;
+``SQLiteTileBackend`` keeps tiles across restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.services.geo import geohash_center, geohash_encode, geohash_half_diagonal_m, haversine_many
+
+
+RADIUS_BUCKETS = (1000, 2000, 5000, 10000, 25000, 50000)
+
+Facility = Dict[str, Any]
+FetchFn = Callable[[float, float, int], List[Facility]]
+
+
+def _precision_for(bucket: int) -> int:
+    """Coarsest geohash precision whose tile half-diagonal is at most half the bucket"""
+    precision = 1
+    while geohash_half_diagonal_m(precision) > bucket / 2:
+        precision += 1
+    return precision
+
+
+_BUCKET_PRECISION = {bucket: _precision_for(bucket) for bucket in RADIUS_BUCKETS}
+
+
+@dataclass(frozen=True)
+class TileKey:
+    geohash: str
+    bucket: int
+
+    def __str__(self) -> str:
+        return f"{self.geohash}:{self.bucket}"
+
+    @property
+    def fetch_radius_m(self) -> int:
+        """Radius around the tile center that covers every query in the tile"""
+        return int(self.bucket + geohash_half_diagonal_m(len(self.geohash))) + 1
+
+
+def tile_key(lat: float, lng: float, radius_m: float) -> Optional[TileKey]:
+    """Cache key for a query, or None when the radius exceeds the largest bucket"""
+    for bucket in RADIUS_BUCKETS:
+        if radius_m <= bucket:
+            return TileKey(geohash_encode(lat, lng, _BUCKET_PRECISION[bucket]), bucket)
+    return None
+
+
+def within_radius(facilities: Sequence[Facility], lat: float, lng: float, radius_m: float) -> List[Facility]:
+    """Facilities (with ``lat``/``lng`` keys) within ``radius_m`` of the point, in input order"""
+    if not facilities:
+        return []
+    inside = haversine_many(lat, lng, [f["lat"] for f in facilities], [f["lng"] for f in facilities]) <= radius_m
+    return [f for f, keep in zip(facilities, inside.tolist()) if keep]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+    bypassed: int = 0
+    stale: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "bypassed": self.bypassed,
+            "stale": self.stale,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class MemoryTileBackend:
+    """In-process LRU of (stored_at, facilities) per tile"""
+
+    def __init__(self) -> None:
+        self._tiles: "OrderedDict[str, Tuple[float, List[Facility]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[float, List[Facility]]]:
+        entry = self._tiles.get(key)
+        if entry is not None:
+            self._tiles.move_to_end(key)
+        return entry
+
+    def put(self, key: str, stored_at: float, facilities: List[Facility]) -> None:
+        self._tiles[key] = (stored_at, facilities)
+        self._tiles.move_to_end(key)
+
+    def delete(self, key: str) -> None:
+        self._tiles.pop(key, None)
+
+    def evict(self, max_entries: int) -> int:
+        evicted = 0
+        while len(self._tiles) > max_entries:
+            self._tiles.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        self._tiles.clear()
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+
+class SQLiteTileBackend:
+    """Tiles in a SQLite file, so the cache survives restarts"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS osm_tiles ("
+            " key TEXT PRIMARY KEY, stored_at REAL, accessed_at REAL, facilities TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[float, List[Facility]]]:
+        row = self._conn.execute(
+            "SELECT stored_at, facilities FROM osm_tiles WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE osm_tiles SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, stored_at: float, facilities: List[Facility]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO osm_tiles VALUES (?, ?, ?, ?)",
+            (key, stored_at, time.time(), json.dumps(facilities)),
+        )
+        self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM osm_tiles WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def evict(self, max_entries: int) -> int:
+        excess = len(self) - max_entries
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM osm_tiles WHERE key IN"
+            " (SELECT key FROM osm_tiles ORDER BY accessed_at LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        return excess
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM osm_tiles")
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM osm_tiles").fetchone()[0]
+
+
+class GeoTileCache:
+    """
+    TTL + size-bounded cache of raw facility sets per (geohash tile, radius bucket).
+
+    Args:
+        ttl_seconds: age after which a tile is fetched again
+        max_entries: tiles kept before least recently used ones are evicted
+        backend: ``MemoryTileBackend`` (default) or ``SQLiteTileBackend``
+        clock: time source (seconds), injectable for tests
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 512,
+        backend: Any = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend if backend is not None else MemoryTileBackend()
+        self.clock = clock
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+
+    def _lookup(self, key: str, count_expired: bool = True) -> Optional[List[Facility]]:
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is None:
+                return None
+            stored_at, facilities = entry
+            if self.clock() - stored_at > self.ttl_seconds:
+                # Kept (not deleted) as a fallback until the refetch succeeds
+                if count_expired:
+                    self.stats.expired += 1
+                return None
+            return facilities
+
+    def _stale(self, key: str) -> Optional[List[Facility]]:
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is None:
+                return None
+            self.stats.stale += 1
+            return entry[1]
+
+    def get_or_fetch(
+        self, lat: float, lng: float, radius_m: float, fetch: FetchFn, bypass_fetch: Optional[FetchFn] = None
+    ) -> List[Facility]:
+        """
+        Facilities within ``radius_m`` of the point, from the cached tile or
+        by calling ``fetch(lat, lng, radius_m)`` for the tile and caching it.
+        If the fetch raises and an expired copy of the tile exists, that copy
+        is used.
+
+        Radii above the largest bucket are not cached; they are answered by
+        ``bypass_fetch`` (default ``fetch``), which may return a subset.
+        """
+        key = tile_key(lat, lng, radius_m)
+        if key is None:
+            with self._lock:
+                self.stats.bypassed += 1
+            return within_radius((bypass_fetch or fetch)(lat, lng, int(radius_m)), lat, lng, radius_m)
+
+        name = str(key)
+        facilities = self._lookup(name)
+        if facilities is None:
+            with self._lock:
+                fetch_lock = self._fetch_locks.setdefault(name, threading.Lock())
+            # One upstream request per tile; concurrent callers wait for it
+            with fetch_lock:
+                try:
+                    facilities = self._lookup(name, count_expired=False)
+                    if facilities is None:
+                        center_lat, center_lng = geohash_center(key.geohash)
+                        try:
+                            facilities = fetch(center_lat, center_lng, key.fetch_radius_m)
+                        except Exception:
+                            stale = self._stale(name)
+                            if stale is None:
+                                raise
+                            return within_radius(stale, lat, lng, radius_m)
+                        with self._lock:
+                            self.stats.misses += 1
+                            self.backend.put(name, self.clock(), facilities)
+                            self.stats.evictions += self.backend.evict(self.max_entries)
+                        return within_radius(facilities, lat, lng, radius_m)
+                finally:
+                    # Dropped on success and failure alike, so failing tiles do not pile up
+                    with self._lock:
+                        self._fetch_locks.pop(name, None)
+        with self._lock:
+            self.stats.hits += 1
+        return within_radius(facilities, lat, lng, radius_m)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.backend.clear()
+            self.stats = CacheStats()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats.as_dict(), tiles=len(self.backend), ttl_seconds=self.ttl_seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.backend)
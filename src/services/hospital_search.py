@@ -0,0 +1,270 @@
+"""
+Multi-backend hospital search for ``/hospitals``.
+
+Three strategies over the OpenStreetMap and Google Maps backends
+(``maps.hedging`` in config.yaml, overridable per request):
+
+- ``fallback``: the primary backend, then the other one if it fails
+  (latency is the sum of both when the primary is slow to fail)
+- ``hedged``: the primary; if it has not answered within the hedge delay (a
+  quantile of its recorded latencies, 95th by default) the other backend is
+  fired too and the first good answer wins. A primary that fails early
+  triggers the other backend at once.
+- ``parallel``: both at once; results are merged, treating entries within
+  ``merge_distance_m`` with matching names as the same facility.
+
+The losing call is cancelled when it has not started yet; a request already
+in flight cannot be interrupted, so its result is discarded (its latency is
+still recorded). Every call's latency goes into a per-backend histogram,
+reported in ``/health``, from which the hedge delay is derived.
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.services.geo import haversine_many
+from src.utils import get_settings
+from src.utils.metrics import LatencyHistogram
+from src.utils.settings import build_settings
+
+OSM, GOOGLE = "openstreetmap", "google_maps"
+SOURCE_NAMES = {OSM: "OpenStreetMap", GOOGLE: "Google Maps"}
+MODES = ("fallback", "hedged", "parallel")
+
+Hospitals = List[Dict[str, Any]]
+
+
+class NoMapServiceError(RuntimeError):
+    """Raised when every backend failed; ``errors`` maps backend name to its error"""
+
+    def __init__(self, errors: Dict[str, Exception]) -> None:
+        self.errors = errors
+        super().__init__("; ".join(f"{SOURCE_NAMES[name]} failed: {e}" for name, e in errors.items()))
+
+
+_histograms: Dict[str, LatencyHistogram] = {OSM: LatencyHistogram(), GOOGLE: LatencyHistogram()}
+
+
+def _search_osm(lat: float, lng: float, disease: str, radius: int, k: Optional[int]) -> Hospitals:
+    from src.services.osm_maps import find_hospitals_nearby_osm, format_osm_results_for_api, nearest_hospitals_osm
+
+    # k-nearest comes straight from the offline index when it covers the search radius
+    hospitals_raw = nearest_hospitals_osm(lat, lng, disease, k, radius_m=radius) if k else None
+    if hospitals_raw is None:
+        hospitals_raw = find_hospitals_nearby_osm(lat, lng, disease, radius, limit=k)
+    return format_osm_results_for_api(hospitals_raw)
+
+
+def _search_google(lat: float, lng: float, disease: str, radius: int, k: Optional[int]) -> Hospitals:
+    from src.services.maps import find_hospitals_nearby
+
+    return find_hospitals_nearby(lat, lng, disease, radius, limit=k)
+
+
+BACKENDS: Dict[str, Callable[..., Hospitals]] = {OSM: _search_osm, GOOGLE: _search_google}
+
+
+def _timed(name: str, submitted: float, *args: Any) -> Hospitals:
+    """Run backend ``name``; its latency counts from ``submitted``, so pool queueing is included"""
+    histogram = _histograms[name]
+    try:
+        result = BACKENDS[name](*args)
+    except Exception:
+        histogram.record_error()
+        raise
+    histogram.record(time.perf_counter() - submitted)
+    return result
+
+
+def _settings() -> Any:
+    try:
+        return get_settings().maps.hedging
+    except RuntimeError:
+        return build_settings({}).maps.hedging
+
+
+def hedge_delay(name: str, cfg: Any = None) -> float:
+    """Seconds to wait for ``name`` before hedging: its latency quantile, clamped"""
+    cfg = cfg if cfg is not None else _settings()
+    histogram = _histograms[name]
+    if histogram.count < cfg.min_samples:
+        return cfg.default_delay
+    return min(cfg.max_delay, max(cfg.min_delay, histogram.quantile(cfg.quantile)))
+
+
+def latency_metrics() -> Dict[str, Any]:
+    """Per-backend latency histograms and current hedge delays (for /health)"""
+    cfg = _settings()
+    return {name: dict(h.as_dict(), hedge_delay=round(hedge_delay(name, cfg), 4)) for name, h in _histograms.items()}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(cfg: Any) -> ThreadPoolExecutor:
+    """Thread pool shared by hedged and parallel searches (``maps.hedging.workers``)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, cfg.workers), thread_name_prefix="hospital-search")
+    return _executor
+
+
+def _submit(executor: ThreadPoolExecutor, name: str, args: tuple) -> Future:
+    return executor.submit(_timed, name, time.perf_counter(), *args)
+
+
+def _normalize_name(name: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def _same_name(a: str, b: str) -> bool:
+    if not a or not b:
+        return False
+    if a == b or a in b or b in a:
+        return True
+    return difflib.SequenceMatcher(None, a, b).ratio() >= 0.8
+
+
+def _coords(hospital: Dict[str, Any]) -> Tuple[float, float]:
+    location = hospital.get("location") or hospital
+    return location.get("lat", float("nan")), location.get("lng", float("nan"))
+
+
+def merge_hospitals(primary: Hospitals, secondary: Hospitals, max_distance_m: float = 150.0) -> Hospitals:
+    """
+    Union of two result lists; a secondary entry within ``max_distance_m`` of
+    a primary one with a matching (normalized, fuzzy) name is a duplicate.
+    Duplicates keep the primary entry, taking the rating from the secondary
+    when the primary has none. Ordered nearest first.
+    """
+    merged = [dict(h) for h in primary]
+    coords = [_coords(h) for h in primary]
+    lats, lngs = [c[0] for c in coords], [c[1] for c in coords]
+    names = [_normalize_name(h.get("name")) for h in primary]
+    for hospital in secondary:
+        match = None
+        if primary:
+            lat, lng = _coords(hospital)
+            distances = haversine_many(lat, lng, lats, lngs)
+            name = _normalize_name(hospital.get("name"))
+            match = next(
+                (i for i in distances.argsort().tolist()
+                 if distances[i] <= max_distance_m and _same_name(name, names[i])),
+                None,
+            )
+        if match is None:
+            merged.append(dict(hospital))
+        elif merged[match].get("rating") is None and hospital.get("rating") is not None:
+            merged[match]["rating"] = hospital["rating"]
+            merged[match]["user_ratings_total"] = hospital.get("user_ratings_total")
+    return sorted(merged, key=lambda h: (h.get("distance_km") is None, h.get("distance_km") or 0.0))
+
+
+def _fallback(order: Sequence[str], args: tuple) -> Tuple[Hospitals, str]:
+    errors: Dict[str, Exception] = {}
+    for name in order:
+        try:
+            return _timed(name, time.perf_counter(), *args), SOURCE_NAMES[name]
+        except Exception as e:
+            print(f"⚠️  {SOURCE_NAMES[name]} failed: {e}")
+            errors[name] = e
+    raise NoMapServiceError(errors)
+
+
+def _hedged(order: Sequence[str], args: tuple, cfg: Any) -> Tuple[Hospitals, str]:
+    primary, secondary = order
+    executor = _get_executor(cfg)
+    futures: Dict[Future, str] = {_submit(executor, primary, args): primary}
+    deadline = time.monotonic() + cfg.timeout_seconds
+
+    done, _ = wait(futures, timeout=hedge_delay(primary, cfg))
+    if not done:
+        print(f"⏱️  {SOURCE_NAMES[primary]} slower than hedge delay; also asking {SOURCE_NAMES[secondary]}")
+    if not done or next(iter(done)).exception() is not None:
+        futures[_submit(executor, secondary, args)] = secondary
+
+    errors: Dict[str, Exception] = {}
+    empty: Optional[Tuple[Hospitals, str]] = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            name = futures[future]
+            if future.exception() is not None:
+                errors[name] = future.exception()
+            elif future.result():
+                for loser in pending:
+                    loser.cancel()  # only effective if it has not started
+                return future.result(), SOURCE_NAMES[name]
+            elif empty is None:
+                empty = (future.result(), SOURCE_NAMES[name])  # wait for a non-empty answer
+    if empty is not None:
+        return empty
+    for future in pending:
+        future.cancel()
+        errors.setdefault(futures[future], TimeoutError(f"no answer within {cfg.timeout_seconds:g}s"))
+    raise NoMapServiceError(errors)
+
+
+def _parallel(order: Sequence[str], args: tuple, cfg: Any) -> Tuple[Hospitals, str]:
+    executor = _get_executor(cfg)
+    futures = {name: _submit(executor, name, args) for name in order}
+    wait(futures.values(), timeout=cfg.timeout_seconds)
+
+    results: Dict[str, Hospitals] = {}
+    errors: Dict[str, Exception] = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            errors[name] = TimeoutError(f"no answer within {cfg.timeout_seconds:g}s")
+        elif future.exception() is not None:
+            errors[name] = future.exception()
+        else:
+            results[name] = future.result()
+    if not results:
+        raise NoMapServiceError(errors)
+
+    names = [name for name in order if name in results]
+    hospitals = results[names[0]]
+    for name in names[1:]:
+        hospitals = merge_hospitals(hospitals, results[name], cfg.merge_distance_m)
+    return hospitals, "+".join(SOURCE_NAMES[name] for name in names)
+
+
+def search_hospitals(
+    lat: float, lng: float, disease: str, radius: int = 5000, k: Optional[int] = None, mode: Optional[str] = None,
+) -> Tuple[Hospitals, str]:
+    """
+    Hospitals for ``disease`` near (lat, lng) and the source that answered
+    (both names joined by "+" for merged results).
+
+    ``mode`` is one of ``MODES`` (default ``maps.hedging.mode``). Raises
+    ValueError for an unknown mode and ``NoMapServiceError`` when no backend
+    produced an answer.
+    """
+    cfg = _settings()
+    mode = mode or cfg.mode
+    if mode not in MODES:
+        raise ValueError(f"Invalid mode '{mode}'. Use one of: {', '.join(MODES)}")
+    order = (cfg.primary, GOOGLE if cfg.primary == OSM else OSM)
+    args = (lat, lng, disease, radius, k)
+    if mode == "hedged":
+        hospitals, source = _hedged(order, args, cfg)
+    elif mode == "parallel":
+        hospitals, source = _parallel(order, args, cfg)
+    else:
+        hospitals, source = _fallback(order, args)
+    return hospitals[:k] if k else hospitals, source
@@ -0,0 +1,286 @@
+"""
+Shared HTTP layer for the map backends (Overpass, Google Places).
+
+Each named backend gets one pooled ``requests.Session``, so repeated lookups
+reuse keep-alive TCP/TLS connections instead of opening one per call, with
+its own connect/read timeouts and bounded retries (full-jitter exponential
+backoff) for transient failures: connection errors, timeouts, 429 and 5xx.
+
+A circuit breaker guards every backend. After ``failure_threshold``
+consecutive failed calls it opens and calls fail immediately with
+``CircuitOpenError`` for ``reset_seconds``, so callers go straight to their
+fallback (Google Maps, a cached tile, the offline index) instead of waiting
+out the timeout on every request. Then a single trial call is let through;
+its outcome closes the circuit or opens it again.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils import get_settings
+from src.utils.settings import build_settings
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker (closed → open → half-open).
+
+    Args:
+        failure_threshold: consecutive failures that open the circuit
+            (0 disables the breaker: the circuit never opens)
+        reset_seconds: time the circuit stays open before a trial call
+        clock: monotonic time source, injectable for tests
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.failure_threshold = max(0, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.opened = 0
+        self.rejected = 0
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def _current(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_running = False
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current()
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now (at most one trial while half-open)"""
+        with self._lock:
+            state = self._current()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            state = self._current()
+            if not self.failure_threshold:
+                return
+            if state == self.HALF_OPEN or (state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+                self._trial_running = False
+                self.opened += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current(),
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class BackendSession:
+    """
+    Pooled session, retry policy and circuit breaker for one backend.
+
+    Args:
+        name: backend name (used in errors and metrics)
+        connect_timeout / read_timeout: per-attempt timeouts in seconds
+        retries: extra attempts after a transient failure
+        backoff_seconds: base delay; attempt ``n`` waits up to ``base * 2**n``
+        failure_threshold / reset_seconds: circuit breaker settings
+        pool_size: keep-alive connections kept per host
+        clock / sleep: injectable for tests
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        retries: int = 2,
+        backoff_seconds: float = 0.5,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        pool_size: int = 10,
+        max_backoff_seconds: float = 8.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.name = name
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = max(0, retries)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.sleep = sleep
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds, clock)
+
+        self.session = requests.Session()
+        # Retries are handled here (with jitter), not by urllib3
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, name: str, cfg: Any, **kwargs: Any) -> "BackendSession":
+        """Session from a ``BackendSettings`` entry"""
+        return cls(
+            name,
+            connect_timeout=cfg.connect_timeout,
+            read_timeout=cfg.read_timeout,
+            retries=cfg.retries,
+            backoff_seconds=cfg.backoff_seconds,
+            failure_threshold=cfg.failure_threshold,
+            reset_seconds=cfg.reset_seconds,
+            pool_size=cfg.pool_size,
+            **kwargs,
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                setattr(self, key, getattr(self, key) + delta)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: concurrent callers do not retry in lockstep
+        return random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} is failing; circuit open, request skipped")
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        ``requests``-style call through the pool.
+
+        Non-retryable responses (including 4xx) are returned as is. Raises
+        ``CircuitOpenError`` while the circuit is open, otherwise the last
+        error after the retries (``HTTPError`` for 429/5xx responses).
+        """
+        self._admit()
+        self._count(calls=1)
+        kwargs.setdefault("timeout", self.timeout)
+        error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count(retried=1)
+                self.sleep(self._backoff(attempt - 1))
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                continue
+            except requests.RequestException as e:  # not transient: no retry
+                error = e
+                break
+            if response.status_code not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+            error = requests.HTTPError(
+                f"{response.status_code} {response.reason} from {self.name}", response=response
+            )
+        self._count(failures=1)
+        self.breaker.record_failure()
+        raise error
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run ``fn`` under the circuit breaker, for clients that do their own
+        HTTP and retries over ``self.session`` (e.g. ``googlemaps.Client``).
+        Any exception counts as a failed call.
+        """
+        self._admit()
+        self._count(calls=1)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._count(failures=1)
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {"calls": self.calls, "failures": self.failures, "retries": self.retried}
+        return dict(counts, circuit=self.breaker.as_dict())
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_backends: Dict[str, BackendSession] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str) -> BackendSession:
+    """Process-wide session for ``name``, configured from ``maps.backends``."""
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                try:
+                    backends = get_settings().maps.backends
+                except RuntimeError:
+                    backends = build_settings({}).maps.backends
+                cfg = backends.get(name)
+                backend = BackendSession.from_settings(name, cfg) if cfg is not None else BackendSession(name)
+                _backends[name] = backend
+    return backend
+
+
+def backend_metrics() -> Dict[str, Any]:
+    """Metrics of every backend used so far (for /health)"""
+    with _backends_lock:
+        backends = list(_backends.values())
+    return {b.name: b.metrics() for b in backends}
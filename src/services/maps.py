@@ -1,10 +1,24 @@
+"""
+Google Maps Places search for hospitals.
+
+The keyword queries of a condition run concurrently on a shared client and
+thread pool, each following ``next_page_token`` up to ``maps.places.max_pages``
+pages; results are merged and deduplicated by ``place_id`` as pages arrive,
+so a search takes about as long as its slowest keyword.
+"""
+
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
 import googlemaps
 
-from src.utils import load_config
+from src.services.geo import haversine_many, nearest_order
+from src.services.http_client import get_backend
+from src.utils import get_settings
 
 
 CONDITION_TO_KEYWORDS = {
@@ -14,36 +28,144 @@ CONDITION_TO_KEYWORDS = {
 }
 
 
-def find_hospitals_nearby(lat: float, lng: float, condition: str, radius_m: int = 5000, config_path: str | None = None) -> List[Dict[str, Any]]:
-    cfg = load_config() if config_path is None else load_config(config_path)
-    api_key = cfg["api"]["google_maps_api_key"]
+def rank_places_by_distance(
+    places: List[Dict[str, Any]], lat: float, lng: float, k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Add ``distance_km`` to Places results and order them nearest first (top ``k`` only if given)"""
+    locations = [p.get("location") or {} for p in places]
+    distances = haversine_many(
+        lat, lng,
+        [loc.get("lat", float("nan")) for loc in locations],
+        [loc.get("lng", float("nan")) for loc in locations],
+    )
+    ranked = []
+    for i in nearest_order(distances, k):
+        place = dict(places[i])
+        place["distance_km"] = round(float(distances[i]) / 1000, 2) if distances[i] == distances[i] else None
+        ranked.append(place)
+    return ranked
+
+
+_clients: Dict[str, googlemaps.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def get_gmaps_client(api_key: str) -> googlemaps.Client:
+    """
+    Shared ``googlemaps.Client`` per API key, on the pooled ``google_places``
+    session (keep-alive connections, per-backend timeouts).
+    """
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                backend = get_backend("google_places")
+                client = googlemaps.Client(
+                    key=api_key,
+                    connect_timeout=backend.connect_timeout,
+                    read_timeout=backend.read_timeout,
+                    # googlemaps retries 5xx itself; bound the total time spent
+                    retry_timeout=int(sum(backend.timeout) * (backend.retries + 1)),
+                    requests_session=backend.session,
+                )
+                _clients[api_key] = client
+    return client
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all Places searches (``maps.places.workers``)"""
+    global _executor
+    if _executor is None:
+        with _clients_lock:
+            if _executor is None:
+                try:
+                    workers = get_settings().maps.places.workers
+                except RuntimeError:
+                    workers = 8
+                _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="places")
+    return _executor
+
+
+def _place_result(p: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": p.get("name"),
+        "rating": p.get("rating"),
+        "user_ratings_total": p.get("user_ratings_total"),
+        "address": p.get("vicinity"),
+        "place_id": p.get("place_id"),
+        "location": p.get("geometry", {}).get("location", {}),
+    }
+
+
+def _next_page(gmaps: googlemaps.Client, token: str, delay: float, attempts: int = 3) -> Dict[str, Any]:
+    """Page for ``token``; a token is only valid a short while after it is issued"""
+    for attempt in range(attempts):
+        time.sleep(delay)
+        try:
+            return gmaps.places_nearby(page_token=token)
+        except googlemaps.exceptions.ApiError as e:
+            if e.status != "INVALID_REQUEST" or attempt == attempts - 1:
+                raise
+    raise RuntimeError("unreachable")
+
+
+def _search_keyword(
+    gmaps: googlemaps.Client, lat: float, lng: float, radius_m: int, keyword: str,
+    max_pages: int, page_token_delay: float, on_page: Callable[[List[Dict[str, Any]]], None],
+) -> int:
+    """Run one keyword query, handing each page to ``on_page``; returns the pages fetched"""
+    # Fails fast with CircuitOpenError while Google is failing
+    backend = get_backend("google_places")
+    page = backend.call(gmaps.places_nearby, location=(lat, lng), radius=radius_m, keyword=keyword, type="hospital")
+    on_page(page.get("results", []))
+    pages = 1
+    while page.get("next_page_token") and pages < max_pages:
+        page = backend.call(_next_page, gmaps, page["next_page_token"], page_token_delay)
+        on_page(page.get("results", []))
+        pages += 1
+    return pages
+
+
+def find_hospitals_nearby(
+    lat: float, lng: float, condition: str, radius_m: int = 5000, config_path: str | None = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    settings = get_settings() if config_path is None else get_settings(config_path)
+    api_key = settings.google_maps_api_key.get()
     
     # Check if API key is actually set
-    if not api_key or api_key.startswith("${"):
+    if not api_key:
         raise ValueError("Google Maps API key not configured. Please set GOOGLE_MAPS_API_KEY environment variable.")
     
-    gmaps = googlemaps.Client(key=api_key)
+    gmaps = get_gmaps_client(api_key)
+    places_cfg = settings.maps.places
 
-    keywords = CONDITION_TO_KEYWORDS.get(condition.lower(), ["hospital"])
-    results: List[Dict[str, Any]] = []
-    for keyword in keywords:
-        places = gmaps.places_nearby(location=(lat, lng), radius=radius_m, keyword=keyword, type="hospital")
-        for p in places.get("results", []):
-            results.append({
-                "name": p.get("name"),
-                "rating": p.get("rating"),
-                "user_ratings_total": p.get("user_ratings_total"),
-                "address": p.get("vicinity"),
-                "place_id": p.get("place_id"),
-                "location": p.get("geometry", {}).get("location", {}),
-            })
-
-    # Deduplicate by place_id and sort by rating desc then ratings count
-    unique = {}
-    for r in results:
-        unique[r["place_id"]] = r
-    deduped = list(unique.values())
-    deduped.sort(key=lambda x: (x.get("rating", 0) or 0, x.get("user_ratings_total", 0) or 0), reverse=True)
-    return deduped
+    # Deduplicate by place_id as pages arrive (first occurrence wins)
+    unique: Dict[Any, Dict[str, Any]] = {}
+    merge_lock = threading.Lock()
 
+    def merge(results: List[Dict[str, Any]]) -> None:
+        with merge_lock:
+            for p in results:
+                place = _place_result(p)
+                unique.setdefault(place["place_id"], place)
+
+    keywords = CONDITION_TO_KEYWORDS.get(condition.lower(), ["hospital"])
+    futures = [
+        _get_executor().submit(
+            _search_keyword, gmaps, lat, lng, radius_m, keyword,
+            places_cfg.max_pages, places_cfg.page_token_delay, merge,
+        )
+        for keyword in keywords
+    ]
+    for future in futures:
+        future.result()  # re-raises the first failed query
 
+    # Rank nearest first, like the OSM results
+    with merge_lock:
+        places = list(unique.values())
+    return rank_places_by_distance(places, lat, lng, limit)
@@ -1,72 +1,317 @@
+"""
+Emergency (SOS) notifications over SMS (Twilio) and email (SMTP).
+
+``send_sos`` notifies every emergency contact at once. A dispatch creates
+one Twilio client, on a pooled keep-alive session shared across dispatches,
+and opens one authenticated SMTP session. All contacts share both. SMS go
+out concurrently. Emails are sent back to back over the single SMTP
+connection, which is set up while the SMS are in flight. Each channel has
+its own timeout (``services.notify``). The result reports, per contact, the
+outcome, the error if any, and the time from dispatch start to acceptance
+by the provider.
+
+``send_sms_batch`` and ``send_email_batch`` send prepared messages the same
+way for the durable outbox (``src.services.outbox``).
+"""
+
 from __future__ import annotations
 
-import os
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from email.mime.text import MIMEText
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.services.http_client import BackendSession
+from src.utils import get_settings
+from src.utils.settings import Settings
+
+
+def _settings(config_path: str | None) -> Settings:
+    return get_settings() if config_path is None else get_settings(config_path)
+
+
+class TwilioSMS:
+    """
+    Twilio Messages REST API client over a shared pooled session.
+    ``timeout`` (seconds to read the response) overrides the session's.
+    """
+
+    def __init__(
+        self, account_sid: str, auth_token: str, from_number: str, session: BackendSession,
+        api_base: str = "https://api.twilio.com", timeout: Optional[float] = None,
+    ) -> None:
+        self.account_sid = account_sid
+        self.from_number = from_number
+        self.timeout = session.timeout if timeout is None else (session.connect_timeout, timeout)
+        self.url = f"{api_base}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self._auth = (account_sid, auth_token)
+        self._session = session
+
+    def send(self, to_number: str, body: str) -> Optional[str]:
+        """Queue one SMS; returns the Twilio message sid. Raises RuntimeError if rejected."""
+        response = self._session.post(
+            self.url, data={"To": to_number, "From": self.from_number, "Body": body}, auth=self._auth,
+            timeout=self.timeout,
+        )
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("message")
+            except ValueError:
+                detail = response.text[:200]
+            raise RuntimeError(f"Twilio rejected SMS to {to_number} ({response.status_code}): {detail}")
+        return response.json().get("sid")
+
+
+class SMTPSession:
+    """
+    One SMTP connection (STARTTLS and login when configured) used for all
+    emails of a dispatch; sends are serialized, as SMTP requires.
+    """
+
+    def __init__(
+        self, host: str, port: int, from_email: str, username: Optional[str] = None,
+        password: Optional[str] = None, starttls: bool = True, timeout: float = 15.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.from_email = from_email
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._server: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+
+    def open(self) -> "SMTPSession":
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        return self
+
+    def send(self, to_email: str, subject: str, body: str) -> None:
+        msg = MIMEText(body)
+        msg["Subject"] = subject
+        msg["From"] = self.from_email
+        msg["To"] = to_email
+        with self._lock:
+            if self._server is None:
+                raise RuntimeError("SMTP session is not open")
+            self._server.sendmail(self.from_email, [to_email], msg.as_string())
+
+    def close(self) -> None:
+        with self._lock:
+            server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    def __enter__(self) -> "SMTPSession":
+        return self.open()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+_twilio_session: Optional[BackendSession] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
 
-try:
-    from twilio.rest import Client as TwilioClient
-except Exception:  # Twilio may not be installed; handle gracefully
-    TwilioClient = None  # type: ignore
 
-from src.utils import load_config
+def _twilio_backend() -> BackendSession:
+    """
+    Keep-alive session for Twilio. No retries, so an SMS is never sent twice,
+    and no circuit breaker: every emergency SMS is attempted, whatever the
+    outcome of earlier ones. The read timeout is set per dispatch.
+    """
+    global _twilio_session
+    if _twilio_session is None:
+        with _lock:
+            if _twilio_session is None:
+                _twilio_session = BackendSession("twilio", retries=0, failure_threshold=0)
+    return _twilio_session
 
 
-def _env_or_value(value: str | None) -> str | None:
-    if not value:
+def _get_executor(workers: int) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sos")
+    return _executor
+
+
+def twilio_client(settings: Settings) -> Optional[TwilioSMS]:
+    """Twilio client for a dispatch, or None when Twilio is not configured"""
+    tw = settings.services.twilio
+    account_sid = tw.account_sid.get()
+    auth_token = tw.auth_token.get()
+    from_number = tw.from_number.get()
+    if not (account_sid and auth_token and from_number):
+        return None
+    cfg = settings.services.notify
+    return TwilioSMS(
+        account_sid, auth_token, from_number, _twilio_backend(), cfg.twilio_api_base, timeout=cfg.sms_timeout
+    )
+
+
+def smtp_session(settings: Settings) -> Optional[SMTPSession]:
+    """Unopened SMTP session for a dispatch, or None when SMTP is not configured"""
+    smtp_cfg = settings.services.smtp
+    host = smtp_cfg.host.get()
+    from_email = smtp_cfg.from_email.get()
+    if not (host and from_email):
         return None
-    if value.startswith("${") and value.endswith("}"):
-        return os.environ.get(value[2:-1])
-    return value
-
-
-def _send_sms_twilio(to_number: str, message: str, config_path: str | None = None) -> bool:
-    cfg = load_config(config_path)
-    tw = cfg["services"]["twilio"]
-    account_sid = _env_or_value(tw.get("account_sid"))
-    auth_token = _env_or_value(tw.get("auth_token"))
-    from_number = tw.get("from_number")
-    if not (TwilioClient and account_sid and auth_token and from_number):
-        return False
-    client = TwilioClient(account_sid, auth_token)
-    client.messages.create(from_=from_number, to=to_number, body=message)
-    return True
-
-
-def _send_email_smtp(to_email: str, subject: str, body: str, config_path: str | None = None) -> bool:
-    cfg = load_config(config_path)
-    smtp_cfg = cfg["services"]["smtp"]
-    host = smtp_cfg.get("host")
-    port = int(smtp_cfg.get("port", 587))
-    username = _env_or_value(smtp_cfg.get("username"))
-    password = _env_or_value(smtp_cfg.get("password"))
-    from_email = smtp_cfg.get("from_email")
-    if not (host and port and username and password and from_email):
-        return False
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = from_email
-    msg["To"] = to_email
-    with smtplib.SMTP(host, port) as server:
-        server.starttls()
-        server.login(username, password)
-        server.sendmail(from_email, [to_email], msg.as_string())
-    return True
-
-
-def send_sos(summary: str, config_path: str | None = None) -> Dict[str, Any]:
-    cfg = load_config(config_path)
-    contacts = cfg["services"].get("emergency_contacts", [])
-    results = []
-    for c in contacts:
-        sms_ok = False
-        email_ok = False
-        if c.get("phone"):
-            sms_ok = _send_sms_twilio(c["phone"], summary, config_path=config_path)
-        if c.get("email"):
-            email_ok = _send_email_smtp(c["email"], "Emergency Alert", summary, config_path=config_path)
-        results.append({"contact": c, "sms": sms_ok, "email": email_ok})
-    return {"sent": results}
+    cfg = settings.services.notify
+    return SMTPSession(
+        host, smtp_cfg.port_number(), from_email, smtp_cfg.username.get(), smtp_cfg.password.get(),
+        starttls=cfg.smtp_starttls, timeout=cfg.email_timeout,
+    )
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _send_sms(sms: TwilioSMS, to_number: str, body: str, start: float) -> float:
+    sms.send(to_number, body)
+    return _elapsed_ms(start)
+
+
+def _send_emails(
+    session: SMTPSession, recipients: Sequence[Tuple[int, str]], subject: str, body: str,
+    start: float, outcomes: Dict[int, Tuple[bool, Optional[str], Optional[float]]],
+) -> None:
+    """Open the session and send to each recipient in turn, recording outcomes as they complete"""
+    try:
+        session.open()
+    except Exception as e:
+        for i, _ in recipients:
+            outcomes[i] = (False, f"SMTP connection failed: {e}", None)
+        return
+    try:
+        for i, to_email in recipients:
+            try:
+                session.send(to_email, subject, body)
+                outcomes[i] = (True, None, _elapsed_ms(start))
+            except (smtplib.SMTPException, OSError) as e:
+                outcomes[i] = (False, str(e), None)
+    finally:
+        session.close()
+
+
+def send_sms_batch(messages: Sequence[Tuple[str, str]], settings: Optional[Settings] = None) -> List[Optional[str]]:
+    """
+    Send ``(to_number, body)`` pairs concurrently with one Twilio client.
+    Returns one error per message (None when accepted); never raises.
+    """
+    settings = settings if settings is not None else _settings(None)
+    sms = twilio_client(settings)
+    if sms is None:
+        return ["Twilio not configured"] * len(messages)
+    executor = _get_executor(settings.services.notify.workers)
+    futures = [executor.submit(sms.send, to_number, body) for to_number, body in messages]
+    errors: List[Optional[str]] = []
+    for future in futures:
+        try:
+            future.result()  # bounded by the session's connect/read timeouts
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e))
+    return errors
+
+
+def send_email_batch(
+    messages: Sequence[Tuple[str, str, str]], settings: Optional[Settings] = None
+) -> List[Optional[str]]:
+    """
+    Send ``(to_email, subject, body)`` triples over one SMTP session.
+    Returns one error per message (None when accepted); never raises.
+    """
+    settings = settings if settings is not None else _settings(None)
+    session = smtp_session(settings)
+    if session is None:
+        return ["SMTP not configured"] * len(messages)
+    try:
+        session.open()
+    except Exception as e:
+        return [f"SMTP connection failed: {e}"] * len(messages)
+    errors: List[Optional[str]] = []
+    try:
+        for to_email, subject, body in messages:
+            try:
+                session.send(to_email, subject, body)
+                errors.append(None)
+            except (smtplib.SMTPException, OSError) as e:
+                errors.append(str(e))
+    finally:
+        session.close()
+    return errors
+
+
+def send_sos(summary: str, config_path: str | None = None, subject: str = "Emergency Alert") -> Dict[str, Any]:
+    """
+    Notify all emergency contacts by SMS and email, concurrently.
+
+    Returns ``{"sent": [...], "elapsed_ms": ...}`` with one entry per contact:
+    ``sms`` / ``email`` (True when accepted by the provider), ``timings_ms``
+    per channel and ``errors`` per failed channel. Provider errors and
+    timeouts are reported there instead of raised.
+    """
+    settings = _settings(config_path)
+    contacts = settings.services.emergency_contacts
+    cfg = settings.services.notify
+    sms = twilio_client(settings)
+    smtp = smtp_session(settings)
+    executor = _get_executor(cfg.workers)
+    start = time.perf_counter()
+
+    sms_futures = {
+        i: executor.submit(_send_sms, sms, c.phone, summary, start)
+        for i, c in enumerate(contacts) if c.phone and sms is not None
+    }
+    email_outcomes: Dict[int, Tuple[bool, Optional[str], Optional[float]]] = {}
+    recipients = [(i, c.email) for i, c in enumerate(contacts) if c.email]
+    email_future = (
+        executor.submit(_send_emails, smtp, recipients, subject, summary, start, email_outcomes)
+        if recipients and smtp is not None else None
+    )
+
+    results: List[Dict[str, Any]] = [
+        {"contact": c.to_dict(), "sms": False, "email": False, "timings_ms": {}, "errors": {}} for c in contacts
+    ]
+    for i, future in sms_futures.items():
+        try:
+            results[i]["timings_ms"]["sms"] = future.result(
+                timeout=max(0.0, start + cfg.sms_timeout - time.perf_counter())
+            )
+            results[i]["sms"] = True
+        except FutureTimeoutError:
+            results[i]["errors"]["sms"] = f"timed out after {cfg.sms_timeout:g}s"
+        except Exception as e:
+            results[i]["errors"]["sms"] = str(e)
 
+    if email_future is not None:
+        try:
+            email_future.result(timeout=max(0.0, start + cfg.email_timeout - time.perf_counter()))
+        except FutureTimeoutError:
+            pass
+        for i, _ in recipients:
+            ok, error, ms = email_outcomes.get(i, (False, f"timed out after {cfg.email_timeout:g}s", None))
+            results[i]["email"] = ok
+            if ok:
+                results[i]["timings_ms"]["email"] = ms
+            else:
+                results[i]["errors"]["email"] = error
 
+    return {"sent": results, "elapsed_ms": _elapsed_ms(start)}
@@ -0,0 +1,307 @@
+"""
+Offline hospital index built from a local OpenStreetMap extract.
+
+``build_index`` reads an extract (``.osm``/``.xml``, ``.pbf`` via the optional
+``osmium`` package, or a pre-exported ``.geojson``), keeps
+``amenity=hospital|clinic|doctors`` nodes and ways (ways by the mean of their
+node coordinates) and writes a compact ``.npz`` facility table.
+The extract's bounding box is stored with the table; ``FacilityIndex`` loads
+it into a BallTree with the haversine metric for radius and k-nearest
+queries, so hospital searches whose radius lies inside that box need no
+network access.
+
+Usage:
+    python -m src.services.osm_index extract.osm.pbf data/osm/facilities.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from src.services.geo import EARTH_RADIUS_M
+
+try:
+    import osmium
+except Exception:  # pyosmium is optional; only needed for .pbf extracts
+    osmium = None  # type: ignore
+
+
+MEDICAL_AMENITIES = ("hospital", "clinic", "doctors")
+
+Facility = Dict[str, Any]
+
+# (min_lat, min_lng, max_lat, max_lng)
+Bounds = Tuple[float, float, float, float]
+
+
+def _is_medical(tags: Dict[str, str]) -> bool:
+    return tags.get("amenity") in MEDICAL_AMENITIES
+
+
+def _xml_elements(path: str) -> Iterator[ET.Element]:
+    """Top-level node/way elements, cleared after use to keep memory flat"""
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag in ("node", "way"):
+            yield elem
+            elem.clear()
+        elif elem.tag == "relation":
+            elem.clear()
+
+
+def _xml_tags(elem: ET.Element) -> Dict[str, str]:
+    return {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+
+
+def read_osm_xml(path: str) -> List[Facility]:
+    """
+    Medical facilities from an OSM XML extract.
+
+    Two passes: the first collects the medical ways' node references, the
+    second keeps only those node coordinates, so memory scales with the
+    facilities rather than with the extract.
+    """
+    way_refs: Dict[int, List[int]] = {}
+    way_tags: Dict[int, Dict[str, str]] = {}
+    for elem in _xml_elements(path):
+        if elem.tag == "way":
+            tags = _xml_tags(elem)
+            if _is_medical(tags):
+                way_id = int(elem.get("id"))
+                way_refs[way_id] = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                way_tags[way_id] = tags
+
+    needed: Set[int] = {ref for refs in way_refs.values() for ref in refs}
+    coords: Dict[int, Tuple[float, float]] = {}
+    facilities: List[Facility] = []
+    for elem in _xml_elements(path):
+        if elem.tag != "node":
+            continue
+        node_id = int(elem.get("id"))
+        lat, lng = float(elem.get("lat")), float(elem.get("lon"))
+        if node_id in needed:
+            coords[node_id] = (lat, lng)
+        tags = _xml_tags(elem)
+        if _is_medical(tags):
+            facilities.append({"osm_type": "node", "osm_id": node_id, "lat": lat, "lng": lng, "tags": tags})
+
+    for way_id, refs in way_refs.items():
+        points = [coords[ref] for ref in refs if ref in coords]
+        if points:
+            lat, lng = np.mean(points, axis=0)
+            facilities.append({
+                "osm_type": "way", "osm_id": way_id, "lat": float(lat), "lng": float(lng), "tags": way_tags[way_id],
+            })
+    return facilities
+
+
+def read_osm_pbf(path: str) -> List[Facility]:
+    """Medical facilities from a PBF extract (requires ``pip install osmium``)"""
+    if osmium is None:
+        raise RuntimeError("Reading .pbf extracts requires the 'osmium' package (pip install osmium)")
+
+    facilities: List[Facility] = []
+
+    class _Handler(osmium.SimpleHandler):
+        def node(self, n: Any) -> None:
+            tags = {t.k: t.v for t in n.tags}
+            if _is_medical(tags) and n.location.valid():
+                facilities.append({
+                    "osm_type": "node", "osm_id": n.id, "lat": n.location.lat, "lng": n.location.lon, "tags": tags,
+                })
+
+        def way(self, w: Any) -> None:
+            tags = {t.k: t.v for t in w.tags}
+            if not _is_medical(tags):
+                return
+            points = [(nd.lat, nd.lon) for nd in w.nodes if nd.location.valid()]
+            if points:
+                lat, lng = np.mean(points, axis=0)
+                facilities.append({
+                    "osm_type": "way", "osm_id": w.id, "lat": float(lat), "lng": float(lng), "tags": tags,
+                })
+
+    _Handler().apply_file(path, locations=True)
+    return facilities
+
+
+def read_geojson(path: str) -> List[Facility]:
+    """
+    Medical facilities from a GeoJSON export (e.g. osmtogeojson or ogr2ogr).
+
+    Feature ids like ``node/123`` (or an ``@id`` property) give the OSM
+    reference; polygons are reduced to the mean of their outer ring.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    facilities: List[Facility] = []
+    for i, feature in enumerate(data.get("features", [])):
+        props = feature.get("properties") or {}
+        tags = {k: str(v) for k, v in (props.get("tags") or props).items() if not k.startswith("@")}
+        geometry = feature.get("geometry") or {}
+        if not _is_medical(tags) or not geometry:
+            continue
+        if geometry["type"] == "Point":
+            lng, lat = geometry["coordinates"][:2]
+        elif geometry["type"] in ("Polygon", "MultiPolygon"):
+            ring = geometry["coordinates"][0] if geometry["type"] == "Polygon" else geometry["coordinates"][0][0]
+            lng, lat = np.mean(np.asarray(ring, dtype=float)[:, :2], axis=0)
+        else:
+            continue
+        ref = str(feature.get("id") or props.get("@id") or f"node/{i}")
+        osm_type, _, osm_id = ref.rpartition("/")
+        facilities.append({
+            "osm_type": osm_type or "node",
+            "osm_id": int(osm_id) if osm_id.isdigit() else i,
+            "lat": float(lat),
+            "lng": float(lng),
+            "tags": tags,
+        })
+    return facilities
+
+
+def read_extract(path: str) -> List[Facility]:
+    """Medical facilities from an extract, by file extension"""
+    lower = path.lower()
+    if lower.endswith(".pbf"):
+        return read_osm_pbf(path)
+    if lower.endswith((".geojson", ".json")):
+        return read_geojson(path)
+    if lower.endswith((".osm", ".xml")):
+        return read_osm_xml(path)
+    raise ValueError(f"Unsupported extract format: {path} (use .osm/.xml, .pbf or .geojson)")
+
+
+def read_extract_bounds(path: str) -> Optional[Bounds]:
+    """
+    Bounding box the extract declares (``<bounds>``, the PBF header box or a
+    GeoJSON ``bbox``), or None when it declares none.
+    """
+    lower = path.lower()
+    if lower.endswith((".osm", ".xml")):
+        for _, elem in ET.iterparse(path, events=("start",)):
+            if elem.tag == "bounds":
+                return (float(elem.get("minlat")), float(elem.get("minlon")),
+                        float(elem.get("maxlat")), float(elem.get("maxlon")))
+            if elem.tag in ("node", "way", "relation"):
+                return None  # <bounds> precedes the data
+        return None
+    if lower.endswith((".geojson", ".json")):
+        with open(path, "r") as f:
+            bbox = json.load(f).get("bbox")
+        return (float(bbox[1]), float(bbox[0]), float(bbox[3]), float(bbox[2])) if bbox else None
+    if lower.endswith(".pbf") and osmium is not None:
+        reader = osmium.io.Reader(path, osmium.osm.osm_entity_bits.NOTHING)
+        try:
+            box = reader.header().box()
+        finally:
+            reader.close()
+        if box.valid():
+            return (box.bottom_left.lat, box.bottom_left.lon, box.top_right.lat, box.top_right.lon)
+    return None
+
+
+def save_facilities(facilities: List[Facility], out_path: str, bounds: Optional[Bounds] = None) -> str:
+    """Write the facility table: coordinate arrays, one JSON blob of ids and tags, and the extract bounds"""
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    records = [[f["osm_type"], f["osm_id"], f["tags"]] for f in facilities]
+    arrays = {}
+    if bounds is not None:
+        arrays["bounds"] = np.array(bounds, dtype=np.float64)
+    np.savez_compressed(
+        out_path,
+        lat=np.array([f["lat"] for f in facilities], dtype=np.float64),
+        lng=np.array([f["lng"] for f in facilities], dtype=np.float64),
+        records=np.frombuffer(json.dumps(records, separators=(",", ":")).encode("utf-8"), dtype=np.uint8),
+        **arrays,
+    )
+    return out_path
+
+
+def build_index(extract_path: str, out_path: str) -> int:
+    """Ingest ``extract_path`` into the facility table at ``out_path``; returns the facility count"""
+    facilities = read_extract(extract_path)
+    save_facilities(facilities, out_path, bounds=read_extract_bounds(extract_path))
+    return len(facilities)
+
+
+class FacilityIndex:
+    """BallTree (haversine) over facility coordinates for radius and k-nearest queries"""
+
+    def __init__(self, facilities: List[Facility], bounds: Optional[Bounds] = None) -> None:
+        self.facilities = facilities
+        self.lat = np.array([f["lat"] for f in facilities], dtype=np.float64)
+        self.lng = np.array([f["lng"] for f in facilities], dtype=np.float64)
+        self._tree = BallTree(np.radians(np.column_stack([self.lat, self.lng])), metric="haversine") if facilities else None
+        # Extracts without declared bounds fall back to the facilities' own box
+        if bounds is not None:
+            self.bounds: Optional[Bounds] = tuple(float(b) for b in bounds)  # type: ignore[assignment]
+        elif facilities:
+            self.bounds = (float(self.lat.min()), float(self.lng.min()), float(self.lat.max()), float(self.lng.max()))
+        else:
+            self.bounds = None
+
+    @classmethod
+    def load(cls, path: str) -> "FacilityIndex":
+        with np.load(path) as data:
+            records = json.loads(data["records"].tobytes().decode("utf-8"))
+            lat, lng = data["lat"], data["lng"]
+            facilities = [
+                {"osm_type": osm_type, "osm_id": osm_id, "lat": float(la), "lng": float(ln), "tags": tags}
+                for (osm_type, osm_id, tags), la, ln in zip(records, lat, lng)
+            ]
+            bounds = tuple(data["bounds"]) if "bounds" in data.files else None
+        return cls(facilities, bounds)
+
+    def covers(self, lat: float, lng: float, radius_m: float = 0.0) -> bool:
+        """Whether the circle of ``radius_m`` around the point lies inside the extract's bounding box"""
+        if self.bounds is None:
+            return False
+        min_lat, min_lng, max_lat, max_lng = self.bounds
+        dlat = np.degrees(radius_m / EARTH_RADIUS_M)
+        dlng = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        return min_lat + dlat <= lat <= max_lat - dlat and min_lng + dlng <= lng <= max_lng - dlng
+
+    def _point(self, lat: float, lng: float) -> np.ndarray:
+        return np.radians([[lat, lng]])
+
+    def within(self, lat: float, lng: float, radius_m: float) -> List[Facility]:
+        """Facilities within ``radius_m``, nearest first"""
+        if self._tree is None:
+            return []
+        ind, dist = self._tree.query_radius(
+            self._point(lat, lng), r=radius_m / EARTH_RADIUS_M, return_distance=True, sort_results=True
+        )
+        return [self.facilities[i] for i in ind[0]]
+
+    def nearest(self, lat: float, lng: float, k: int = 10) -> List[Tuple[Facility, float]]:
+        """The ``k`` nearest facilities with their distance in metres"""
+        if self._tree is None:
+            return []
+        dist, ind = self._tree.query(self._point(lat, lng), k=min(k, len(self.facilities)))
+        return [(self.facilities[i], float(d * EARTH_RADIUS_M)) for i, d in zip(ind[0], dist[0])]
+
+    def __len__(self) -> int:
+        return len(self.facilities)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the offline hospital index from an OSM extract")
+    parser.add_argument("extract", help="OSM extract (.osm/.xml, .pbf or .geojson)")
+    parser.add_argument("output", help="Facility table to write (.npz)")
+    args = parser.parse_args()
+
+    print(f"🗺️  Reading {args.extract}...")
+    count = build_index(args.extract, args.output)
+    print(f"✅ Indexed {count} medical facilities -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
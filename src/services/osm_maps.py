@@ -1,12 +1,32 @@
 """
 OpenStreetMap (OSM) integration for finding nearby hospitals and medical facilities.
 Uses Overpass API - completely free, no API key required.
+
+Overpass responses are cached per geohash tile and radius bucket (see
+``src.services.geo_cache``), so nearby searches are answered locally. When
+an offline index built from an OSM extract is configured (``maps.offline_index``,
+see ``src.services.osm_index``) searches inside the extract never reach
+Overpass, which becomes the fallback. Overpass itself is reached through a
+pooled session with retries and a circuit breaker (``src.services.http_client``):
+while it is failing, requests fail fast and stale cached tiles are served.
 """
 
-from typing import Any, Dict, List
+import heapq
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
 import requests
 import time
 
+from src.services.geo import haversine_m, haversine_many, nearest_order
+from src.services.http_client import CircuitOpenError, get_backend
+from src.services.geo_cache import GeoTileCache, MemoryTileBackend, SQLiteTileBackend
+from src.services.osm_index import FacilityIndex
+from src.services.overpass_stream import iter_json_array
+from src.services.specialties import SpecialtyMatcher
+from src.utils import get_project_root, get_settings
+from src.utils.settings import build_settings
+
 
 CONDITION_TO_OSM_TAGS = {
     "diabetes": ["hospital", "clinic", "doctors"],
@@ -20,9 +40,345 @@ CONDITION_TO_SPECIALTIES = {
     "kidney": ["nephrology", "kidney", "dialysis"],
 }
 
+# Compiled once; one regex scan per facility
+SPECIALTY_MATCHER = SpecialtyMatcher(CONDITION_TO_SPECIALTIES)
+
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+
+# Derived element Overpass emits after each distance ring (``make``)
+RING_MARKER = "ring_end"
+
+
+def _ring_radii(radius_m: int, rings: int) -> List[int]:
+    """Outer radii of ``rings`` equal-area rings (similar facility counts each)"""
+    return [max(1, int(round(radius_m * ((i + 1) / rings) ** 0.5))) for i in range(rings)]
+
+
+def build_overpass_query(lat: float, lng: float, radius_m: int, rings: int = 1) -> str:
+    """
+    Overpass QL for hospitals, clinics and doctors within ``radius_m``.
+
+    With ``rings > 1`` the results come ring by ring (nearest ring first),
+    each followed by a ``ring_end`` marker element, so a reader can stop once
+    the nearest facilities are known.
+    """
+    def around(r: int) -> str:
+        return "".join(
+            f'  {kind}["amenity"="{amenity}"](around:{r},{lat},{lng});\n'
+            for kind in ("node", "way") for amenity in ("hospital", "clinic", "doctors")
+        )
+
+    if rings <= 1:
+        return f"[out:json][timeout:25];\n(\n{around(radius_m)});\nout center tags;\n"
+
+    parts = ["[out:json][timeout:25];\n"]
+    for i, r in enumerate(_ring_radii(radius_m, rings), start=1):
+        parts.append(f"(\n{around(r)})->.disc;\n")
+        parts.append("(.disc; - .seen;)->.ring;\n" if i > 1 else "(.disc;)->.ring;\n")
+        parts.append(".ring out center tags;\n")
+        parts.append(f'make {RING_MARKER} ring="{i}", radius="{r}";\nout;\n')
+        parts.append("(.disc;)->.seen;\n")
+    return "".join(parts)
+
+
+def _facility_from_element(element: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Get coordinates (handle both node and way types)
+    if element["type"] == "node":
+        elem_lat = element.get("lat")
+        elem_lng = element.get("lon")
+    elif element["type"] == "way" and "center" in element:
+        elem_lat = element["center"].get("lat")
+        elem_lng = element["center"].get("lon")
+    else:
+        return None
+
+    if not elem_lat or not elem_lng:
+        return None
+
+    return {
+        "osm_type": element["type"],
+        "osm_id": element["id"],
+        "lat": elem_lat,
+        "lng": elem_lng,
+        "tags": element.get("tags", {}),
+    }
+
+
+def collect_facilities(
+    elements: Iterable[Dict[str, Any]], lat: float, lng: float,
+    max_results: Optional[int] = None, keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Facilities from a stream of Overpass elements, deduplicated by OSM id and
+    filtered by ``keep`` as they arrive.
+
+    Without ``max_results`` all of them are returned in stream order. With it
+    only the ``max_results`` nearest are kept (a bounded heap, nearest first),
+    and reading stops at the first ``ring_end`` marker whose radius is beyond
+    the farthest of them: later rings cannot hold anything nearer.
+    """
+    seen = set()
+    kept: List[Dict[str, Any]] = []
+    heap: List[tuple] = []  # (-distance, sequence, facility): farthest on top
+
+    for element in elements:
+        if element.get("type") == RING_MARKER:
+            radius = float(element.get("tags", {}).get("radius", "inf"))
+            if max_results and len(heap) >= max_results and -heap[0][0] <= radius:
+                break
+            continue
+        facility = _facility_from_element(element)
+        if facility is None:
+            continue
+        identity = (facility["osm_type"], facility["osm_id"])
+        if identity in seen or (keep is not None and not keep(facility)):
+            continue
+        seen.add(identity)
+        if not max_results:
+            kept.append(facility)
+            continue
+        distance = haversine_m(lat, lng, facility["lat"], facility["lng"])
+        entry = (-distance, len(seen), facility)
+        if len(heap) < max_results:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    if not max_results:
+        return kept
+    return [facility for _, _, facility in sorted(heap, key=lambda e: (-e[0], e[1]))]
+
+
+def fetch_osm_facilities(
+    lat: float, lng: float, radius_m: int, max_results: Optional[int] = None,
+    keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Raw medical facilities (hospital, clinic, doctors) within ``radius_m``
+    from the Overpass API, in response order; with ``max_results`` only the
+    nearest ones (see ``collect_facilities``), fetched ring by ring.
+
+    The response is parsed while it streams in, so it is never held whole.
+    Each facility has ``osm_type``, ``osm_id``, ``lat``, ``lng`` and ``tags``.
+    """
+    cfg = _overpass_settings()
+    rings = cfg.rings if max_results else 1
+    overpass_query = build_overpass_query(lat, lng, radius_m, rings)
+
+    # Pooled keep-alive session with retries, timeouts and a circuit breaker
+    response = get_backend("overpass").post(OVERPASS_URL, data={"data": overpass_query}, stream=True)
+    try:
+        response.raise_for_status()
+        elements = iter_json_array(response.iter_content(chunk_size=cfg.chunk_size))
+        return collect_facilities(elements, lat, lng, max_results, keep)
+    finally:
+        # Closing early drops the unread rest of the response
+        response.close()
+
+
+def _facility_result(facility: Dict[str, Any], distance: float) -> Dict[str, Any]:
+    """API-ready dict for one raw facility"""
+    tags = facility["tags"]
+
+    # Build address from OSM tags
+    address_parts = []
+    if "addr:housenumber" in tags:
+        address_parts.append(tags["addr:housenumber"])
+    if "addr:street" in tags:
+        address_parts.append(tags["addr:street"])
+    if "addr:city" in tags:
+        address_parts.append(tags["addr:city"])
+
+    address = ", ".join(address_parts) if address_parts else "Address not available"
+
+    return {
+        "name": tags.get("name", "Unnamed Medical Facility"),
+        "lat": facility["lat"],
+        "lng": facility["lng"],
+        "vicinity": address,
+        "place_id": f"osm_{facility['osm_type']}_{facility['osm_id']}",
+        "rating": None,  # OSM doesn't have ratings
+        "user_ratings_total": 0,
+        "amenity": tags.get("amenity", "medical"),
+        "healthcare": tags.get("healthcare", ""),
+        "specialty": tags.get("healthcare:speciality", ""),
+        "distance_meters": distance,
+        "phone": tags.get("phone", ""),
+        "website": tags.get("website", ""),
+        "opening_hours": tags.get("opening_hours", ""),
+    }
+
+
+def _specialty_texts(tags: Dict[str, str]) -> tuple:
+    return (
+        tags.get("name", "Unnamed Medical Facility"),
+        tags.get("healthcare:speciality", ""),
+        tags.get("healthcare", ""),
+    )
+
+
+def is_relevant(tags: Dict[str, str], condition: str) -> bool:
+    """Whether a facility suits ``condition``: general hospitals always do"""
+    # Conditions without specialty keywords are not filtered
+    if not SPECIALTY_MATCHER.has_condition(condition) or tags.get("amenity") == "hospital":
+        return True
+    return SPECIALTY_MATCHER.matches(condition, *_specialty_texts(tags))
+
+
+def select_facilities(
+    facilities: List[Dict[str, Any]], lat: float, lng: float, condition: str, k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Facilities relevant to ``condition`` as API-ready dicts, deduplicated by
+    name and sorted by great-circle distance from (lat, lng); only the ``k``
+    nearest when ``k`` is given.
+    """
+    # Distances for all candidates in one vectorized pass
+    distances = haversine_many(lat, lng, [f["lat"] for f in facilities], [f["lng"] for f in facilities])
+
+    results = []
+    seen_names = set()  # Deduplicate by name
+
+    for facility, distance in zip(facilities, distances.tolist()):
+        tags = facility["tags"]
+        name = tags.get("name", "Unnamed Medical Facility")
+
+        # Skip if we've already seen this name (duplicate)
+        if name in seen_names:
+            continue
+
+        # Filter by specialty; always include general hospitals
+        if not is_relevant(tags, condition):
+            continue
+
+        results.append(_facility_result(facility, distance))
+        seen_names.add(name)
+
+    # Nearest first (partial selection when only k are needed)
+    order = nearest_order([r["distance_meters"] for r in results], k)
+    return [results[i] for i in order]
+
+
+def screen_facilities(
+    facilities: List[Dict[str, Any]], lat: float, lng: float, conditions: Sequence[str], k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Combined screening: facilities relevant to any of ``conditions``, each
+    tagged in one scan with the matching ones under ``conditions``.
+
+    General hospitals are kept (as in ``select_facilities``) even without a
+    specialty match; deduplication and ordering are the same.
+    """
+    wanted = {c.lower() for c in conditions}
+    distances = haversine_many(lat, lng, [f["lat"] for f in facilities], [f["lng"] for f in facilities])
+
+    results = []
+    seen_names = set()
+    for facility, distance in zip(facilities, distances.tolist()):
+        tags = facility["tags"]
+        name = tags.get("name", "Unnamed Medical Facility")
+        if name in seen_names:
+            continue
+        matched = SPECIALTY_MATCHER.conditions(*_specialty_texts(tags)) & wanted
+        if not matched and tags.get("amenity") != "hospital":
+            continue
+        result = _facility_result(facility, distance)
+        result["conditions"] = sorted(matched)
+        results.append(result)
+        seen_names.add(name)
+
+    order = nearest_order([r["distance_meters"] for r in results], k)
+    return [results[i] for i in order]
+
+
+def _resolve_path(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(get_project_root(), path)
+
+
+_default_cache: Optional[GeoTileCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_osm_cache() -> Optional[GeoTileCache]:
+    """Process-wide tile cache from ``maps.osm_cache`` settings (None when disabled)."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                try:
+                    cfg = get_settings().maps.osm_cache
+                except RuntimeError:
+                    cfg = None
+                if cfg is not None and not cfg.enabled:
+                    return None
+                backend = MemoryTileBackend()
+                if cfg is not None and cfg.backend == "sqlite":
+                    path = _resolve_path(cfg.sqlite_path)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    backend = SQLiteTileBackend(path)
+                _default_cache = GeoTileCache(
+                    ttl_seconds=cfg.ttl_seconds if cfg else 3600.0,
+                    max_entries=cfg.max_entries if cfg else 512,
+                    backend=backend,
+                )
+    return _default_cache
+
+
+def _overpass_settings() -> Any:
+    try:
+        return get_settings().maps.overpass
+    except RuntimeError:
+        return build_settings({}).maps.overpass
+
+
+_offline_index: Optional[FacilityIndex] = None
+_offline_index_loaded = False
+
+
+def get_offline_index() -> Optional[FacilityIndex]:
+    """Facility index from ``maps.offline_index``, loaded once (None if not built)."""
+    global _offline_index, _offline_index_loaded
+    if not _offline_index_loaded:
+        with _default_cache_lock:
+            if not _offline_index_loaded:
+                try:
+                    path = get_settings().maps.offline_index
+                except RuntimeError:
+                    path = None
+                if path and os.path.exists(_resolve_path(path)):
+                    _offline_index = FacilityIndex.load(_resolve_path(path))
+                    print(f"🗺️  Offline hospital index loaded: {len(_offline_index)} facilities")
+                _offline_index_loaded = True
+    return _offline_index
+
+
+def nearest_hospitals_osm(
+    lat: float, lng: float, condition: str, k: int = 10, radius_m: int = 5000,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    The ``k`` nearest facilities within ``radius_m`` relevant to ``condition``
+    from the offline index, or None when no index covers the search circle.
+    """
+    index = get_offline_index()
+    if index is None or not index.covers(lat, lng, radius_m):
+        return None
+    # Widen the candidate set until k facilities survive the specialty filter
+    # or the candidates reach past the radius
+    candidates = k
+    while True:
+        nearest = index.nearest(lat, lng, candidates)
+        facilities = [f for f, distance in nearest if distance <= radius_m]
+        results = select_facilities(facilities, lat, lng, condition, k)
+        if len(results) >= k or len(facilities) < len(nearest) or candidates >= len(index):
+            return results
+        candidates *= 4
+
 
 def find_hospitals_nearby_osm(
-    lat: float, lng: float, condition: str, radius_m: int = 5000
+    lat: float, lng: float, condition: str, radius_m: int = 5000, use_cache: bool = True,
+    use_offline: bool = True, limit: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
     Find nearby hospitals using OpenStreetMap Overpass API.
@@ -33,126 +389,36 @@ def find_hospitals_nearby_osm(
         lng: Longitude
         condition: Disease type (diabetes, heart, kidney)
         radius_m: Search radius in meters (default 5000)
+        use_cache: answer from the geo-tiled cache when enabled
+        use_offline: answer from the offline index when it covers the point
+        limit: return only the nearest ``limit`` facilities
     
     Returns:
         List of hospitals with name, location, and other details
     """
-    
-    # Overpass API endpoint
-    overpass_url = "https://overpass-api.de/api/interpreter"
-    
-    # Get specialty keywords for filtering
-    specialties = CONDITION_TO_SPECIALTIES.get(condition.lower(), [])
-    
-    # Build Overpass QL query for medical facilities
-    # Search for hospitals, clinics, and doctors within radius
-    overpass_query = f"""
-    [out:json][timeout:25];
-    (
-      node["amenity"="hospital"](around:{radius_m},{lat},{lng});
-      node["amenity"="clinic"](around:{radius_m},{lat},{lng});
-      node["amenity"="doctors"](around:{radius_m},{lat},{lng});
-      way["amenity"="hospital"](around:{radius_m},{lat},{lng});
-      way["amenity"="clinic"](around:{radius_m},{lat},{lng});
-      way["amenity"="doctors"](around:{radius_m},{lat},{lng});
-    );
-    out center tags;
-    """
-    
     try:
-        response = requests.post(
-            overpass_url,
-            data={"data": overpass_query},
-            timeout=30
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        seen_names = set()  # Deduplicate by name
-        
-        for element in data.get("elements", []):
-            tags = element.get("tags", {})
-            name = tags.get("name", "Unnamed Medical Facility")
-            
-            # Skip if we've already seen this name (duplicate)
-            if name in seen_names:
-                continue
-            
-            # Get coordinates (handle both node and way types)
-            if element["type"] == "node":
-                elem_lat = element.get("lat")
-                elem_lng = element.get("lon")
-            elif element["type"] == "way" and "center" in element:
-                elem_lat = element["center"].get("lat")
-                elem_lng = element["center"].get("lon")
-            else:
-                continue
-            
-            if not elem_lat or not elem_lng:
-                continue
-            
-            # Build address from OSM tags
-            address_parts = []
-            if "addr:housenumber" in tags:
-                address_parts.append(tags["addr:housenumber"])
-            if "addr:street" in tags:
-                address_parts.append(tags["addr:street"])
-            if "addr:city" in tags:
-                address_parts.append(tags["addr:city"])
-            
-            address = ", ".join(address_parts) if address_parts else "Address not available"
-            
-            # Get facility type
-            amenity = tags.get("amenity", "medical")
-            healthcare = tags.get("healthcare", "")
-            specialty = tags.get("healthcare:speciality", "")
-            
-            # Filter by specialty if specified
-            if specialties:
-                name_lower = name.lower()
-                specialty_lower = specialty.lower() if specialty else ""
-                healthcare_lower = healthcare.lower() if healthcare else ""
-                
-                # Check if facility matches the specialty
-                is_match = any(
-                    spec.lower() in name_lower or 
-                    spec.lower() in specialty_lower or 
-                    spec.lower() in healthcare_lower
-                    for spec in specialties
-                )
-                
-                # Always include general hospitals
-                if not is_match and amenity != "hospital":
-                    continue
-            
-            # Calculate distance (approximate)
-            distance = calculate_distance(lat, lng, elem_lat, elem_lng)
-            
-            results.append({
-                "name": name,
-                "lat": elem_lat,
-                "lng": elem_lng,
-                "vicinity": address,
-                "place_id": f"osm_{element['type']}_{element['id']}",
-                "rating": None,  # OSM doesn't have ratings
-                "user_ratings_total": 0,
-                "amenity": amenity,
-                "healthcare": healthcare,
-                "specialty": specialty,
-                "distance_meters": distance,
-                "phone": tags.get("phone", ""),
-                "website": tags.get("website", ""),
-                "opening_hours": tags.get("opening_hours", ""),
-            })
-            
-            seen_names.add(name)
-        
-        # Sort by distance
-        results.sort(key=lambda x: x["distance_meters"])
-        
-        return results
+        index = get_offline_index() if use_offline else None
+        cache = get_osm_cache() if use_cache else None
+        # Uncached queries keep only the nearest relevant facilities while
+        # the response streams in (tiles are cached whole for every condition)
+        cap = _overpass_settings().max_results
+        max_results = min(limit, cap) if limit and cap else (limit or cap or None)
+
+        def fetch_nearest(lat: float, lng: float, radius_m: int) -> List[Dict[str, Any]]:
+            return fetch_osm_facilities(
+                lat, lng, radius_m, max_results, keep=lambda f: is_relevant(f["tags"], condition)
+            )
+
+        if index is not None and index.covers(lat, lng, radius_m):
+            facilities = index.within(lat, lng, radius_m)
+        elif cache is not None:
+            facilities = cache.get_or_fetch(lat, lng, radius_m, fetch_osm_facilities, bypass_fetch=fetch_nearest)
+        else:
+            facilities = fetch_nearest(lat, lng, radius_m)
+        return select_facilities(facilities, lat, lng, condition, limit)
     
+    except CircuitOpenError as e:
+        raise Exception(f"OpenStreetMap unavailable: {str(e)}")
     except requests.exceptions.RequestException as e:
         raise Exception(f"Failed to query OpenStreetMap: {str(e)}")
     except Exception as e:
@@ -161,16 +427,10 @@ def find_hospitals_nearby_osm(
 
 def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """
-    Calculate approximate distance between two points in meters.
-    Uses simple Euclidean distance (good enough for small distances).
+    Great-circle distance between two points in meters.
+    For many points at once use ``haversine_many``.
     """
-    from math import sqrt
-    
-    # Rough conversion: 1 degree ≈ 111,000 meters at equator
-    lat_diff = (lat2 - lat1) * 111000
-    lng_diff = (lng2 - lng1) * 111000 * 0.9  # Adjust for longitude
-    
-    return sqrt(lat_diff**2 + lng_diff**2)
+    return haversine_m(lat1, lng1, lat2, lng2)
 
 
 def format_osm_results_for_api(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
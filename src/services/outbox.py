@@ -0,0 +1,420 @@
+"""
+Durable outbox for SOS and alert notifications.
+
+``enqueue_sos`` writes one row per message (contact x channel) to a SQLite
+outbox and returns a tracking id at once; nothing is sent on the request
+path. A background ``OutboxDispatcher`` claims due messages in per-provider
+batches (one Twilio client / one SMTP session per batch, see
+``src.services.notify``) and marks each one sent, or reschedules it with
+exponential backoff and jitter until ``max_attempts`` is reached.
+
+Delivery is at least once:
+- A claim is a lease. A message whose dispatcher dies mid-send becomes due
+  again when the lease expires, also in another process.
+- A repeated request with the same idempotency key returns the original
+  tracking id and enqueues nothing.
+
+Settings live under ``services.outbox``.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from src.services.notify import send_email_batch, send_sms_batch, smtp_session, twilio_client
+from src.utils import get_project_root, get_settings
+from src.utils.metrics import LatencyHistogram
+from src.utils.settings import Settings, build_settings
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+CHANNELS = ("sms", "email")
+
+# Enqueue-to-provider-acceptance latency, seconds up to an hour of retries
+DELIVERY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+Message = Dict[str, Any]
+# Sends a batch of claimed messages; returns one error per message (None = sent)
+BatchSender = Callable[[List[Message]], List[Optional[str]]]
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS outbox_requests ("
+    " tracking_id TEXT PRIMARY KEY, idempotency_key TEXT UNIQUE, kind TEXT, created_at REAL)",
+    "CREATE TABLE IF NOT EXISTS outbox_messages ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT, tracking_id TEXT NOT NULL, kind TEXT,"
+    " channel TEXT NOT NULL, recipient TEXT NOT NULL, subject TEXT, body TEXT NOT NULL,"
+    " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL,"
+    " created_at REAL NOT NULL, sent_at REAL, last_error TEXT,"
+    " UNIQUE (tracking_id, channel, recipient))",
+    "CREATE INDEX IF NOT EXISTS outbox_due ON outbox_messages (status, channel, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS outbox_tracking ON outbox_messages (tracking_id)",
+)
+
+_COLUMNS = ("id", "tracking_id", "kind", "channel", "recipient", "subject", "body",
+            "status", "attempts", "next_attempt_at", "created_at", "sent_at", "last_error")
+
+
+class NoRecipientsError(RuntimeError):
+    """Raised when an alert has no contact reachable over a configured channel"""
+
+
+class Outbox:
+    """
+    SQLite-backed message queue.
+
+    Args:
+        path: database file (":memory:" for a process-local queue)
+        lease_seconds: how long a claimed message stays with its dispatcher
+            before it is handed out again
+        clock: wall-clock time source (tests pass a fake one)
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 120.0, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self.delivery_latency = LatencyHistogram(DELIVERY_BUCKETS)
+        self._lock = threading.Lock()
+        # Autocommit; writes take explicit IMMEDIATE transactions so that
+        # dispatchers in several processes never claim the same message
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(
+        self, messages: Sequence[Mapping[str, Any]], kind: str = "sos", idempotency_key: Optional[str] = None
+    ) -> Tuple[str, bool]:
+        """
+        Store ``messages`` (dicts with channel, recipient, body and optional
+        subject) under a new tracking id. Returns ``(tracking_id, duplicate)``;
+        a known ``idempotency_key`` returns its tracking id and stores nothing.
+
+        Raises ValueError for an empty list or an unknown channel.
+        """
+        if not messages:
+            raise ValueError("Nothing to enqueue: no messages")
+        for message in messages:
+            if message.get("channel") not in CHANNELS:
+                raise ValueError(f"Unknown channel {message.get('channel')!r}. Use one of: {', '.join(CHANNELS)}")
+        now = self.clock()
+        tracking_id = uuid.uuid4().hex
+
+        def insert(conn: sqlite3.Connection) -> Tuple[str, bool]:
+            if idempotency_key is not None:
+                row = conn.execute(
+                    "SELECT tracking_id FROM outbox_requests WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                if row is not None:
+                    return row[0], True
+            conn.execute(
+                "INSERT INTO outbox_requests (tracking_id, idempotency_key, kind, created_at) VALUES (?, ?, ?, ?)",
+                (tracking_id, idempotency_key, kind, now),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO outbox_messages"
+                " (tracking_id, kind, channel, recipient, subject, body, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(tracking_id, kind, m["channel"], m["recipient"], m.get("subject"), m["body"], PENDING, now, now)
+                 for m in messages],
+            )
+            return tracking_id, False
+
+        return self._transaction(insert)
+
+    def claim(self, channel: str, limit: int) -> List[Message]:
+        """
+        Lease up to ``limit`` due messages of one channel, oldest first.
+        Each claim counts as an attempt.
+        """
+        now = self.clock()
+
+        def lease(conn: sqlite3.Connection) -> List[Message]:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM outbox_messages"
+                " WHERE status IN (?, ?) AND channel = ? AND next_attempt_at <= ?"
+                " ORDER BY next_attempt_at, id LIMIT ?",
+                (PENDING, SENDING, channel, now, limit),
+            ).fetchall()
+            ids = [row[0] for row in rows]
+            conn.executemany(
+                "UPDATE outbox_messages SET status = ?, attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                [(SENDING, now + self.lease_seconds, i) for i in ids],
+            )
+            return [dict(zip(_COLUMNS, row), status=SENDING, attempts=row[8] + 1) for row in rows]
+
+        return self._transaction(lease)
+
+    def mark_sent(self, messages: Sequence[Message]) -> None:
+        now = self.clock()
+        self._transaction(lambda conn: conn.executemany(
+            "UPDATE outbox_messages SET status = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+            [(SENT, now, m["id"]) for m in messages],
+        ))
+        for m in messages:
+            self.delivery_latency.record(max(0.0, now - m["created_at"]))
+
+    def mark_failed(self, message: Message, error: str, retry_at: Optional[float]) -> None:
+        """Record a failed attempt; retry at ``retry_at`` or give up when it is None"""
+        status = PENDING if retry_at is not None else FAILED
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE outbox_messages SET status = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (status, retry_at if retry_at is not None else message["next_attempt_at"], error, message["id"]),
+        ))
+        if retry_at is None:
+            self.delivery_latency.record_error()
+
+    def status(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        """Delivery state of one enqueued request (None for an unknown tracking id)"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM outbox_messages WHERE tracking_id = ? ORDER BY id",
+                (tracking_id,),
+            ).fetchall()
+            known = rows or self._conn.execute(
+                "SELECT 1 FROM outbox_requests WHERE tracking_id = ?", (tracking_id,)
+            ).fetchone()
+        if not known:
+            return None
+        messages = [dict(zip(_COLUMNS, row)) for row in rows]
+        statuses = {m["status"] for m in messages}
+        if statuses & {PENDING, SENDING}:
+            state = PENDING
+        elif messages and statuses <= {SENT}:
+            state = "delivered"
+        else:
+            state = "partial" if SENT in statuses else FAILED
+        return {
+            "tracking_id": tracking_id,
+            "state": state,
+            "messages": [{
+                "channel": m["channel"],
+                "recipient": m["recipient"],
+                "status": PENDING if m["status"] == SENDING else m["status"],
+                "attempts": m["attempts"],
+                "last_error": m["last_error"],
+                "delivery_seconds": None if m["sent_at"] is None else round(m["sent_at"] - m["created_at"], 3),
+            } for m in messages],
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Backlog per channel and status, age of the oldest undelivered message, delivery latency"""
+        now = self.clock()
+        with self._lock:
+            counts = self._conn.execute(
+                "SELECT channel, status, COUNT(*) FROM outbox_messages GROUP BY channel, status"
+            ).fetchall()
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM outbox_messages WHERE status IN (?, ?)", (PENDING, SENDING)
+            ).fetchone()[0]
+            retried = self._conn.execute(
+                "SELECT COUNT(*) FROM outbox_messages WHERE attempts > 1"
+            ).fetchone()[0]
+        by_channel: Dict[str, Dict[str, int]] = {}
+        for channel, status, n in counts:
+            by_channel.setdefault(channel, {})[status] = n
+        backlog = sum(n for _, status, n in counts if status in (PENDING, SENDING))
+        return {
+            "backlog": backlog,
+            "oldest_pending_seconds": None if oldest is None else round(now - oldest, 3),
+            "retried_messages": retried,
+            "by_channel": by_channel,
+            "delivery_latency": self.delivery_latency.as_dict(),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxDispatcher:
+    """
+    Background thread draining an ``Outbox``: each round claims a batch per
+    channel and hands it to that channel's sender, channels in parallel.
+
+    Args:
+        outbox: queue to drain
+        senders: channel -> batch sender
+        batch_size: messages claimed per channel and round
+        max_attempts: attempts before a message is marked failed
+        base_backoff / max_backoff: retry ``n`` waits
+            ``min(max_backoff, base_backoff * 2 ** (n - 1))`` seconds,
+            scaled by a random factor in [0.5, 1] so retries do not align
+        poll_interval: idle wait between rounds; ``wake`` cuts it short
+    """
+
+    def __init__(
+        self, outbox: Outbox, senders: Mapping[str, BatchSender], batch_size: int = 50,
+        max_attempts: int = 8, base_backoff: float = 2.0, max_backoff: float = 300.0,
+        poll_interval: float = 1.0, rng: Optional[random.Random] = None,
+    ) -> None:
+        self.outbox = outbox
+        self.senders = dict(senders)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self._rng = rng or random.Random()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.senders)), thread_name_prefix="outbox")
+
+    @classmethod
+    def from_settings(cls, outbox: Outbox, senders: Mapping[str, BatchSender], cfg: Any) -> "OutboxDispatcher":
+        return cls(
+            outbox, senders, batch_size=cfg.batch_size, max_attempts=cfg.max_attempts,
+            base_backoff=cfg.base_backoff, max_backoff=cfg.max_backoff, poll_interval=cfg.poll_interval,
+        )
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return delay * self._rng.uniform(0.5, 1.0)
+
+    def _dispatch(self, channel: str, sender: BatchSender) -> int:
+        batch = self.outbox.claim(channel, self.batch_size)
+        if not batch:
+            return 0
+        try:
+            errors = list(sender(batch))
+            if len(errors) != len(batch):
+                raise RuntimeError(f"{channel} sender returned {len(errors)} results for {len(batch)} messages")
+        except Exception as e:
+            errors = [str(e) or type(e).__name__] * len(batch)
+        self.outbox.mark_sent([m for m, error in zip(batch, errors) if error is None])
+        now = self.outbox.clock()
+        for message, error in zip(batch, errors):
+            if error is not None:
+                retry_at = now + self.backoff(message["attempts"]) if message["attempts"] < self.max_attempts else None
+                self.outbox.mark_failed(message, error, retry_at)
+        return len(batch)
+
+    def run_once(self) -> int:
+        """One round over all channels; returns the number of messages attempted"""
+        futures = [self._pool.submit(self._dispatch, channel, sender) for channel, sender in self.senders.items()]
+        return sum(f.result() for f in futures)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                attempted = self.run_once()
+            except sqlite3.Error as e:
+                print(f"⚠️ Notification outbox error: {e}")
+                attempted = 0
+            if not attempted:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def wake(self) -> None:
+        """Start the next round now (called after an enqueue)"""
+        self._wake.set()
+
+    def start(self) -> "OutboxDispatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=False)
+
+
+def _sms_sender(batch: List[Message]) -> List[Optional[str]]:
+    return send_sms_batch([(m["recipient"], m["body"]) for m in batch])
+
+
+def _email_sender(batch: List[Message]) -> List[Optional[str]]:
+    return send_email_batch([(m["recipient"], m["subject"] or "", m["body"]) for m in batch])
+
+
+DEFAULT_SENDERS: Dict[str, BatchSender] = {"sms": _sms_sender, "email": _email_sender}
+
+
+def sos_messages(summary: str, settings: Settings, subject: str = "Emergency Alert") -> List[Message]:
+    """One message per emergency contact and configured channel"""
+    sms = twilio_client(settings) is not None
+    email = smtp_session(settings) is not None
+    messages: List[Message] = []
+    for contact in settings.services.emergency_contacts:
+        if sms and contact.phone:
+            messages.append({"channel": "sms", "recipient": contact.phone, "body": summary})
+        if email and contact.email:
+            messages.append({"channel": "email", "recipient": contact.email, "subject": subject, "body": summary})
+    return messages
+
+
+def _settings() -> Settings:
+    try:
+        return get_settings()
+    except RuntimeError:
+        return build_settings({})
+
+
+_outbox: Optional[Outbox] = None
+_dispatcher: Optional[OutboxDispatcher] = None
+_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """Process-wide outbox from ``services.outbox`` settings, with its dispatcher running"""
+    global _outbox, _dispatcher
+    if _outbox is None:
+        with _lock:
+            if _outbox is None:
+                cfg = _settings().services.outbox
+                path = cfg.path
+                if path != ":memory:":
+                    path = path if os.path.isabs(path) else os.path.join(get_project_root(), path)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                outbox = Outbox(path)
+                _dispatcher = OutboxDispatcher.from_settings(outbox, DEFAULT_SENDERS, cfg).start()
+                _outbox = outbox
+    return _outbox
+
+
+def enqueue_sos(
+    summary: str, idempotency_key: Optional[str] = None, subject: str = "Emergency Alert", kind: str = "sos"
+) -> Dict[str, Any]:
+    """
+    Queue ``summary`` for every emergency contact and return immediately with
+    ``{"tracking_id", "messages", "duplicate"}``.
+
+    Raises NoRecipientsError when no contact has a configured channel.
+    """
+    messages = sos_messages(summary, _settings(), subject)
+    if not messages:
+        raise NoRecipientsError("No notification channel/contact configured")
+    outbox = get_outbox()
+    tracking_id, duplicate = outbox.enqueue(messages, kind=kind, idempotency_key=idempotency_key)
+    if duplicate:
+        return {"tracking_id": tracking_id, "messages": len(outbox.status(tracking_id)["messages"]), "duplicate": True}
+    if _dispatcher is not None:
+        _dispatcher.wake()
+    return {"tracking_id": tracking_id, "messages": len(messages), "duplicate": False}
+
+
+def outbox_metrics() -> Optional[Dict[str, Any]]:
+    """Outbox metrics, or None before the first notification is queued"""
+    return _outbox.metrics() if _outbox is not None else None
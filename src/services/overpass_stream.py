@@ -0,0 +1,92 @@
+"""
+Incremental parsing of large JSON responses (Overpass ``elements``).
+
+``iter_json_array`` walks the top-level object of a byte stream and yields
+the items of one array member as soon as each is complete, so a multi-MB
+Overpass response is never held as a whole: the buffer only keeps the
+unparsed tail (at most one element plus one chunk). Items are decoded with
+the C-accelerated ``json`` scanner; consumers may stop iterating at any
+point, and the rest of the response is never read.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str = "elements") -> Iterator[Any]:
+    """
+    Items of the array ``key`` of a top-level JSON object read from UTF-8
+    ``chunks``. Yields nothing when the key is absent.
+
+    Raises ValueError on malformed or truncated input.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf, pos, eof = "", 0, False
+
+    def refill() -> None:
+        nonlocal buf, pos, eof
+        if eof:
+            raise ValueError("Truncated JSON stream")
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            chunk = b""
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            refill()
+
+    def expect(chars: str) -> str:
+        nonlocal pos
+        char = peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON stream, got {char!r}")
+        pos += 1
+        return char
+
+    def value() -> Any:
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # A value cut at the chunk edge may still parse (e.g. a number);
+                # in a valid document another character always follows it
+                if end < len(buf) or eof:
+                    pos = end
+                    return obj
+            except json.JSONDecodeError:
+                pass
+            refill()
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        name = value()
+        expect(":")
+        if name == key:
+            expect("[")
+            if peek() == "]":
+                return
+            while True:
+                yield value()
+                if expect(",]") == "]":
+                    return
+        value()
+        if expect(",}") == "}":
+            return
@@ -0,0 +1,71 @@
+"""
+Precompiled specialty keyword matching for facility filtering.
+
+Each condition's keywords are compiled once into a case-insensitive regex, so
+checking a facility is one scan over its name/speciality/healthcare text
+instead of a lowercase-and-``in`` test per field and keyword. A combined
+matcher tags a facility with every condition whose keywords occur, also in
+one scan: it tries the keyword alternation at every position (zero-width
+lookahead, longest keyword first) and credits each hit with the conditions
+of all keywords contained in it, which gives the same answer as independent
+substring tests even when keywords overlap.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional, Pattern, Sequence
+
+# Field separator for the scanned text; keywords never contain it
+_SEP = "\n"
+
+
+def _alternation(keywords: Iterable[str]) -> str:
+    # Longest first, so a keyword wins over its own prefixes
+    return "|".join(re.escape(k) for k in sorted(set(keywords), key=len, reverse=True))
+
+
+class SpecialtyMatcher:
+    """
+    Keyword matcher over ``{condition: [keywords]}``.
+
+    ``matches(condition, *texts)`` answers one condition with a single regex
+    search; ``conditions(*texts)`` returns all matching conditions at once.
+    """
+
+    def __init__(self, keywords_by_condition: Mapping[str, Sequence[str]]) -> None:
+        self.keywords = {c.lower(): tuple(k.lower() for k in kws) for c, kws in keywords_by_condition.items() if kws}
+        self._per_condition: Dict[str, Pattern[str]] = {
+            condition: re.compile(_alternation(kws), re.IGNORECASE)
+            for condition, kws in self.keywords.items()
+        }
+
+        owners: Dict[str, set] = {}
+        for condition, kws in self.keywords.items():
+            for keyword in kws:
+                owners.setdefault(keyword, set()).add(condition)
+        # A hit on a keyword also counts for every keyword it contains
+        self._implied: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(c for other, conds in owners.items() if other in keyword for c in conds)
+            for keyword in owners
+        }
+        self._combined: Optional[Pattern[str]] = (
+            re.compile(f"(?=({_alternation(owners)}))", re.IGNORECASE) if owners else None
+        )
+
+    def has_condition(self, condition: str) -> bool:
+        return condition.lower() in self._per_condition
+
+    def matches(self, condition: str, *texts: Optional[str]) -> bool:
+        """Whether any keyword of ``condition`` occurs in any of ``texts`` (False for unknown conditions)"""
+        pattern = self._per_condition.get(condition.lower())
+        return pattern is not None and pattern.search(_SEP.join(t for t in texts if t)) is not None
+
+    def conditions(self, *texts: Optional[str]) -> FrozenSet[str]:
+        """All conditions with a keyword in any of ``texts``"""
+        if self._combined is None:
+            return frozenset()
+        found: set = set()
+        for hit in self._combined.finditer(_SEP.join(t for t in texts if t)):
+            found |= self._implied.get(hit.group(1).lower(), frozenset())
+        return frozenset(found)
@@ -2,10 +2,16 @@
 Utility helpers for configuration loading, paths, and persistence.
 """
 
-from .config import load_config, get_project_root, ensure_dir
+from .config import load_config, get_config, reload_config, watch_config, get_project_root, ensure_dir
+from .settings import Settings, get_settings
 
 __all__ = [
     "load_config",
+    "get_config",
+    "reload_config",
+    "watch_config",
+    "Settings",
+    "get_settings",
     "get_project_root",
     "ensure_dir",
 ]
\ No newline at end of file
@@ -1,15 +1,13 @@
 import yaml
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
 
-def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
-    """
-    Load YAML configuration file with environment variable support.
-    
-    Environment variables can be used with ${VAR_NAME} syntax in the YAML file.
-    Falls back to template if main config doesn't exist.
-    """
+def _resolve_config_path(config_path: str, verbose: bool = True) -> str:
+    """Absolute path of the config file, falling back to the ``.template`` next to it."""
     root = get_project_root()
     full_path = os.path.join(root, config_path)
     
@@ -17,23 +15,42 @@ def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
     if not os.path.exists(full_path):
         template_path = full_path + ".template"
         if os.path.exists(template_path):
-            print(f"⚠️  Config file not found at {full_path}")
-            print(f"📋 Using template from {template_path}")
+            if verbose:
+                print(f"⚠️  Config file not found at {full_path}")
+                print(f"📋 Using template from {template_path}")
             full_path = template_path
         else:
             raise RuntimeError(f"Config file not found: {full_path}")
+    return full_path
+
+def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
+    """
+    Load YAML configuration file with environment variable support.
     
+    Environment variables can be used with ${VAR_NAME} syntax in the YAML file.
+    Falls back to template if main config doesn't exist.
+    
+    Every call re-reads the file and returns a fresh mutable dict; hot paths
+    should use ``get_config`` instead.
+    """
+    full_path = _resolve_config_path(config_path)
+    return _read_config_file(full_path)
+
+# libyaml's loader when PyYAML was built with it (several times faster)
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def _parse_config_file(full_path: str) -> Dict[str, Any]:
+    """Parsed YAML without environment substitution."""
     try:
         with open(full_path, "r") as file:
-            config = yaml.safe_load(file)
-        
-        # Replace environment variables
-        config = _replace_env_vars(config)
-        
-        return config
+            return yaml.load(file, Loader=_YAML_LOADER)
     except Exception as e:
         raise RuntimeError(f"Error loading config file: {e}")
 
+def _read_config_file(full_path: str) -> Dict[str, Any]:
+    # Replace environment variables
+    return _replace_env_vars(_parse_config_file(full_path))
+
 def _replace_env_vars(obj: Any) -> Any:
     """
     Recursively replace ${VAR_NAME} with environment variables.
@@ -51,6 +68,110 @@ def _replace_env_vars(obj: Any) -> Any:
     else:
         return obj
 
+# Process-wide snapshots: {requested path: (resolved path, (mtime_ns, size), snapshot, last check)}
+_config_cache: Dict[str, Tuple[str, Tuple[int, int], Mapping[str, Any], float]] = {}
+# Parsed trees before env substitution, for typed settings: {requested path: (resolved path, tree)}
+_raw_configs: Dict[str, Tuple[str, Mapping[str, Any]]] = {}
+_config_lock = threading.Lock()
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+# Seconds between mtime checks in get_config when no watcher thread is running
+CONFIG_CHECK_INTERVAL = 1.0
+
+def _freeze(obj: Any) -> Any:
+    """Read-only view of a parsed config tree (dicts -> mappingproxy, lists -> tuples)."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(item) for item in obj)
+    return obj
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def get_config(config_path: str = "config/config.yaml") -> Mapping[str, Any]:
+    """
+    Process-wide cached, immutable snapshot of the configuration.
+    
+    The file is parsed (and env vars substituted) once; later calls return the
+    same read-only mapping until the file's mtime/size change, which is checked
+    at most every ``CONFIG_CHECK_INTERVAL`` seconds, or continuously by the
+    ``watch_config`` thread. ``reload_config`` forces a re-read. Use
+    ``load_config`` when a mutable copy is needed.
+    """
+    now = time.monotonic()
+    entry = _config_cache.get(config_path)
+    if entry is not None:
+        full_path, signature, snapshot, checked = entry
+        if _watcher is not None or now - checked < CONFIG_CHECK_INTERVAL:
+            return snapshot
+        try:
+            if _file_signature(full_path) == signature:
+                _config_cache[config_path] = (full_path, signature, snapshot, now)
+                return snapshot
+        except OSError:
+            pass
+    return reload_config(config_path)
+
+def reload_config(config_path: str = "config/config.yaml") -> Mapping[str, Any]:
+    """Re-read ``config_path`` and replace its cached snapshot."""
+    with _config_lock:
+        full_path = _resolve_config_path(config_path)
+        signature = _file_signature(full_path)
+        raw = _parse_config_file(full_path)
+        snapshot = _freeze(_replace_env_vars(raw))
+        _raw_configs[config_path] = (full_path, _freeze(raw))
+        _config_cache[config_path] = (full_path, signature, snapshot, time.monotonic())
+        return snapshot
+
+def clear_config_cache() -> None:
+    """Drop all cached snapshots; the next ``get_config`` re-reads the file."""
+    with _config_lock:
+        _config_cache.clear()
+        _raw_configs.clear()
+
+def _refresh_changed_configs() -> None:
+    for config_path, (full_path, signature, _, _) in list(_config_cache.items()):
+        try:
+            changed = _file_signature(full_path) != signature
+        except OSError:
+            changed = True
+        if changed:
+            try:
+                reload_config(config_path)
+            except RuntimeError as e:
+                # Keep serving the last good snapshot if the new file is broken
+                print(f"⚠️  Config reload failed, keeping previous snapshot: {e}")
+
+def watch_config(interval: float = 2.0) -> threading.Thread:
+    """
+    Start a daemon thread that reloads cached configs when their file changes.
+    
+    While it runs ``get_config`` never touches the filesystem.
+    """
+    global _watcher
+    with _config_lock:
+        if _watcher is not None and _watcher.is_alive():
+            return _watcher
+        _watcher_stop.clear()
+
+        def _run() -> None:
+            while not _watcher_stop.wait(interval):
+                _refresh_changed_configs()
+
+        _watcher = threading.Thread(target=_run, name="config-watcher", daemon=True)
+        _watcher.start()
+        return _watcher
+
+def stop_watching_config() -> None:
+    global _watcher
+    _watcher_stop.set()
+    if _watcher is not None:
+        _watcher.join(timeout=5)
+    _watcher = None
+
 def get_project_root() -> str:
     """
     Returns the absolute path to the project root directory.
@@ -0,0 +1,67 @@
+"""
+In-process metrics shared by services and reported in ``/health``.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+# Histogram bucket upper bounds in seconds (last bucket is open-ended)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with interpolated quantiles"""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(self.bounds) if seconds <= bound), len(self.bounds))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated ``q`` quantile in seconds (None before any sample)"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            cumulative = 0
+            for i, n in enumerate(self.counts):
+                if n and cumulative + n >= rank:
+                    lower = self.bounds[i - 1] if i else 0.0
+                    upper = self.bounds[i] if i < len(self.bounds) else self.max
+                    estimate = lower + (upper - lower) * (rank - cumulative) / n
+                    return min(estimate, self.max)
+                cumulative += n
+            return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        p50, p95, p99 = (self.quantile(q) for q in (0.5, 0.95, 0.99))
+        with self._lock:
+            labels = [f"le_{b:g}" for b in self.bounds] + ["inf"]
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "mean": round(self.total / self.count, 4) if self.count else None,
+                "p50": None if p50 is None else round(p50, 4),
+                "p95": None if p95 is None else round(p95, 4),
+                "p99": None if p99 is None else round(p99, 4),
+                "max": round(self.max, 4),
+                "buckets": dict(zip(labels, self.counts)),
+            }
@@ -0,0 +1,206 @@
+"""
+Lightweight stage profiler for model training runs.
+
+Records wall time, CPU time and peak RSS for each named stage, optionally runs
+cProfile on every top-level stage and keeps the dump of the slowest one, and
+writes a JSON report next to the model's ``*_metadata.json``.
+
+Peak RSS is measured per stage on Linux by resetting the kernel high-water mark
+(``/proc/self/clear_refs``); elsewhere it falls back to the process-lifetime
+maximum from ``resource.getrusage`` and the report says so.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+
+def _read_proc_status(field: str) -> Optional[float]:
+    """Value of a ``VmXXX`` field from /proc/self/status in MB, or None."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel RSS high-water mark (Linux >= 4.0)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _lifetime_peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def current_rss_mb() -> Optional[float]:
+    return _read_proc_status("VmRSS")
+
+
+def peak_rss_mb() -> Optional[float]:
+    hwm = _read_proc_status("VmHWM")
+    return hwm if hwm is not None else _lifetime_peak_rss_mb()
+
+
+class TrainingProfiler:
+    """Collects per-stage timings and memory for one training run."""
+
+    def __init__(self, name: str, enabled: bool = True, cprofile: bool = True) -> None:
+        self.name = name
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.stages: List[Dict[str, Any]] = []
+        self._stack: List[Dict[str, Any]] = []
+        self._slowest_profile: Optional[cProfile.Profile] = None
+        self._slowest_stage: Optional[Dict[str, Any]] = None
+        self._started = time.perf_counter()
+        self._per_stage_peak = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Optional[Dict[str, Any]]]:
+        """Time a block; nested stages are recorded with their parent's name as prefix."""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = self._stack[-1]["name"] if self._stack else None
+        record: Dict[str, Any] = {
+            "name": f"{parent}/{name}" if parent else name,
+            "depth": len(self._stack),
+            "rss_start_mb": current_rss_mb(),
+            "peak_rss_mb": 0.0,
+        }
+
+        # Fold the high-water mark so far into open parents before resetting it
+        before = peak_rss_mb()
+        for open_stage in self._stack:
+            open_stage["peak_rss_mb"] = max(open_stage["peak_rss_mb"], before or 0.0)
+        self._per_stage_peak = _reset_peak_rss()
+
+        profiler = cProfile.Profile() if (self.cprofile and not self._stack) else None
+        self._stack.append(record)
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record["wall_s"] = time.perf_counter() - wall0
+            record["cpu_s"] = time.process_time() - cpu0
+            record["rss_end_mb"] = current_rss_mb()
+            self._stack.pop()
+
+            after = peak_rss_mb() or 0.0
+            record["peak_rss_mb"] = max(record["peak_rss_mb"], after)
+            for open_stage in self._stack:
+                open_stage["peak_rss_mb"] = max(open_stage["peak_rss_mb"], after)
+            self.stages.append(record)
+
+            if profiler is not None and (
+                self._slowest_stage is None or record["wall_s"] > self._slowest_stage["wall_s"]
+            ):
+                self._slowest_stage = record
+                self._slowest_profile = profiler
+
+    def report(self) -> Dict[str, Any]:
+        top_level = [s for s in self.stages if s["depth"] == 0]
+        slowest = max(top_level, key=lambda s: s["wall_s"]) if top_level else None
+        return {
+            "model_name": self.name,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "total_wall_s": time.perf_counter() - self._started,
+            "peak_rss_scope": "stage" if self._per_stage_peak else "process",
+            "slowest_stage": slowest["name"] if slowest else None,
+            "stages": self._ordered_stages(),
+        }
+
+    def _ordered_stages(self) -> List[Dict[str, Any]]:
+        """Stages with each top-level stage listed before its nested stages."""
+        ordered: List[Dict[str, Any]] = []
+        pending: List[Dict[str, Any]] = []
+        for record in self.stages:
+            # Records are appended on exit, so children precede their parent
+            if record["depth"] == 0:
+                ordered.append(record)
+                ordered.extend(pending)
+                pending = []
+            else:
+                pending.append(record)
+        return ordered + pending
+
+    def write(self, output_dir: str) -> Dict[str, str]:
+        """Write ``<name>_profile.json`` (and ``<name>_profile.prof`` if cProfile ran) to ``output_dir``."""
+        os.makedirs(output_dir, exist_ok=True)
+        paths: Dict[str, str] = {}
+        report = self.report()
+
+        if self._slowest_profile is not None:
+            prof_path = os.path.join(output_dir, f"{self.name}_profile.prof")
+            # pstats/cProfile format; open with `python -m pstats` or snakeviz
+            self._slowest_profile.dump_stats(prof_path)
+            report["profile_dump"] = {"stage": self._slowest_stage["name"], "path": os.path.basename(prof_path)}
+            paths["prof"] = prof_path
+
+        json_path = os.path.join(output_dir, f"{self.name}_profile.json")
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        paths["json"] = json_path
+        return paths
+
+
+def fit_voting_members(ensemble, X, y, profiler: TrainingProfiler):
+    """
+    Fit a VotingClassifier member by member so each fit is timed separately.
+
+    Produces the same fitted state as ``VotingClassifier.fit`` (clone of every
+    member fitted on the label-encoded target), but members run one after
+    another instead of in the ensemble's joblib pool.
+    """
+    from sklearn.base import clone
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.utils import Bunch
+
+    ensemble.le_ = LabelEncoder().fit(y)
+    ensemble.classes_ = ensemble.le_.classes_
+    y_encoded = ensemble.le_.transform(y)
+
+    fitted = []
+    ensemble.named_estimators_ = Bunch()
+    for name, est in ensemble.estimators:
+        if est == "drop":
+            ensemble.named_estimators_[name] = est
+            continue
+        with profiler.stage(name):
+            member = clone(est).fit(X, y_encoded)
+        fitted.append(member)
+        ensemble.named_estimators_[name] = member
+        if hasattr(member, "feature_names_in_"):
+            ensemble.feature_names_in_ = member.feature_names_in_
+    ensemble.estimators_ = fitted
+    return ensemble
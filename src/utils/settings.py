@@ -0,0 +1,495 @@
+"""
+Typed, validated view of ``config.yaml``.
+
+``get_settings`` builds a ``Settings`` object once per config snapshot (it
+follows ``get_config`` hot reloads) and validates it, so a malformed value
+fails when the API starts instead of on the request that first touches it.
+Risk thresholds are pre-converted to NumPy arrays for vectorized banding.
+
+Secrets written as ``${VAR}`` (Twilio, SMTP, Google Maps) stay unresolved
+until first use: ``Secret.get()`` reads the environment once and caches the
+value; an unset variable yields ``None`` instead of the literal ``${VAR}``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import _raw_configs, get_config, reload_config
+
+
+BANDS = ("green", "yellow", "red")
+
+
+class Secret:
+    """A literal config value or a ``${VAR}`` reference resolved on first access."""
+
+    __slots__ = ("name", "_value", "_resolved")
+
+    def __init__(self, name: Optional[str] = None, value: Optional[str] = None) -> None:
+        self.name = name
+        self._value = value
+        self._resolved = name is None
+
+    @classmethod
+    def parse(cls, raw: Any) -> "Secret":
+        if isinstance(raw, str) and raw.startswith("${") and raw.endswith("}"):
+            return cls(name=raw[2:-1])
+        return cls(value=None if raw is None or raw == "" else str(raw))
+
+    def get(self) -> Optional[str]:
+        if not self._resolved:
+            self._value = os.environ.get(self.name) or None
+            self._resolved = True
+        return self._value
+
+    def __bool__(self) -> bool:
+        return self.get() is not None
+
+    def __repr__(self) -> str:
+        return f"Secret(${{{self.name}}})" if self.name else "Secret(<literal>)"
+
+
+@dataclass(frozen=True)
+class RiskThresholds:
+    """Inclusive [low, high] score range per band, checked in order green, yellow, red."""
+    __slots__ = ("ranges", "labels", "lows", "highs")
+    ranges: Tuple[Tuple[str, float, float], ...]
+    labels: np.ndarray
+    lows: np.ndarray
+    highs: np.ndarray
+
+    @classmethod
+    def from_ranges(cls, ranges: Sequence[Tuple[str, float, float]]) -> "RiskThresholds":
+        return cls(
+            ranges=tuple(ranges),
+            labels=np.array([band for band, _, _ in ranges]),
+            lows=np.array([low for _, low, _ in ranges], dtype=float),
+            highs=np.array([high for _, _, high in ranges], dtype=float),
+        )
+
+    def band(self, score: float) -> str:
+        for band, low, high in self.ranges:
+            if low <= score <= high:
+                return band
+        return "unknown"
+
+    def bands(self, scores: Sequence[float]) -> np.ndarray:
+        scores = np.asarray(scores, dtype=float)[:, None]
+        inside = (scores >= self.lows) & (scores <= self.highs)
+        return np.where(inside.any(axis=1), self.labels[inside.argmax(axis=1)], "unknown")
+
+
+@dataclass(frozen=True)
+class ExplainSettings:
+    __slots__ = (
+        "background_size", "max_explainers", "workers", "max_pending",
+        "sync_max_rows", "timeout_seconds", "importance_background_size", "importance_jobs",
+        "importance_after_training",
+    )
+    background_size: int
+    max_explainers: int
+    workers: int
+    max_pending: int
+    sync_max_rows: int
+    timeout_seconds: float
+    importance_background_size: int
+    importance_jobs: int
+    importance_after_training: bool
+
+
+@dataclass(frozen=True)
+class OsmCacheSettings:
+    __slots__ = ("enabled", "ttl_seconds", "max_entries", "backend", "sqlite_path")
+    enabled: bool
+    ttl_seconds: float
+    max_entries: int
+    backend: str
+    sqlite_path: str
+
+
+@dataclass(frozen=True)
+class BackendSettings:
+    """HTTP policy for one map backend (see ``src.services.http_client``)"""
+    __slots__ = (
+        "connect_timeout", "read_timeout", "retries", "backoff_seconds",
+        "failure_threshold", "reset_seconds", "pool_size",
+    )
+    connect_timeout: float
+    read_timeout: float
+    retries: int
+    backoff_seconds: float
+    failure_threshold: int
+    reset_seconds: float
+    pool_size: int
+
+
+# Per-backend defaults; Overpass queries carry a 25 s server-side timeout
+_BACKEND_DEFAULTS = {
+    "overpass": {"read_timeout": 30, "retries": 1},
+    "google_places": {"read_timeout": 10, "retries": 2},
+}
+
+
+@dataclass(frozen=True)
+class PlacesSettings:
+    """Google Places fan-out: concurrent keyword queries and pagination"""
+    __slots__ = ("max_pages", "page_token_delay", "workers")
+    max_pages: int
+    page_token_delay: float
+    workers: int
+
+
+@dataclass(frozen=True)
+class OverpassSettings:
+    """Streaming Overpass parse: result cap and distance rings for uncached queries"""
+    __slots__ = ("max_results", "rings", "chunk_size")
+    max_results: int
+    rings: int
+    chunk_size: int
+
+
+@dataclass(frozen=True)
+class HedgingSettings:
+    """Multi-backend hospital search (see ``src.services.hospital_search``)"""
+    __slots__ = (
+        "mode", "primary", "quantile", "min_delay", "max_delay", "default_delay",
+        "min_samples", "merge_distance_m", "timeout_seconds", "workers",
+    )
+    mode: str
+    primary: str
+    quantile: float
+    min_delay: float
+    max_delay: float
+    default_delay: float
+    min_samples: int
+    merge_distance_m: float
+    timeout_seconds: float
+    workers: int
+
+
+@dataclass(frozen=True)
+class MapsSettings:
+    __slots__ = ("osm_cache", "offline_index", "backends", "places", "hedging", "overpass")
+    osm_cache: OsmCacheSettings
+    offline_index: Optional[str]
+    backends: Mapping[str, BackendSettings]
+    places: PlacesSettings
+    hedging: HedgingSettings
+    overpass: OverpassSettings
+
+
+@dataclass(frozen=True)
+class TwilioSettings:
+    __slots__ = ("account_sid", "auth_token", "from_number")
+    account_sid: Secret
+    auth_token: Secret
+    from_number: Secret
+
+
+@dataclass(frozen=True)
+class SmtpSettings:
+    __slots__ = ("host", "port", "username", "password", "from_email")
+    host: Secret
+    port: Secret
+    username: Secret
+    password: Secret
+    from_email: Secret
+
+    def port_number(self) -> int:
+        port = self.port.get()
+        return int(port) if port else 587
+
+
+@dataclass(frozen=True)
+class EmergencyContact:
+    __slots__ = ("name", "phone", "email")
+    name: Optional[str]
+    phone: Optional[str]
+    email: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "phone": self.phone, "email": self.email}
+
+
+@dataclass(frozen=True)
+class NotifySettings:
+    """SOS dispatch: per-channel timeouts (s) and provider endpoints"""
+    __slots__ = ("sms_timeout", "email_timeout", "workers", "twilio_api_base", "smtp_starttls")
+    sms_timeout: float
+    email_timeout: float
+    workers: int
+    twilio_api_base: str
+    smtp_starttls: bool
+
+
+@dataclass(frozen=True)
+class OutboxSettings:
+    """Durable notification queue (see ``src.services.outbox``)"""
+    __slots__ = ("path", "batch_size", "max_attempts", "base_backoff", "max_backoff", "poll_interval")
+    path: str
+    batch_size: int
+    max_attempts: int
+    base_backoff: float
+    max_backoff: float
+    poll_interval: float
+
+
+@dataclass(frozen=True)
+class ServiceSettings:
+    __slots__ = ("twilio", "smtp", "emergency_contacts", "notify", "outbox")
+    twilio: TwilioSettings
+    smtp: SmtpSettings
+    emergency_contacts: Tuple[EmergencyContact, ...]
+    notify: NotifySettings
+    outbox: OutboxSettings
+
+
+@dataclass(frozen=True)
+class Settings:
+    __slots__ = (
+        "path", "paths", "ml_models", "explain", "rules_dir",
+        "risk_thresholds", "google_maps_api_key", "maps", "services",
+    )
+    path: str
+    paths: Mapping[str, str]
+    ml_models: Mapping[str, str]
+    explain: ExplainSettings
+    rules_dir: Optional[str]
+    risk_thresholds: Optional[RiskThresholds]
+    google_maps_api_key: Secret
+    maps: MapsSettings
+    services: ServiceSettings
+
+
+_INT_KEYS = frozenset({"retries", "failure_threshold", "pool_size"})
+
+
+class _Validator:
+    """Collects every problem so one startup error lists them all."""
+
+    def __init__(self) -> None:
+        self.errors: List[str] = []
+
+    def section(self, raw: Mapping[str, Any], key: str) -> Mapping[str, Any]:
+        value = raw.get(key)
+        if value is None:
+            return {}
+        if not isinstance(value, Mapping):
+            self.errors.append(f"'{key}' must be a mapping")
+            return {}
+        return value
+
+    def number(self, section: Mapping[str, Any], key: str, default: float, where: str, cast: type = int) -> Any:
+        value = section.get(key, default)
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            self.errors.append(f"'{where}.{key}' must be a number, got {value!r}")
+            return cast(default)
+
+    def strings(self, section: Mapping[str, Any], where: str) -> Mapping[str, str]:
+        values = {}
+        for key, value in section.items():
+            if not isinstance(value, str):
+                self.errors.append(f"'{where}.{key}' must be a string, got {value!r}")
+            else:
+                values[str(key)] = value
+        return MappingProxyType(values)
+
+    def thresholds(self, section: Mapping[str, Any]) -> Optional[RiskThresholds]:
+        if not section:
+            return None
+        ranges = []
+        for band in BANDS:
+            bounds = section.get(band)
+            try:
+                low, high = (float(v) for v in bounds)
+            except (TypeError, ValueError):
+                self.errors.append(f"'risk_thresholds.{band}' must be [low, high], got {bounds!r}")
+                continue
+            if low > high:
+                self.errors.append(f"'risk_thresholds.{band}' has low > high: {bounds!r}")
+            ranges.append((band, low, high))
+        return RiskThresholds.from_ranges(ranges) if len(ranges) == len(BANDS) else None
+
+    def choice(self, section: Mapping[str, Any], key: str, choices: Sequence[str], where: str) -> str:
+        value = section.get(key, choices[0])
+        if value not in choices:
+            self.errors.append(f"'{where}.{key}' must be one of {list(choices)}, got {value!r}")
+            return choices[0]
+        return value
+
+    def backends(self, raw: Mapping[str, Any]) -> Mapping[str, BackendSettings]:
+        backends = {}
+        for name in dict.fromkeys([*_BACKEND_DEFAULTS, *raw]):
+            where = f"maps.backends.{name}"
+            section = self.section(raw, name)
+            defaults = {
+                "connect_timeout": 3.05, "read_timeout": 10, "retries": 2, "backoff_seconds": 0.5,
+                "failure_threshold": 5, "reset_seconds": 30, "pool_size": 10,
+                **_BACKEND_DEFAULTS.get(name, {}),
+            }
+            backends[str(name)] = BackendSettings(*(
+                self.number(section, key, defaults[key], where, cast=int if key in _INT_KEYS else float)
+                for key in BackendSettings.__slots__
+            ))
+        return MappingProxyType(backends)
+
+    def contacts(self, raw: Any) -> Tuple[EmergencyContact, ...]:
+        if raw is None:
+            return ()
+        if not isinstance(raw, Sequence) or isinstance(raw, str):
+            self.errors.append("'services.emergency_contacts' must be a list")
+            return ()
+        contacts = []
+        for i, contact in enumerate(raw):
+            if not isinstance(contact, Mapping):
+                self.errors.append(f"'services.emergency_contacts[{i}]' must be a mapping")
+                continue
+            contacts.append(EmergencyContact(contact.get("name"), contact.get("phone"), contact.get("email")))
+        return tuple(contacts)
+
+
+def build_settings(raw: Mapping[str, Any], path: str = "") -> Settings:
+    """
+    Validate a parsed (not env-substituted) config tree into ``Settings``.
+
+    Missing sections fall back to the defaults used across the code base;
+    present but malformed values raise ValueError listing every problem.
+    """
+    v = _Validator()
+    explain = v.section(raw, "explain")
+    services = v.section(raw, "services")
+    twilio = v.section(services, "twilio")
+    smtp = v.section(services, "smtp")
+    notify = v.section(services, "notify")
+    outbox = v.section(services, "outbox")
+    maps = v.section(raw, "maps")
+    osm_cache = v.section(maps, "osm_cache")
+    places = v.section(maps, "places")
+    hedging = v.section(maps, "hedging")
+    overpass = v.section(maps, "overpass")
+
+    smtp_port = smtp.get("port")
+    if smtp_port is not None and not Secret.parse(smtp_port).name:
+        v.number(smtp, "port", 587, "services.smtp")
+
+    settings = Settings(
+        path=path,
+        paths=v.strings(v.section(raw, "paths"), "paths"),
+        ml_models=v.strings(v.section(raw, "ml_models"), "ml_models"),
+        explain=ExplainSettings(
+            background_size=v.number(explain, "background_size", 50, "explain"),
+            max_explainers=v.number(explain, "max_explainers", 6, "explain"),
+            workers=v.number(explain, "workers", 2, "explain"),
+            max_pending=v.number(explain, "max_pending", 32, "explain"),
+            sync_max_rows=v.number(explain, "sync_max_rows", 20, "explain"),
+            timeout_seconds=v.number(explain, "timeout_seconds", 30, "explain", cast=float),
+            importance_background_size=v.number(explain, "importance_background_size", 20, "explain"),
+            importance_jobs=v.number(explain, "importance_jobs", -1, "explain"),
+            importance_after_training=bool(explain.get("importance_after_training", False)),
+        ),
+        rules_dir=v.section(raw, "recommendations").get("rules_dir"),
+        risk_thresholds=v.thresholds(v.section(raw, "risk_thresholds")),
+        google_maps_api_key=Secret.parse(v.section(raw, "api").get("google_maps_api_key")),
+        maps=MapsSettings(
+            osm_cache=OsmCacheSettings(
+                enabled=bool(osm_cache.get("enabled", True)),
+                ttl_seconds=v.number(osm_cache, "ttl_seconds", 3600, "maps.osm_cache", cast=float),
+                max_entries=v.number(osm_cache, "max_entries", 512, "maps.osm_cache"),
+                backend=v.choice(osm_cache, "backend", ("memory", "sqlite"), "maps.osm_cache"),
+                sqlite_path=str(osm_cache.get("sqlite_path", "data/cache/osm_tiles.sqlite")),
+            ),
+            offline_index=maps.get("offline_index"),
+            backends=v.backends(v.section(maps, "backends")),
+            places=PlacesSettings(
+                max_pages=v.number(places, "max_pages", 3, "maps.places"),
+                page_token_delay=v.number(places, "page_token_delay", 2.0, "maps.places", cast=float),
+                workers=v.number(places, "workers", 8, "maps.places"),
+            ),
+            hedging=HedgingSettings(
+                mode=v.choice(hedging, "mode", ("fallback", "hedged", "parallel"), "maps.hedging"),
+                primary=v.choice(hedging, "primary", ("openstreetmap", "google_maps"), "maps.hedging"),
+                quantile=v.number(hedging, "quantile", 0.95, "maps.hedging", cast=float),
+                min_delay=v.number(hedging, "min_delay", 0.05, "maps.hedging", cast=float),
+                max_delay=v.number(hedging, "max_delay", 5.0, "maps.hedging", cast=float),
+                default_delay=v.number(hedging, "default_delay", 1.0, "maps.hedging", cast=float),
+                min_samples=v.number(hedging, "min_samples", 20, "maps.hedging"),
+                merge_distance_m=v.number(hedging, "merge_distance_m", 150, "maps.hedging", cast=float),
+                timeout_seconds=v.number(hedging, "timeout_seconds", 30, "maps.hedging", cast=float),
+                workers=v.number(hedging, "workers", 16, "maps.hedging"),
+            ),
+            overpass=OverpassSettings(
+                max_results=v.number(overpass, "max_results", 200, "maps.overpass"),
+                rings=v.number(overpass, "rings", 4, "maps.overpass"),
+                chunk_size=v.number(overpass, "chunk_size", 65536, "maps.overpass"),
+            ),
+        ),
+        services=ServiceSettings(
+            twilio=TwilioSettings(*(Secret.parse(twilio.get(k)) for k in TwilioSettings.__slots__)),
+            smtp=SmtpSettings(*(Secret.parse(smtp.get(k)) for k in SmtpSettings.__slots__)),
+            emergency_contacts=v.contacts(services.get("emergency_contacts")),
+            notify=NotifySettings(
+                sms_timeout=v.number(notify, "sms_timeout", 10, "services.notify", cast=float),
+                email_timeout=v.number(notify, "email_timeout", 15, "services.notify", cast=float),
+                workers=v.number(notify, "workers", 8, "services.notify"),
+                twilio_api_base=str(notify.get("twilio_api_base", "https://api.twilio.com")).rstrip("/"),
+                smtp_starttls=bool(notify.get("smtp_starttls", True)),
+            ),
+            outbox=OutboxSettings(
+                path=str(outbox.get("path", "data/outbox/notifications.sqlite")),
+                batch_size=v.number(outbox, "batch_size", 50, "services.outbox"),
+                max_attempts=v.number(outbox, "max_attempts", 8, "services.outbox"),
+                base_backoff=v.number(outbox, "base_backoff", 2, "services.outbox", cast=float),
+                max_backoff=v.number(outbox, "max_backoff", 300, "services.outbox", cast=float),
+                poll_interval=v.number(outbox, "poll_interval", 1.0, "services.outbox", cast=float),
+            ),
+        ),
+    )
+    if v.errors:
+        raise ValueError(f"Invalid configuration {path}:\n  - " + "\n  - ".join(v.errors))
+    return settings
+
+
+# {requested path: (config snapshot the settings were built from, settings)}
+_settings_cache: Dict[str, Tuple[Mapping[str, Any], Settings]] = {}
+_settings_lock = threading.Lock()
+
+
+def get_settings(config_path: str = "config/config.yaml") -> Settings:
+    """
+    Typed settings for ``config_path``, rebuilt only when ``get_config``
+    returns a new snapshot (file change or ``reload_config``). A reloaded
+    file with invalid values is reported once and the last good settings
+    stay in use.
+
+    Raises RuntimeError if the file is missing or unreadable and ValueError
+    if it is malformed on first load.
+    """
+    snapshot = get_config(config_path)
+    cached = _settings_cache.get(config_path)
+    if cached is not None and cached[0] is snapshot:
+        return cached[1]
+    with _settings_lock:
+        cached = _settings_cache.get(config_path)
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+        if config_path not in _raw_configs:  # cache cleared since get_config
+            snapshot = reload_config(config_path)
+        full_path, raw = _raw_configs[config_path]
+        try:
+            settings = build_settings(raw, full_path)
+        except ValueError as e:
+            if cached is None:
+                raise
+            print(f"⚠️  Invalid settings in {full_path}, keeping previous settings: {e}")
+            settings = cached[1]
+        _settings_cache[config_path] = (snapshot, settings)
+        return settings
@@ -9,6 +9,7 @@ import os
 # Add src to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import src.api.app as app_module
 from src.api.app import app, EXPECTED_FEATURES
 
 
@@ -20,6 +21,31 @@ def client():
         yield client
 
 
+@pytest.fixture
+def diabetes_model(monkeypatch):
+    """Serve a small tree ensemble as the diabetes model"""
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from src.models.explain import ExplainerRegistry
+
+    features = EXPECTED_FEATURES['diabetes']
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(150, len(features))), columns=features)
+    y = (X['Glucose'] + 0.5 * X['BMI'] > 0).astype(int)
+    model = VotingClassifier([
+        ("lr", LogisticRegression()),
+        ("rf", RandomForestClassifier(n_estimators=10, max_depth=3, random_state=0)),
+    ], voting="soft").fit(X, y)
+
+    monkeypatch.setitem(app_module.models, 'diabetes', model)
+    monkeypatch.setitem(app_module.model_versions, 'diabetes', 'test')
+    monkeypatch.setitem(app_module.model_backgrounds, 'diabetes', X)
+    monkeypatch.setattr(app_module, 'explainer_registry', ExplainerRegistry(background_size=20))
+    return X
+
+
 def test_home_endpoint(client):
     """Test the home endpoint"""
     response = client.get('/')
@@ -143,3 +169,237 @@ def test_expected_features_structure():
     assert len(EXPECTED_FEATURES['diabetes']) == 8
     assert 'Glucose' in EXPECTED_FEATURES['diabetes']
     assert 'BMI' in EXPECTED_FEATURES['diabetes']
+
+
+def test_explain_single_patient(client, diabetes_model):
+    """Explain one patient and get ranked contributions"""
+    patient = diabetes_model.iloc[0].to_dict()
+    response = client.post('/explain/diabetes',
+                          data=json.dumps(dict(patient, top_k=3)),
+                          content_type='application/json')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['count'] == 1
+    explanation = data['explanations'][0]
+    assert explanation['zone'] in ['Green', 'Yellow', 'Red']
+    assert len(explanation['contributions']) == 3
+    assert explanation['contributions'][0]['feature'] in EXPECTED_FEATURES['diabetes']
+
+
+def test_explain_batch_reuses_cached_explainer(client, diabetes_model):
+    """Batches return one explanation per row and share one cached explainer"""
+    patients = diabetes_model.iloc[:4].to_dict(orient='records')
+    for _ in range(2):
+        response = client.post('/explain/diabetes',
+                              data=json.dumps({"patients": patients}),
+                              content_type='application/json')
+        assert response.status_code == 200
+        assert json.loads(response.data)['count'] == 4
+
+    assert len(app_module.explainer_registry) == 1
+
+
+def test_explain_large_batch_job(client, diabetes_model, monkeypatch):
+    """Batches above the sync limit are queued and polled by job id"""
+    monkeypatch.setattr(app_module, 'EXPLAIN_SYNC_MAX_ROWS', 2)
+    patients = diabetes_model.iloc[:5].to_dict(orient='records')
+    response = client.post('/explain/diabetes',
+                          data=json.dumps(patients),
+                          content_type='application/json')
+
+    assert response.status_code == 202
+    job = json.loads(response.data)
+    app_module.explain_jobs[job['job_id']]['future'].result(timeout=60)
+
+    response = client.get(job['poll'])
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['status'] == 'done'
+    assert len(data['explanations']) == 5
+    assert client.get('/explain/jobs/unknown').status_code == 404
+
+
+def test_explain_kidney_encodes_raw_background(client, monkeypatch, tmp_path):
+    """Without a bundled background, kidney text columns are encoded like training"""
+    import joblib
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder
+    from src.models.explain import ExplainerRegistry
+    from src.utils.settings import build_settings
+
+    features = EXPECTED_FEATURES['kidney']
+    raw = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'kidney.csv'))
+    encoders = {"htn": LabelEncoder().fit(raw["htn"].dropna().astype(str))}
+    joblib.dump(encoders, tmp_path / "kidney_encoders.joblib")
+    monkeypatch.setattr(app_module, 'settings', build_settings({
+        "ml_models": {"kidney": str(tmp_path / "kidney_model.joblib")}}))
+
+    background = app_module._explain_background('kidney')
+    assert not background.isna().any().any()
+    assert all(pd.api.types.is_numeric_dtype(t) for t in background.dtypes)
+    assert set(background["htn"]) <= set(range(len(encoders["htn"].classes_)))
+
+    rng = np.random.default_rng(0)
+    y = (background["hemo"] + rng.normal(size=len(background)) < background["hemo"].median()).astype(int)
+    model = RandomForestClassifier(n_estimators=10, max_depth=3, random_state=0).fit(background, y)
+    monkeypatch.setitem(app_module.models, 'kidney', model)
+    monkeypatch.setitem(app_module.model_versions, 'kidney', 'test')
+    monkeypatch.setitem(app_module.model_backgrounds, 'kidney', None)
+    monkeypatch.setattr(app_module, 'explainer_registry', ExplainerRegistry(background_size=20))
+
+    patient = {f: float(v) for f, v in background.iloc[0].items()}
+    response = client.post('/explain/kidney', data=json.dumps(patient), content_type='application/json')
+
+    assert response.status_code == 200
+    assert json.loads(response.data)['explanations'][0]['contributions'][0]['feature'] in features
+
+
+def test_explain_missing_features(client, diabetes_model):
+    """Rows with missing features are rejected with the offending row index"""
+    response = client.post('/explain/diabetes',
+                          data=json.dumps({"patients": [{"Glucose": 120}]}),
+                          content_type='application/json')
+
+    assert response.status_code == 400
+    data = json.loads(response.data)
+    assert data['row'] == 0
+    assert 'missing' in data
+
+
+def test_importance_endpoint(client, monkeypatch, tmp_path):
+    """Precomputed importance is served whole or for a single zone"""
+    report = {
+        "condition": "heart",
+        "created_at": "2024-01-01T00:00:00",
+        "mean_abs_shap": [{"feature": "chol", "value": 0.1}],
+        "zones": {"Red": {"count": 3, "mean_shap": {"chol": 0.2}}},
+        "interactions": [],
+    }
+    (tmp_path / "heart_importance.json").write_text(json.dumps(report))
+    monkeypatch.setattr(app_module, 'importance_path', lambda save_dir, c: str(tmp_path / f"{c}_importance.json"))
+
+    response = client.get('/importance/heart')
+    assert response.status_code == 200
+    assert json.loads(response.data)['mean_abs_shap'][0]['feature'] == 'chol'
+
+    response = client.get('/importance/heart?zone=red')
+    assert response.status_code == 200
+    assert json.loads(response.data)['count'] == 3
+
+    assert client.get('/importance/heart?zone=Blue').status_code == 400
+    assert client.get('/importance/kidney').status_code == 404
+
+
+def test_whatif_endpoint(client, diabetes_model):
+    """Sweeps return risk curves for the base patient"""
+    patient = diabetes_model.iloc[0].to_dict()
+    response = client.post('/whatif/diabetes',
+                          data=json.dumps({
+                              "patient": patient,
+                              "sweeps": [{"feature": "Glucose", "start": -2, "stop": 2, "step": 0.5}]
+                          }),
+                          content_type='application/json')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    curve = data['curves'][0]
+    assert curve['feature'] == 'Glucose'
+    assert len(curve['risk_scores']) == len(curve['values']) == 9
+    assert 'crossings' in curve
+
+    response = client.post('/whatif/diabetes',
+                          data=json.dumps({"patient": patient, "sweeps": [{"feature": "Height", "values": [1]}]}),
+                          content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_rules_status_and_reload(client):
+    """Rule set status is reported and reloads run in the background"""
+    response = client.get('/rules')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['rules'] > 0
+    assert 'chol' in data['features']
+
+    response = client.post('/rules/reload')
+    assert response.status_code == 202
+
+
+def test_predict_batch_with_recommendations(client, diabetes_model):
+    """Batch scores match single predictions and can carry recommendations inline"""
+    patients = diabetes_model.iloc[:5].to_dict('records')
+    response = client.post('/predict/diabetes/batch', json={
+        "patients": patients, "include_recommendations": True
+    })
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['count'] == 5
+
+    for patient, result in zip(patients, data['results']):
+        single = json.loads(client.post('/predict/diabetes', json=patient).data)
+        assert result['risk_score'] == single['risk_score']
+        assert result['zone'] == single['zone']
+        assert 'risk_level' in result and 'matched_rules' in result
+        assert result['recommendations']['medical']
+
+    response = client.post('/predict/diabetes/batch', json=[{"Glucose": 1}])
+    assert response.status_code == 400
+    assert json.loads(response.data)['row'] == 0
+
+
+def test_predict_batch_zones_use_unrounded_scores(client, diabetes_model, monkeypatch):
+    """A score just above a zone boundary is zoned like /predict, not by its rounded value"""
+    import numpy as np
+    monkeypatch.setattr(app_module, "_risk_scores", lambda model, df: np.full(len(df), 30.004))
+    response = client.post('/predict/diabetes/batch', json=diabetes_model.iloc[:2].to_dict('records'))
+    assert response.status_code == 200
+    assert [(r['risk_score'], r['zone']) for r in response.get_json()['results']] == [(30.0, "Yellow")] * 2
+
+
+def test_recommendations_batch_endpoint(client):
+    """Many (disease, risk_score[, features]) items are answered in one request"""
+    response = client.post('/recommendations/batch', json={"items": [
+        {"disease": "diabetes", "risk_score": 90, "features": {"Glucose": 250}},
+        {"disease": "kidney", "risk_score": 20},
+    ]})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['count'] == 2
+    assert data['results'][0]['risk_level'] == 'red_high'
+    assert any('Glucose' in text or 'glucose' in text for text in data['results'][0]['recommendations']['medical'])
+    assert data['results'][1]['disease'] == 'kidney'
+
+    response = client.post('/recommendations/batch', json=[{"disease": "flu", "risk_score": 10}])
+    assert response.status_code == 400
+
+
+def test_hospitals_modes(client, monkeypatch):
+    """/hospitals forwards ?mode=, rejects unknown modes and returns 503 when every backend fails"""
+    import src.services.hospital_search as hospital_search
+
+    calls = []
+
+    def fake_search(lat, lng, disease, radius, k, mode):
+        calls.append(mode)
+        if mode == "hedged":
+            return [{"name": "Charite Campus Mitte"}], "OpenStreetMap"
+        if mode is None:
+            raise hospital_search.NoMapServiceError({"openstreetmap": RuntimeError("down")})
+        raise ValueError("Invalid mode")
+
+    monkeypatch.setattr(app_module, "search_hospitals", fake_search)
+    response = client.get('/hospitals/heart?lat=52.52&lng=13.40&mode=hedged')
+    assert response.status_code == 200
+    assert response.get_json()["source"] == "OpenStreetMap"
+    assert client.get('/hospitals/heart?lat=52.52&lng=13.40&mode=fastest').status_code == 400
+    response = client.get('/hospitals/heart?lat=52.52&lng=13.40')
+    assert response.status_code == 503 and "down" in response.get_json()["details"]
+    assert calls == ["hedged", "fastest", None]
+
+    for k in ("0", "-3"):
+        response = client.get(f'/hospitals/heart?lat=52.52&lng=13.40&k={k}')
+        assert response.status_code == 400 and "k must be" in response.get_json()["error"]
+    assert len(calls) == 3
@@ -0,0 +1,83 @@
+"""
+Unit tests for the parallel model comparison harness
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.ml.compare_models as compare_models
+from src.ml.compare_models import load_dataset, run_comparison
+
+RAW_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw')
+DATASETS = {"heart": (os.path.join(RAW_DIR, "heart.csv"), "target")}
+MODELS = ["Naive Bayes", "Logistic Regression"]
+
+
+def test_load_dataset_cleans_kidney_target():
+    """Whitespace variants of labels are merged and no NaNs remain"""
+    X, y = load_dataset(os.path.join(RAW_DIR, "kidney.csv"), "classification")
+
+    assert y.nunique() == 2
+    assert not X.isna().any().any()
+
+
+def test_run_comparison_table(tmp_path):
+    """Comparison emits one row per candidate with accuracy and timings"""
+    store = str(tmp_path / "results.jsonl")
+    table = run_comparison(DATASETS, n_jobs=2, n_splits=3, store_path=store, models=MODELS,
+                           cache_dir=str(tmp_path))
+
+    assert set(table["Model"]) == set(MODELS)
+    assert (table["Folds"] == 3).all()
+    assert (table["Status"] == "ok").all()
+    for col in ["Accuracy", "Fit Time (s)", "Predict Time (s)"]:
+        assert table[col].notna().all()
+
+
+def test_run_comparison_resumes_from_store(tmp_path):
+    """Completed fold results are reused instead of recomputed"""
+    store = str(tmp_path / "results.jsonl")
+    first = run_comparison(DATASETS, n_jobs=1, n_splits=3, store_path=store, models=MODELS,
+                            cache_dir=str(tmp_path))
+    with open(store) as f:
+        n_records = len(f.readlines())
+
+    second = run_comparison(DATASETS, n_jobs=1, n_splits=3, store_path=store, models=MODELS,
+                            cache_dir=str(tmp_path))
+    with open(store) as f:
+        assert len(f.readlines()) == n_records
+    assert list(first["Accuracy"]) == list(second["Accuracy"])
+
+
+def test_time_budget_cancels_remaining_folds(tmp_path):
+    """A candidate over its budget does not run all folds"""
+    table = run_comparison(DATASETS, n_jobs=1, n_splits=5, store_path=None,
+                           models=["Random Forest"], time_budget=0.0, cache_dir=str(tmp_path))
+
+    row = table.iloc[0]
+    assert row["Status"] == "over_budget"
+    assert row["Folds"] < 5
+
+
+def _hanging_fold_task(disease, model_name, fold, n_splits, seed):
+    """Worker task: the "Hang" candidate never finishes, others run normally"""
+    if model_name == "Hang":
+        time.sleep(600)
+    return compare_models.__dict__["_real_run_fold_task"](disease, model_name, fold, n_splits, seed)
+
+
+def test_time_budget_kills_running_fold(tmp_path, monkeypatch):
+    """A fold that hangs is stopped at the budget; other candidates still complete"""
+    monkeypatch.setattr(compare_models, "_real_run_fold_task", compare_models._run_fold_task, raising=False)
+    monkeypatch.setattr(compare_models, "_run_fold_task", _hanging_fold_task)
+
+    start = time.perf_counter()
+    table = run_comparison(DATASETS, n_jobs=2, n_splits=3, store_path=None,
+                           models=["Naive Bayes", "Hang"], time_budget=2.0, cache_dir=str(tmp_path))
+    assert time.perf_counter() - start < 30
+
+    rows = table.set_index("Model")
+    assert rows.loc["Hang", "Status"] == "over_budget" and rows.loc["Hang", "Folds"] == 0
+    assert rows.loc["Naive Bayes", "Status"] == "ok" and rows.loc["Naive Bayes", "Folds"] == 3
@@ -5,11 +5,16 @@ import pytest
 import sys
 import os
 import tempfile
+import time
 import yaml
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.utils.config import load_config, _replace_env_vars, get_project_root, ensure_dir
+import src.utils.config as config_module
+from src.utils.config import (
+    load_config, get_config, reload_config, watch_config, _replace_env_vars, get_project_root, ensure_dir
+)
+from src.utils.settings import build_settings, get_settings
 
 
 def test_get_project_root():
@@ -74,3 +79,124 @@ def test_load_config_template():
         assert 'ml_models' in config
     except RuntimeError:
         pytest.skip("Config file not available")
+
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    """Temporary config file; the snapshot cache is cleared around each test"""
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump({"risk_thresholds": {"green": [0, 30]}, "items": [1, 2]}))
+    config_module.clear_config_cache()
+    yield path
+    config_module.stop_watching_config()
+    config_module.clear_config_cache()
+
+
+def _rewrite(path, data):
+    """Write new content and move the mtime forward so the change is visible"""
+    path.write_text(yaml.safe_dump(data))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_get_config_returns_cached_immutable_snapshot(config_file):
+    """Repeated calls share one read-only snapshot"""
+    first = get_config(str(config_file))
+    assert get_config(str(config_file)) is first
+    assert first["risk_thresholds"]["green"] == (0, 30)
+    with pytest.raises(TypeError):
+        first["risk_thresholds"]["green"] = [0, 10]
+
+
+def test_get_config_picks_up_file_changes(config_file, monkeypatch):
+    """A changed mtime invalidates the snapshot; reload_config forces a re-read"""
+    monkeypatch.setattr(config_module, "CONFIG_CHECK_INTERVAL", 0.0)
+    before = get_config(str(config_file))
+
+    _rewrite(config_file, {"risk_thresholds": {"green": [0, 25]}})
+    after = get_config(str(config_file))
+    assert after is not before
+    assert after["risk_thresholds"]["green"] == (0, 25)
+
+    assert reload_config(str(config_file)) is not after
+
+
+def test_watch_config_invalidates_in_background(config_file):
+    """The watcher thread reloads changed files without get_config touching disk"""
+    get_config(str(config_file))
+    watch_config(interval=0.05)
+
+    _rewrite(config_file, {"risk_thresholds": {"green": [0, 20]}})
+    for _ in range(100):
+        if get_config(str(config_file))["risk_thresholds"]["green"] == (0, 20):
+            break
+        time.sleep(0.05)
+    assert get_config(str(config_file))["risk_thresholds"]["green"] == (0, 20)
+
+
+def test_settings_are_typed_and_follow_reloads(config_file, monkeypatch):
+    """Thresholds become arrays; settings are rebuilt only for a new snapshot"""
+    monkeypatch.setattr(config_module, "CONFIG_CHECK_INTERVAL", 0.0)
+    _rewrite(config_file, {"risk_thresholds": {"green": [0, 30], "yellow": [31, 70], "red": [71, 100]}})
+    settings = get_settings(str(config_file))
+
+    assert get_settings(str(config_file)) is settings
+    assert settings.risk_thresholds.lows.tolist() == [0, 31, 71]
+    assert settings.risk_thresholds.bands([10, 30.5, 99]).tolist() == ["green", "unknown", "red"]
+    assert settings.explain.background_size == 50
+    with pytest.raises(AttributeError):
+        settings.extra = 1
+
+    _rewrite(config_file, {"risk_thresholds": {"green": [0, 20], "yellow": [21, 70], "red": [71, 100]}})
+    assert get_settings(str(config_file)).risk_thresholds.band(25) == "yellow"
+
+
+def test_invalid_reload_keeps_last_good_settings(config_file, monkeypatch, capsys):
+    """A reload that parses but fails validation does not replace working settings"""
+    monkeypatch.setattr(config_module, "CONFIG_CHECK_INTERVAL", 0.0)
+    _rewrite(config_file, {"risk_thresholds": {"green": [0, 30], "yellow": [31, 70], "red": [71, 100]}})
+    good = get_settings(str(config_file))
+
+    _rewrite(config_file, {"risk_thresholds": {"green": [0, 30], "yellow": "high", "red": [71, 100]}})
+    assert get_settings(str(config_file)) is good
+    assert get_settings(str(config_file)) is good
+    assert capsys.readouterr().out.count("keeping previous settings") == 1
+
+    _rewrite(config_file, {"risk_thresholds": {"green": [0, 20], "yellow": [21, 70], "red": [71, 100]}})
+    assert get_settings(str(config_file)).risk_thresholds.band(25) == "yellow"
+
+
+def test_invalid_first_load_raises(config_file):
+    """Without previous settings, invalid values still fail loudly"""
+    _rewrite(config_file, {"explain": {"workers": "many"}})
+    with pytest.raises(ValueError):
+        get_settings(str(config_file))
+
+
+def test_secrets_resolve_lazily(monkeypatch):
+    """${VAR} secrets read the environment on first access; unset ones are None"""
+    monkeypatch.delenv("TEST_TWILIO_SID", raising=False)
+    settings = build_settings({"services": {"twilio": {
+        "account_sid": "${TEST_TWILIO_SID}", "auth_token": "${TEST_UNSET_TOKEN}", "from_number": "+100"
+    }}})
+    monkeypatch.setenv("TEST_TWILIO_SID", "AC123")
+
+    twilio = settings.services.twilio
+    assert twilio.account_sid.get() == "AC123"
+    assert twilio.auth_token.get() is None
+    assert twilio.from_number.get() == "+100"
+    assert "AC123" not in repr(twilio)
+
+
+def test_invalid_settings_list_every_error():
+    """Malformed values fail at build time with all problems reported"""
+    with pytest.raises(ValueError) as excinfo:
+        build_settings({
+            "risk_thresholds": {"green": [0, 30], "yellow": "high", "red": [90, 71]},
+            "explain": {"workers": "many"},
+            "services": {"smtp": {"port": "smtp"}},
+        })
+    message = str(excinfo.value)
+    for fragment in ("risk_thresholds.yellow", "risk_thresholds.red", "explain.workers", "services.smtp.port"):
+        assert fragment in message
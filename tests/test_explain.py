@@ -0,0 +1,171 @@
+"""
+Unit tests for SHAP explanations of the voting ensemble
+"""
+import pytest
+import sys
+import os
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.models.explain import ExplainerRegistry, model_version, shap_explain_instance, summarize_background
+
+
+def _dataset(n=200, categorical=True):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        "age": rng.normal(50, 10, n),
+        "bmi": rng.normal(28, 5, n),
+        "glucose": rng.normal(120, 30, n),
+        "bp": rng.normal(80, 10, n),
+        "smoker": rng.choice(["yes", "no"], n),
+    })
+    logit = 0.05 * (X["glucose"] - 120) + 0.1 * (X["bmi"] - 28) + (X["smoker"] == "yes") - 0.3
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+    if not categorical:
+        X["smoker"] = (X["smoker"] == "yes").astype(float)
+    return X, y
+
+
+def _bundle(X, y, estimators, weights=None):
+    numeric = X.select_dtypes(include=["number"]).columns.tolist()
+    categorical = X.select_dtypes(exclude=["number"]).columns.tolist()
+    preprocess = ColumnTransformer([
+        ("num", StandardScaler(), numeric),
+        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categorical),
+    ])
+    clf = VotingClassifier(estimators=estimators, voting="soft", weights=weights)
+    pipeline = Pipeline([("preprocess", preprocess), ("clf", clf)]).fit(X, y)
+    return {"pipeline": pipeline}
+
+
+def _as_dict(result):
+    return {c["feature"]: c["shap_value"] for c in result["contributions"]}
+
+
+def test_tree_path_matches_sampling_explainer():
+    """Per-member TreeSHAP combined with voting weights equals the model-agnostic explanation"""
+    X, y = _dataset(categorical=False)
+    bundle = _bundle(X, y, [
+        ("lr", LogisticRegression(max_iter=1000)),
+        ("rf", RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0)),
+        ("gb", GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0)),
+    ], weights=[1, 2, 1])
+    sample = X.iloc[:40]
+
+    tree = shap_explain_instance(bundle, sample, top_k=10, method="tree")
+    sampling = shap_explain_instance(bundle, sample, top_k=10, method="sampling")
+
+    assert tree["method"] == "tree"
+    assert sampling["method"] == "sampling"
+    tree_values, sampling_values = _as_dict(tree), _as_dict(sampling)
+    assert set(tree_values) == set(X.columns)
+    for feature, value in sampling_values.items():
+        assert tree_values[feature] == pytest.approx(value, abs=1e-2)
+    assert tree["expected_value"] == pytest.approx(sampling["expected_value"], abs=1e-2)
+
+
+def test_tree_values_are_additive():
+    """Expected value plus contributions reproduces the ensemble probability, one-hot columns folded back"""
+    X, y = _dataset()
+    bundle = _bundle(X, y, [
+        ("rf", RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0)),
+        ("gb", GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0)),
+    ])
+    sample = X.iloc[:50]
+
+    result = shap_explain_instance(bundle, sample, method="auto")
+    proba = bundle["pipeline"].predict_proba(sample.iloc[[0]])[0, 1]
+
+    assert result["method"] == "tree"
+    total = result["expected_value"] + sum(_as_dict(result).values())
+    assert total == pytest.approx(proba, abs=1e-6)
+
+
+def test_non_tree_pipeline_falls_back_to_sampling():
+    """Pipelines without tree members use the model-agnostic explainer"""
+    X, y = _dataset(categorical=False)
+    bundle = _bundle(X, y, [("lr", LogisticRegression(max_iter=1000))])
+
+    result = shap_explain_instance(bundle, X.iloc[:30], top_k=3)
+
+    assert result["method"] == "sampling"
+    assert len(result["contributions"]) == 3
+    with pytest.raises(ValueError):
+        shap_explain_instance(bundle, X.iloc[:30], method="tree")
+
+
+def _tree_bundle():
+    X, y = _dataset()
+    bundle = _bundle(X, y, [
+        ("lr", LogisticRegression(max_iter=1000)),
+        ("rf", RandomForestClassifier(n_estimators=20, max_depth=4, random_state=0)),
+    ])
+    bundle["background"] = X
+    return X, bundle
+
+
+def test_summarize_background_keeps_observed_values():
+    """K-means summary has the requested size and only observed column values"""
+    X, _ = _dataset(categorical=False)
+    summary = summarize_background(X.to_numpy(), 10)
+
+    assert summary.shape == (10, X.shape[1])
+    for j, col in enumerate(X.columns):
+        assert set(summary[:, j]) <= set(X[col])
+    assert summarize_background(X.to_numpy()[:5], 10).shape == (5, X.shape[1])
+
+
+def test_cached_explainer_matches_per_call_explanation():
+    """Without summarization the cached explainer reproduces the per-call tree path"""
+    X, bundle = _tree_bundle()
+    registry = ExplainerRegistry(background_size=len(X))
+    explainer = registry.get("diabetes", "v1", bundle)
+
+    cached = shap_explain_instance(bundle, X, explainer=explainer)
+    fresh = shap_explain_instance(bundle, X, method="tree")
+
+    assert cached["method"] == "tree"
+    assert _as_dict(cached) == pytest.approx(_as_dict(fresh), abs=1e-6)
+    assert len(explainer.explain(X.iloc[:5])) == 5
+
+
+def test_registry_reuses_and_evicts_explainers():
+    """Explainers are built once per (disease, version); old versions and LRU entries are dropped"""
+    X, bundle = _tree_bundle()
+    registry = ExplainerRegistry(max_entries=2, background_size=10)
+
+    first = registry.get("diabetes", "v1", bundle)
+    assert registry.get("diabetes", "v1", bundle) is first
+
+    registry.get("diabetes", "v2", bundle)
+    assert ("diabetes", "v1") not in registry
+
+    registry.get("heart", "v1", bundle)
+    registry.get("kidney", "v1", bundle)
+    assert len(registry) == 2
+    assert ("diabetes", "v2") not in registry
+
+    registry.evict("heart")
+    assert len(registry) == 1
+    with pytest.raises(ValueError):
+        registry.get("heart", "v1", bundle["pipeline"])
+
+
+def test_model_version_reads_metadata_in_saved_models(tmp_path):
+    """The metadata path only rewrites the file name, not the saved_models directory"""
+    save_dir = tmp_path / "models" / "saved_models"
+    save_dir.mkdir(parents=True)
+    model_path = save_dir / "heart_model.joblib"
+    model_path.write_bytes(b"model")
+    assert model_version(str(model_path)).startswith("mtime")
+
+    (save_dir / "heart_metadata.json").write_text('{"version": 3}')
+    assert model_version(str(model_path)) == "v3"
@@ -0,0 +1,80 @@
+"""
+Unit tests for the precomputed CV fold cache
+"""
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_processing.fold_cache import FoldCache, dataset_hash
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 4)), columns=list("abcd"))
+    y = pd.Series((X["a"] + rng.normal(size=200) > 0).astype(int))
+    return X, y
+
+
+def test_kfold_matches_stratified_kfold(tmp_path, data):
+    """Cached folds reproduce StratifiedKFold splits and per-fold scaling"""
+    X, y = data
+    splits = FoldCache(str(tmp_path)).kfold(X, y, n_splits=5, seed=42, preprocess="standard")
+    expected = list(StratifiedKFold(5, shuffle=True, random_state=42).split(X, y))
+
+    for i, (train_idx, test_idx) in enumerate(expected):
+        X_train, X_test, y_train, y_test = splits.fold(i)
+        scaler = StandardScaler().fit(X.iloc[train_idx])
+        assert isinstance(X_train, np.memmap)
+        np.testing.assert_allclose(X_train, scaler.transform(X.iloc[train_idx]))
+        np.testing.assert_allclose(X_test, scaler.transform(X.iloc[test_idx]))
+        np.testing.assert_array_equal(y_test, y.iloc[test_idx])
+
+
+def test_holdout_matches_train_test_split(tmp_path, data):
+    """Cached holdout indices equal train_test_split on the same seed"""
+    X, y = data
+    splits = FoldCache(str(tmp_path)).holdout(X, y, test_size=0.2, seed=42, indices_only=True)
+    X_train, X_test, _, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    train_idx, test_idx = splits.indices()[0]
+    np.testing.assert_array_equal(train_idx, X_train.index.to_numpy())
+    np.testing.assert_array_equal(test_idx, X_test.index.to_numpy())
+    with pytest.raises(ValueError):
+        splits.fold(0)
+
+
+def test_entries_are_reused_across_instances(tmp_path, data):
+    """A second cache instance reads the existing entry instead of rebuilding"""
+    X, y = data
+    first = FoldCache(str(tmp_path)).kfold(X, y, preprocess="standard")
+    mtime = os.path.getmtime(os.path.join(first.path, "manifest.json"))
+
+    second = FoldCache(str(tmp_path)).kfold(X, y, preprocess="standard")
+    assert second.path == first.path
+    assert os.path.getmtime(os.path.join(second.path, "manifest.json")) == mtime
+
+
+def test_key_changes_with_data_and_seed(tmp_path, data):
+    """Different data or split seeds get separate entries"""
+    X, y = data
+    cache = FoldCache(str(tmp_path))
+    base = cache.kfold(X, y, seed=42).path
+
+    assert cache.kfold(X, y, seed=7).path != base
+    assert cache.kfold(X * 2, y, seed=42).path != base
+    assert dataset_hash(X, y) != dataset_hash(X, 1 - y)
+
+
+def test_transformer_keeps_feature_names(tmp_path, data):
+    """The cached scaler is fitted with the DataFrame's column names"""
+    X, y = data
+    scaler = FoldCache(str(tmp_path)).holdout(X, y, preprocess="standard").transformer(0)
+
+    assert list(scaler.feature_names_in_) == list("abcd")
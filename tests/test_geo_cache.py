@@ -0,0 +1,155 @@
+"""
+Unit tests for the geo-tiled hospital lookup cache
+"""
+import pytest
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.osm_maps as osm_maps
+from src.services.geo import geohash_bounds, geohash_encode, haversine_m, haversine_many, nearest_order
+from src.services.maps import rank_places_by_distance
+from src.services.geo_cache import GeoTileCache, SQLiteTileBackend, tile_key
+
+
+class FakeOverpass:
+    """Facilities on a small grid around a point; records every fetch"""
+
+    def __init__(self, lat=52.52, lng=13.40):
+        self.calls = []
+        self.facilities = [
+            {"osm_type": "node", "osm_id": i * 10 + j, "lat": lat + 0.01 * i, "lng": lng + 0.01 * j,
+             "tags": {"name": f"Clinic {i},{j}", "amenity": "hospital"}}
+            for i in range(-8, 9) for j in range(-8, 9)
+        ]
+
+    def __call__(self, lat, lng, radius_m):
+        self.calls.append((lat, lng, radius_m))
+        return [f for f in self.facilities if haversine_m(lat, lng, f["lat"], f["lng"]) <= radius_m]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_geohash_roundtrip():
+    """Encoding matches the reference geohash and the cell contains the point"""
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash_encode(-33.86, 151.21, 6))
+    assert min_lat <= -33.86 <= max_lat and min_lng <= 151.21 <= max_lng
+
+
+def test_vectorized_haversine_and_top_k():
+    """Batch distances equal the scalar formula and top-k equals a full sort prefix"""
+    rng = np.random.default_rng(0)
+    lats, lngs = rng.uniform(-80, 80, 500), rng.uniform(-180, 180, 500)
+    batch = haversine_many(60.0, 10.0, lats, lngs)
+    assert batch == pytest.approx([haversine_m(60.0, 10.0, a, b) for a, b in zip(lats, lngs)], rel=1e-9)
+
+    # One degree of longitude at 60N is about half of one at the equator
+    assert haversine_m(60.0, 10.0, 60.0, 11.0) == pytest.approx(55_800, rel=0.01)
+
+    distances = np.round(batch, -5)  # plenty of ties
+    full = np.argsort(distances, kind="stable")
+    assert nearest_order(distances, 25).tolist() == full[:25].tolist()
+    assert nearest_order(distances).tolist() == full.tolist()
+
+
+def test_google_places_ranked_by_distance():
+    """Places results get distance_km and come back nearest first"""
+    places = [
+        {"name": "far", "location": {"lat": 52.60, "lng": 13.40}},
+        {"name": "no location", "location": {}},
+        {"name": "near", "location": {"lat": 52.521, "lng": 13.401}},
+    ]
+    ranked = rank_places_by_distance(places, 52.52, 13.40)
+    assert [p["name"] for p in ranked] == ["near", "far", "no location"]
+    assert ranked[0]["distance_km"] == pytest.approx(0.13, abs=0.01)
+    assert ranked[-1]["distance_km"] is None
+    assert [p["name"] for p in rank_places_by_distance(places, 52.52, 13.40, k=1)] == ["near"]
+
+
+def test_nearby_queries_share_a_tile():
+    """Points a few metres apart are answered from one fetch, filtered to their own radius"""
+    fetch = FakeOverpass()
+    cache = GeoTileCache()
+
+    first = cache.get_or_fetch(52.52, 13.40, 3000, fetch)
+    second = cache.get_or_fetch(52.5201, 13.4002, 3000, fetch)
+
+    assert len(fetch.calls) == 1
+    assert fetch.calls[0][2] > 5000  # bucket plus tile half-diagonal
+    assert second == fetch(52.5201, 13.4002, 3000)
+    assert first == fetch(52.52, 13.40, 3000)
+    assert cache.metrics()["hits"] == 1 and cache.metrics()["misses"] == 1
+    assert cache.stats.hit_rate == 0.5
+
+
+def test_ttl_and_size_bound():
+    """Expired tiles are refetched and the least recently used tile is evicted"""
+    fetch = FakeOverpass()
+    clock = Clock()
+    cache = GeoTileCache(ttl_seconds=60, max_entries=2, clock=clock)
+
+    cache.get_or_fetch(52.52, 13.40, 1000, fetch)
+    clock.now += 61
+    cache.get_or_fetch(52.52, 13.40, 1000, fetch)
+    assert len(fetch.calls) == 2
+    assert cache.stats.expired == 1
+
+    cache.get_or_fetch(52.55, 13.45, 1000, fetch)
+    cache.get_or_fetch(52.48, 13.35, 1000, fetch)
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+
+    # Radii above the largest bucket bypass the cache
+    assert tile_key(52.52, 13.40, 80000) is None
+    cache.get_or_fetch(52.52, 13.40, 80000, fetch)
+    assert cache.stats.bypassed == 1
+
+
+def test_failed_fetch_releases_tile_lock():
+    """A fetch that raises without a stale tile leaves no per-tile lock behind"""
+    def failing(lat, lng, radius_m):
+        raise RuntimeError("Overpass down")
+
+    cache = GeoTileCache(ttl_seconds=60)
+    for lng in (13.40, 13.50, 13.60):
+        with pytest.raises(RuntimeError):
+            cache.get_or_fetch(52.52, lng, 1000, failing)
+    assert cache._fetch_locks == {}
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    """Tiles stored in SQLite are served by a new cache instance"""
+    path = str(tmp_path / "tiles.sqlite")
+    fetch = FakeOverpass()
+    GeoTileCache(backend=SQLiteTileBackend(path)).get_or_fetch(52.52, 13.40, 2000, fetch)
+
+    restarted = GeoTileCache(backend=SQLiteTileBackend(path))
+    result = restarted.get_or_fetch(52.52, 13.40, 2000, fetch)
+
+    assert len(fetch.calls) == 1
+    assert result == fetch(52.52, 13.40, 2000)
+    assert restarted.stats.hits == 1
+
+
+def test_osm_lookup_uses_cache(monkeypatch):
+    """find_hospitals_nearby_osm only calls Overpass once per tile"""
+    fetch = FakeOverpass()
+    monkeypatch.setattr(osm_maps, "fetch_osm_facilities", fetch)
+    monkeypatch.setattr(osm_maps, "_default_cache", GeoTileCache())
+
+    first = osm_maps.find_hospitals_nearby_osm(52.519, 13.40, "heart", 2000)
+    second = osm_maps.find_hospitals_nearby_osm(52.5192, 13.4001, "heart", 2000)
+
+    assert len(fetch.calls) == 1
+    assert first and second
+    distances = [h["distance_meters"] for h in second]
+    assert distances == sorted(distances)
@@ -0,0 +1,141 @@
+"""
+Unit tests for the hedged / parallel multi-backend hospital search
+"""
+import pytest
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.hospital_search as hospital_search
+from src.services.hospital_search import (
+    GOOGLE, OSM, NoMapServiceError, merge_hospitals, search_hospitals,
+)
+from src.utils.metrics import LatencyHistogram
+from src.utils.settings import build_settings
+
+
+def _osm(name, lat, lng, km):
+    return {"name": name, "rating": None, "user_ratings_total": 0, "lat": lat, "lng": lng, "distance_km": km}
+
+
+def _google(name, lat, lng, km, rating=4.2):
+    return {"name": name, "rating": rating, "user_ratings_total": 10, "location": {"lat": lat, "lng": lng},
+            "distance_km": km}
+
+
+class FakeBackend:
+    """Answers (or raises) after a delay; records calls"""
+
+    def __init__(self, result, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, lat, lng, disease, radius, k):
+        self.calls += 1
+        time.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """Fake OSM and Google backends, fresh histograms and a 0.1 s hedge delay until 5 samples"""
+    fakes = {OSM: FakeBackend([_osm("Charite Campus Mitte", 52.525, 13.377, 1.7)]),
+             GOOGLE: FakeBackend([_google("Charité – Campus Mitte", 52.5251, 13.3772, 1.7)])}
+    for name, fake in fakes.items():
+        monkeypatch.setitem(hospital_search.BACKENDS, name, fake)
+        monkeypatch.setitem(hospital_search._histograms, name, LatencyHistogram())
+    cfg = build_settings({"maps": {"hedging": {"default_delay": 0.1, "min_samples": 5, "min_delay": 0.01}}})
+    monkeypatch.setattr(hospital_search, "_settings", lambda: cfg.maps.hedging)
+    return fakes
+
+
+def test_histogram_quantiles():
+    """Interpolated quantiles follow the recorded distribution"""
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.95) is None
+    for i in range(100):
+        histogram.record(0.1 if i < 90 else 2.0)
+    assert 0.05 < histogram.quantile(0.5) <= 0.1
+    assert 1.0 < histogram.quantile(0.95) <= 2.0
+    assert histogram.as_dict()["buckets"]["le_0.1"] == 90
+
+
+def test_hedged_uses_secondary_when_primary_is_slow(backends):
+    """A slow primary is hedged after the delay and the faster answer wins"""
+    backends[OSM].delay = 0.6
+    start = time.perf_counter()
+    hospitals, source = search_hospitals(52.52, 13.40, "heart", mode="hedged")
+    assert source == "Google Maps" and hospitals[0]["rating"] == 4.2
+    assert time.perf_counter() - start < 0.4
+
+
+def test_hedged_skips_secondary_for_fast_primary(backends):
+    """A primary answering within the delay is the only call"""
+    hospitals, source = search_hospitals(52.52, 13.40, "heart", mode="hedged")
+    assert source == "OpenStreetMap"
+    assert backends[GOOGLE].calls == 0
+
+
+def test_hedged_fails_over_at_once_and_reports_both_errors(backends):
+    """A primary error fires the secondary immediately; if both fail the error lists both"""
+    backends[OSM].result = RuntimeError("overpass down")
+    backends[GOOGLE].delay = 0.05
+    start = time.perf_counter()
+    assert search_hospitals(52.52, 13.40, "heart", mode="hedged")[1] == "Google Maps"
+    assert time.perf_counter() - start < 0.1
+
+    backends[GOOGLE].result = ValueError("no API key")
+    with pytest.raises(NoMapServiceError, match="overpass down.*no API key"):
+        search_hospitals(52.52, 13.40, "heart", mode="hedged")
+
+
+def test_hedge_delay_tracks_primary_latency(backends):
+    """After min_samples, the delay is the primary's 95th percentile latency"""
+    assert hospital_search.hedge_delay(OSM) == 0.1
+    backends[OSM].delay = 0.02
+    for _ in range(5):
+        search_hospitals(52.52, 13.40, "heart", mode="fallback")
+    assert 0.01 < hospital_search.hedge_delay(OSM) <= 0.05
+    assert hospital_search.latency_metrics()[OSM]["count"] == 5
+
+
+def test_parallel_merges_duplicates(backends):
+    """Both backends run; the same facility (close by, similar name) appears once with the Google rating"""
+    backends[GOOGLE].result.append(_google("Vivantes Klinikum", 52.50, 13.45, 3.9))
+    backends[GOOGLE].result.append(_google("Charite Dental Clinic", 52.5252, 13.3771, 1.71))
+    hospitals, source = search_hospitals(52.52, 13.40, "heart", mode="parallel")
+
+    assert source == "OpenStreetMap+Google Maps"
+    assert [h["name"] for h in hospitals] == ["Charite Campus Mitte", "Charite Dental Clinic", "Vivantes Klinikum"]
+    assert hospitals[0]["rating"] == 4.2
+
+
+def test_merge_keeps_distant_namesakes():
+    """Same name far apart is two facilities"""
+    merged = merge_hospitals([_osm("City Hospital", 52.52, 13.40, 1.0)], [_google("City Hospital", 52.60, 13.40, 9.0)])
+    assert len(merged) == 2
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        search_hospitals(52.52, 13.40, "heart", mode="fastest")
+
+
+def test_pool_size_and_queue_time(backends, monkeypatch):
+    """The pool is sized by maps.hedging.workers and latency includes time queued in it"""
+    monkeypatch.setattr(hospital_search, "_executor", None)
+    cfg = build_settings({"maps": {"hedging": {"workers": 1}}}).maps.hedging
+    monkeypatch.setattr(hospital_search, "_settings", lambda: cfg)
+    executor = hospital_search._get_executor(cfg)
+    try:
+        assert executor._max_workers == 1
+        executor.submit(time.sleep, 0.3)  # occupies the only worker
+        search_hospitals(52.52, 13.40, "heart", mode="parallel")
+        assert hospital_search._histograms[OSM].max >= 0.25
+    finally:
+        executor.shutdown(wait=False)
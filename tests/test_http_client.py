@@ -0,0 +1,200 @@
+"""
+Unit tests for the pooled map-backend HTTP layer, against a local stub server
+"""
+import json
+import pytest
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.http_client as http_client
+import src.services.osm_maps as osm_maps
+from src.services.geo_cache import GeoTileCache
+from src.services.http_client import BackendSession, CircuitBreaker, CircuitOpenError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _reply(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        server.requests.append((self.command, self.path, self.client_address[1]))
+        status, delay, body = server.script.pop(0) if server.script else server.default
+        if delay:
+            time.sleep(delay)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # clients that time out or stop reading reset the connection
+
+
+@pytest.fixture
+def stub_server():
+    """Local HTTP server answering from a script of (status, delay, body), then ``default``"""
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.script = []
+    server.default = (200, 0, {"elements": []})
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _session(**kwargs):
+    kwargs.setdefault("sleep", lambda seconds: None)
+    return BackendSession("stub", **kwargs)
+
+
+def test_connections_are_reused(stub_server):
+    """Consecutive calls go over one keep-alive connection"""
+    backend = _session()
+    for _ in range(5):
+        assert backend.get(stub_server.url + "/api").json() == {"elements": []}
+    ports = {port for _, _, port in stub_server.requests}
+    assert len(stub_server.requests) == 5 and len(ports) == 1
+    backend.close()
+
+
+def test_transient_errors_are_retried_with_jitter(stub_server):
+    """5xx/429 answers are retried after jittered, growing delays; 4xx is returned as is"""
+    delays = []
+    backend = _session(retries=3, backoff_seconds=0.2, sleep=delays.append)
+    stub_server.script = [(503, 0, {}), (429, 0, {}), (200, 0, {"ok": True})]
+
+    assert backend.post(stub_server.url, data={"data": "q"}).json() == {"ok": True}
+    assert len(stub_server.requests) == 3
+    assert len(delays) == 2 and 0 <= delays[0] <= 0.2 and 0 <= delays[1] <= 0.4
+    assert backend.metrics()["retries"] == 2 and backend.metrics()["failures"] == 0
+
+    stub_server.script = [(404, 0, {})]
+    assert backend.get(stub_server.url).status_code == 404
+    assert len(stub_server.requests) == 4
+
+    stub_server.script = [(500, 0, {})] * 4
+    with pytest.raises(requests.HTTPError):
+        backend.get(stub_server.url)
+    assert len(stub_server.requests) == 8
+
+
+def test_read_timeout_is_per_backend(stub_server):
+    """A slow backend fails after its own read timeout, not a global 30 s"""
+    backend = _session(read_timeout=0.2, retries=0)
+    stub_server.script = [(200, 1.0, {})]
+    start = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        backend.get(stub_server.url)
+    assert time.perf_counter() - start < 0.9
+
+
+def test_circuit_opens_and_recovers(stub_server):
+    """After the threshold calls fail fast; after the reset one trial call closes the circuit"""
+    clock = Clock()
+    backend = _session(retries=0, failure_threshold=2, reset_seconds=30, clock=clock)
+    stub_server.default = (503, 0, {})
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            backend.get(stub_server.url)
+    assert backend.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        backend.get(stub_server.url)
+    assert len(stub_server.requests) == 2  # short-circuited
+
+    clock.now += 31
+    assert backend.breaker.state == CircuitBreaker.HALF_OPEN
+    stub_server.default = (200, 0, {})
+    assert backend.get(stub_server.url).status_code == 200
+    assert backend.breaker.state == CircuitBreaker.CLOSED
+    assert backend.metrics()["circuit"]["opened"] == 1
+
+
+def test_failed_trial_reopens_and_only_one_trial_runs():
+    """Half-open admits a single trial; its failure reopens the circuit"""
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.opened == 2
+
+
+def test_overpass_outage_serves_stale_tiles(stub_server, monkeypatch):
+    """With Overpass down and its circuit open, cached tiles are served without waiting"""
+    clock = Clock()
+    backend = _session(retries=0, failure_threshold=1, reset_seconds=60, clock=clock)
+    monkeypatch.setitem(http_client._backends, "overpass", backend)
+    monkeypatch.setattr(osm_maps, "OVERPASS_URL", stub_server.url + "/api/interpreter")
+    cache = GeoTileCache(ttl_seconds=60, clock=clock)
+    monkeypatch.setattr(osm_maps, "get_osm_cache", lambda: cache)
+    stub_server.default = (200, 0, {"elements": [
+        {"type": "node", "id": 1, "lat": 52.5201, "lon": 13.4001, "tags": {"amenity": "hospital", "name": "Mitte"}},
+    ]})
+
+    first = osm_maps.find_hospitals_nearby_osm(52.52, 13.40, "heart", 2000, use_offline=False)
+    assert [h["name"] for h in first] == ["Mitte"]
+
+    # Tile expires and Overpass goes down: the stale tile answers, then the circuit opens
+    clock.now += 120
+    stub_server.default = (502, 0, {})
+    again = osm_maps.find_hospitals_nearby_osm(52.52, 13.40, "heart", 2000, use_offline=False)
+    assert again == first and backend.breaker.state == CircuitBreaker.OPEN
+    requests_so_far = len(stub_server.requests)
+    osm_maps.find_hospitals_nearby_osm(52.52, 13.40, "heart", 2000, use_offline=False)
+    assert len(stub_server.requests) == requests_so_far
+    assert cache.stats.stale == 2
+
+    # No cached tile elsewhere: the caller gets an error at once
+    with pytest.raises(Exception, match="unavailable"):
+        osm_maps.find_hospitals_nearby_osm(48.85, 2.35, "heart", 2000, use_offline=False)
+
+
+def test_google_client_is_shared(monkeypatch):
+    """One googlemaps.Client per API key, on the pooled google_places session"""
+    import src.services.maps as maps
+
+    backend = _session()
+    monkeypatch.setitem(http_client._backends, "google_places", backend)
+    monkeypatch.setattr(maps, "_clients", {})
+
+    client = maps.get_gmaps_client("AIza-test-key")
+    assert maps.get_gmaps_client("AIza-test-key") is client
+    assert client.session is backend.session
+    assert maps.get_gmaps_client("AIza-other-key") is not client
@@ -0,0 +1,79 @@
+"""
+Unit tests for precomputed population SHAP importance
+"""
+import pytest
+import sys
+import os
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.models.importance import compute_global_importance, load_importance, save_importance
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(160, 4)), columns=["glucose", "bmi", "age", "noise"])
+    y = ((X["glucose"] + X["bmi"] * X["age"]) > 0).astype(int)
+    pipeline = Pipeline([
+        ("preprocess", ColumnTransformer([("num", StandardScaler(), X.columns.tolist())])),
+        ("clf", VotingClassifier([
+            ("lr", LogisticRegression()),
+            ("rf", RandomForestClassifier(n_estimators=15, max_depth=4, random_state=0)),
+            ("gb", GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0)),
+        ], voting="soft")),
+    ]).fit(X, y)
+    return pipeline, X
+
+
+def test_importance_report_structure(fitted):
+    """Report ranks features by mean |SHAP| and splits rows into zones"""
+    pipeline, X = fitted
+    report = compute_global_importance(pipeline, X, background_size=10, n_jobs=1, interaction_rows=40)
+
+    ranking = [entry["feature"] for entry in report["mean_abs_shap"]]
+    assert set(ranking) == set(X.columns)
+    assert ranking[-1] == "noise"
+    assert sum(zone["count"] for zone in report["zones"].values()) == len(X)
+    for zone in report["zones"].values():
+        if zone["count"]:
+            assert set(zone["mean_shap"]) == set(X.columns)
+
+    top_pair = report["interactions"][0]
+    assert "noise" not in top_pair["features"]
+    assert sum(pair["strength"] for pair in report["interactions"]) == pytest.approx(1.0)
+
+
+def test_parallel_chunks_match_serial(fitted):
+    """Worker-process chunks give the same numbers as the in-process run"""
+    pipeline, X = fitted
+    kwargs = dict(background_size=10, chunk_size=50, interaction_rows=30)
+    serial = compute_global_importance(pipeline, X, n_jobs=1, **kwargs)
+    parallel = compute_global_importance(pipeline, X, n_jobs=2, **kwargs)
+
+    assert [e["feature"] for e in serial["mean_abs_shap"]] == [e["feature"] for e in parallel["mean_abs_shap"]]
+    for a, b in zip(serial["mean_abs_shap"], parallel["mean_abs_shap"]):
+        assert a["value"] == pytest.approx(b["value"], abs=1e-9)
+    assert serial["interactions"] == pytest.approx(parallel["interactions"])
+
+
+def test_save_and_load_importance(fitted, tmp_path):
+    """Reports round-trip through <condition>_importance.json"""
+    pipeline, X = fitted
+    report = compute_global_importance(pipeline, X.iloc[:40], background_size=5, n_jobs=1, interaction_rows=0)
+    path = save_importance(report, str(tmp_path), "heart")
+
+    assert os.path.basename(path) == "heart_importance.json"
+    loaded = load_importance(str(tmp_path), "heart")
+    assert loaded["condition"] == "heart"
+    assert loaded["interactions"] == []
+    with pytest.raises(FileNotFoundError):
+        load_importance(str(tmp_path), "kidney")
@@ -0,0 +1,206 @@
+"""
+Unit tests for the concurrent SOS notifier, against a local SMTP debug server
+and a fake Twilio endpoint
+"""
+import base64
+import json
+import pytest
+import socketserver
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.notify as notify
+from src.utils.settings import build_settings
+
+SMS_LATENCY = 0.3
+
+
+class SMTPDebugHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server: records connections and delivered messages"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost SMTP debug server")
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip(" <>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                if server.hang:
+                    time.sleep(server.hang)
+                    return
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+                    lines.append(data.decode())
+                with server.lock:
+                    server.messages.append((sender, recipients, "".join(lines)))
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class FakeTwilio(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode()).items()}
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("Authorization"), form))
+        time.sleep(SMS_LATENCY)
+        if form["To"] in server.invalid:
+            status, body = 400, {"code": 21211, "message": f"The 'To' number {form['To']} is not a valid phone number."}
+        else:
+            status, body = 201, {"sid": f"SM{len(server.requests):032d}", "status": "queued"}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(server):
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Local SMTP and Twilio stand-ins plus settings with four contacts pointing at them"""
+    smtp = _serve(socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPDebugHandler))
+    smtp.connections, smtp.messages, smtp.hang = 0, [], 0
+    twilio = _serve(ThreadingHTTPServer(("127.0.0.1", 0), FakeTwilio))
+    twilio.requests, twilio.invalid = [], set()
+
+    def configure(**notify_overrides):
+        settings = build_settings({"services": {
+            "twilio": {"account_sid": "AC0001", "auth_token": "secret-token", "from_number": "+15550000000"},
+            "smtp": {"host": "127.0.0.1", "port": smtp.server_address[1], "from_email": "sos@example.com"},
+            "emergency_contacts": [
+                {"name": f"Contact {i}", "phone": f"+1555000000{i}", "email": f"contact{i}@example.com"}
+                for i in range(1, 5)
+            ],
+            "notify": dict({
+                "twilio_api_base": f"http://127.0.0.1:{twilio.server_address[1]}",
+                "smtp_starttls": False, "sms_timeout": 3, "email_timeout": 3,
+            }, **notify_overrides),
+        }})
+        monkeypatch.setattr(notify, "get_settings", lambda *args: settings)
+
+    monkeypatch.setattr(notify, "_twilio_session", None)
+    configure()
+    yield type("Providers", (), {"smtp": smtp, "twilio": twilio, "configure": staticmethod(configure)})
+    for server in (smtp, twilio):
+        server.shutdown()
+        server.server_close()
+
+
+def test_sos_fans_out_concurrently_over_shared_sessions(providers):
+    """All SMS in about one provider round trip; all emails over a single SMTP connection"""
+    start = time.perf_counter()
+    result = notify.send_sos("Patient at high risk: chest pain, BP 180/110")
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 2 * SMS_LATENCY  # serially: 4 x SMS_LATENCY plus 4 SMTP sessions
+    assert all(r["sms"] and r["email"] and not r["errors"] for r in result["sent"])
+    assert all(0 < r["timings_ms"]["sms"] < 2000 * SMS_LATENCY for r in result["sent"])
+
+    assert providers.smtp.connections == 1
+    assert sorted(rcpts[0] for _, rcpts, _ in providers.smtp.messages) == [
+        f"contact{i}@example.com" for i in range(1, 5)
+    ]
+    path, auth, form = providers.twilio.requests[0]
+    assert path == "/2010-04-01/Accounts/AC0001/Messages.json"
+    assert base64.b64decode(auth.split()[1]) == b"AC0001:secret-token"
+    assert form["From"] == "+15550000000" and form["Body"].startswith("Patient at high risk")
+
+
+def test_provider_errors_are_reported_per_contact(providers):
+    """A rejected number fails only that contact's SMS; nothing is raised"""
+    providers.twilio.invalid.add("+15550000002")
+    result = notify.send_sos("SOS")
+
+    failed = result["sent"][1]
+    assert failed["sms"] is False and "not a valid phone number" in failed["errors"]["sms"]
+    assert failed["email"] is True
+    assert [r["sms"] for r in result["sent"]] == [True, False, True, True]
+
+
+def test_email_timeout_does_not_hold_up_sms(providers):
+    """A hanging SMTP server costs at most the email timeout; SMS still go out"""
+    providers.smtp.hang = 2
+    providers.configure(email_timeout=0.8)
+    start = time.perf_counter()
+    result = notify.send_sos("SOS")
+
+    assert time.perf_counter() - start < 1.5
+    assert all(r["sms"] for r in result["sent"])
+    assert all(not r["email"] and "timed out" in r["errors"]["email"] for r in result["sent"])
+
+
+def test_unconfigured_channels_are_skipped(monkeypatch):
+    """Without Twilio or SMTP credentials nothing is attempted and nothing fails"""
+    settings = build_settings({"services": {"emergency_contacts": [{"name": "A", "phone": "+1", "email": "a@x.org"}]}})
+    monkeypatch.setattr(notify, "get_settings", lambda *args: settings)
+    result = notify.send_sos("SOS")
+    assert result["sent"] == [{"contact": {"name": "A", "phone": "+1", "email": "a@x.org"},
+                               "sms": False, "email": False, "timings_ms": {}, "errors": {}}]
+
+
+def test_batch_senders_report_one_result_per_message(providers):
+    """Outbox batches: one Twilio client and one SMTP connection, errors per message"""
+    providers.twilio.invalid.add("+15550000002")
+    sms = notify.send_sms_batch([(f"+1555000000{i}", "SOS") for i in range(1, 4)])
+    assert sms[0] is None and sms[2] is None and "not a valid phone number" in sms[1]
+
+    emails = notify.send_email_batch([(f"contact{i}@example.com", "Alert", "SOS") for i in range(1, 4)])
+    assert emails == [None, None, None]
+    assert providers.smtp.connections == 1 and len(providers.smtp.messages) == 3
+
+
+def test_twilio_outage_never_blocks_later_sms(providers):
+    """No circuit breaker on SMS, and the read timeout follows the current settings"""
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed_port = s.getsockname()[1]
+    providers.configure(twilio_api_base=f"http://127.0.0.1:{closed_port}")
+    for _ in range(8):
+        assert "Connection" in notify.send_sms_batch([("+15550000001", "SOS")])[0]
+
+    providers.configure()
+    assert notify.send_sms_batch([("+15550000001", "SOS")]) == [None]
+
+    providers.configure(sms_timeout=0.1)  # the shared session was built with 3 s
+    assert "timed out" in notify.send_sms_batch([("+15550000001", "SOS")])[0].lower()
@@ -0,0 +1,96 @@
+"""
+Unit tests for the offline OSM hospital index
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.osm_maps as osm_maps
+from src.services.geo import haversine_m
+from src.services.osm_index import FacilityIndex, build_index, read_extract, read_extract_bounds
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "osm")
+XML_EXTRACT = os.path.join(FIXTURES, "sample_extract.osm")
+GEOJSON_EXTRACT = os.path.join(FIXTURES, "sample_extract.geojson")
+
+
+def _summary(facilities):
+    return sorted((f["osm_type"], f["osm_id"], round(f["lat"], 6), round(f["lng"], 6)) for f in facilities)
+
+
+def test_extract_formats_agree():
+    """XML and GeoJSON readers keep the same medical facilities; ways become their node centroid"""
+    from_xml = read_extract(XML_EXTRACT)
+    from_geojson = read_extract(GEOJSON_EXTRACT)
+
+    assert len(from_xml) == 6  # pharmacy and the residential way are dropped
+    assert _summary(from_xml) == _summary(from_geojson)
+    way = next(f for f in from_xml if f["osm_type"] == "way")
+    assert way["lat"] == pytest.approx(52.509) and way["lng"] == pytest.approx(13.381)
+    with pytest.raises(ValueError):
+        read_extract("extract.shp")
+
+
+def test_index_queries_match_brute_force(tmp_path):
+    """Radius and k-nearest answers from the saved table equal exhaustive haversine search"""
+    path = str(tmp_path / "facilities.npz")
+    assert build_index(XML_EXTRACT, path) == 6
+    index = FacilityIndex.load(path)
+    lat, lng = 52.52, 13.40
+
+    by_distance = sorted(index.facilities, key=lambda f: haversine_m(lat, lng, f["lat"], f["lng"]))
+    within = [f for f in by_distance if haversine_m(lat, lng, f["lat"], f["lng"]) <= 2000]
+    assert [f["osm_id"] for f in index.within(lat, lng, 2000)] == [f["osm_id"] for f in within]
+
+    nearest = index.nearest(lat, lng, k=3)
+    assert [f["osm_id"] for f, _ in nearest] == [f["osm_id"] for f in by_distance[:3]]
+    assert nearest[0][1] == pytest.approx(haversine_m(lat, lng, by_distance[0]["lat"], by_distance[0]["lng"]), rel=1e-6)
+    assert index.nearest(lat, lng, k=50)[-1][0] is by_distance[-1]
+
+
+def test_offline_index_replaces_overpass(monkeypatch):
+    """Points inside the extract never reach Overpass; points outside fall back to it"""
+    calls = []
+
+    def fake_overpass(lat, lng, radius_m, max_results=None, keep=None):
+        calls.append((lat, lng))
+        return []
+
+    monkeypatch.setattr(osm_maps, "fetch_osm_facilities", fake_overpass)
+    index = FacilityIndex(read_extract(XML_EXTRACT), read_extract_bounds(XML_EXTRACT))
+    monkeypatch.setattr(osm_maps, "_offline_index", index)
+    monkeypatch.setattr(osm_maps, "_offline_index_loaded", True)
+
+    heart = osm_maps.find_hospitals_nearby_osm(52.52, 13.40, "heart", 2000, use_cache=False)
+    names = [h["name"] for h in heart]
+    assert "Herzzentrum Cardiology Clinic" in names
+    assert "Dental Clinic North" not in names
+    assert calls == []
+
+    nearest = osm_maps.nearest_hospitals_osm(52.52, 13.40, "kidney", k=2, radius_m=2000)
+    assert [h["name"] for h in nearest] == ["Charite Campus Mitte", "Nephrology Practice Prenzlauer Berg"]
+
+    assert osm_maps.nearest_hospitals_osm(48.85, 2.35, "kidney", k=2, radius_m=2000) is None
+    osm_maps.find_hospitals_nearby_osm(48.85, 2.35, "kidney", 3000, use_cache=False)
+    assert calls == [(48.85, 2.35)]
+
+
+def test_coverage_and_nearest_respect_the_radius(tmp_path, monkeypatch):
+    """The saved extract bounds shrink by the radius; nearest hits beyond it are dropped"""
+    path = str(tmp_path / "facilities.npz")
+    build_index(XML_EXTRACT, path)
+    index = FacilityIndex.load(path)
+    assert index.bounds == (52.50, 13.36, 52.55, 13.44)
+    assert FacilityIndex.load(path).bounds == read_extract_bounds(GEOJSON_EXTRACT)
+
+    # Inside the box, but a 2 km circle around it crosses the southern edge
+    assert index.covers(52.51, 13.40) and not index.covers(52.51, 13.40, 2000)
+    assert index.covers(52.52, 13.40, 2000)
+
+    monkeypatch.setattr(osm_maps, "_offline_index", index)
+    monkeypatch.setattr(osm_maps, "_offline_index_loaded", True)
+    nearest = osm_maps.nearest_hospitals_osm(52.52, 13.40, "kidney", k=2, radius_m=1000)
+    assert [h["name"] for h in nearest] == ["Charite Campus Mitte"]
+    assert osm_maps.nearest_hospitals_osm(52.51, 13.40, "kidney", k=2, radius_m=2000) is None
@@ -0,0 +1,228 @@
+"""
+Unit tests for the durable notification outbox and its dispatcher
+"""
+import pytest
+import random
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.outbox as outbox_module
+from src.services.outbox import FAILED, PENDING, SENT, Outbox, OutboxDispatcher
+from src.utils.settings import build_settings
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSender:
+    """Batch sender that records batches and fails recipients on demand"""
+
+    def __init__(self, failures=None, delay=0.0):
+        self.failures = failures or {}  # recipient -> number of attempts that fail
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, batch):
+        self.batches.append([m["recipient"] for m in batch])
+        time.sleep(self.delay)
+        errors = []
+        for m in batch:
+            if self.failures.get(m["recipient"], 0) > 0:
+                self.failures[m["recipient"]] -= 1
+                errors.append("provider unavailable")
+            else:
+                errors.append(None)
+        return errors
+
+
+def _messages(n, channel="sms"):
+    return [{"channel": channel, "recipient": f"+1555000{i:04d}", "body": "SOS"} for i in range(n)]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def outbox(tmp_path, clock):
+    box = Outbox(str(tmp_path / "outbox.sqlite"), lease_seconds=60, clock=clock)
+    yield box
+    box.close()
+
+
+def test_enqueue_is_durable_and_idempotent(tmp_path, outbox, clock):
+    """Messages survive a restart; a repeated idempotency key enqueues nothing"""
+    tracking_id, duplicate = outbox.enqueue(_messages(3), idempotency_key="alert-1")
+    assert not duplicate
+    assert outbox.enqueue(_messages(3), idempotency_key="alert-1") == (tracking_id, True)
+    assert outbox.enqueue(_messages(3))[0] != tracking_id
+
+    reopened = Outbox(outbox.path, clock=clock)
+    try:
+        status = reopened.status(tracking_id)
+        assert status["state"] == PENDING and len(status["messages"]) == 3
+        assert reopened.metrics()["backlog"] == 6
+    finally:
+        reopened.close()
+    assert outbox.status("unknown") is None
+    with pytest.raises(ValueError):
+        outbox.enqueue([{"channel": "fax", "recipient": "x", "body": "SOS"}])
+    with pytest.raises(ValueError):
+        outbox.enqueue([])
+
+
+def test_request_without_messages_is_never_delivered(outbox):
+    """A tracking id recorded without messages reports failed, not delivered"""
+    outbox._conn.execute("INSERT INTO outbox_requests VALUES ('empty', NULL, 'sos', 0)")
+    assert outbox.status("empty") == {"tracking_id": "empty", "state": FAILED, "messages": []}
+
+
+def test_sos_without_recipients_is_rejected(tmp_path, monkeypatch):
+    """No contact or channel configured: 503 and nothing is queued"""
+    from src.api.app import app
+
+    box = Outbox(str(tmp_path / "outbox.sqlite"))
+    monkeypatch.setattr(outbox_module, "_settings", lambda: build_settings({"services": {
+        "emergency_contacts": [{"name": "A", "phone": "+15550000001", "email": "a@example.com"}]}}))
+    monkeypatch.setattr(outbox_module, "_outbox", box)
+    monkeypatch.setattr(outbox_module, "_dispatcher", None)
+    app.config['TESTING'] = True
+    try:
+        with app.test_client() as client:
+            response = client.post('/sos', json={"summary": "SOS"}, headers={"Idempotency-Key": "k"})
+        assert response.status_code == 503
+        assert "no notification channel/contact configured" in response.get_json()["error"].lower()
+        assert box.metrics()["backlog"] == 0
+    finally:
+        box.close()
+
+
+def test_dispatcher_sends_in_batches_per_provider(outbox, clock):
+    """Each round hands every channel one batch of at most batch_size messages"""
+    sms, email = FakeSender(), FakeSender()
+    tracking_id, _ = outbox.enqueue(_messages(5) + _messages(2, "email"))
+    dispatcher = OutboxDispatcher(outbox, {"sms": sms, "email": email}, batch_size=3)
+    clock.now += 1.5
+
+    assert dispatcher.run_once() == 5
+    assert dispatcher.run_once() == 2
+    assert dispatcher.run_once() == 0
+    assert [len(b) for b in sms.batches] == [3, 2] and [len(b) for b in email.batches] == [2]
+
+    status = outbox.status(tracking_id)
+    assert status["state"] == "delivered"
+    assert all(m["status"] == SENT and m["attempts"] == 1 and m["delivery_seconds"] == 1.5 for m in status["messages"])
+    metrics = outbox.metrics()
+    assert metrics["backlog"] == 0 and metrics["by_channel"] == {"sms": {SENT: 5}, "email": {SENT: 2}}
+    assert metrics["delivery_latency"]["count"] == 7 and metrics["delivery_latency"]["p50"] <= 2.5
+
+
+def test_failures_retry_with_exponential_backoff(outbox, clock):
+    """A failed send is retried after a growing, jittered delay, then given up"""
+    flaky, dead = "+15550000000", "+15550000001"
+    sender = FakeSender(failures={flaky: 2, dead: 99})
+    tracking_id, _ = outbox.enqueue(_messages(2))
+    dispatcher = OutboxDispatcher(outbox, {"sms": sender}, max_attempts=4, base_backoff=2, max_backoff=5,
+                                  rng=random.Random(0))
+
+    delays = []
+    for _ in range(4):
+        start = clock.now
+        assert dispatcher.run_once() > 0
+        assert dispatcher.run_once() == 0  # nothing is due before the backoff expires
+        due = [row[0] for row in outbox._conn.execute(
+            "SELECT next_attempt_at FROM outbox_messages WHERE status = 'pending'").fetchall()]
+        if due:
+            delays.append(min(due) - start)
+            clock.now = max(due)
+
+    # attempt n waits min(5, 2 * 2 ** (n - 1)) seconds scaled by [0.5, 1]
+    assert [1 <= delays[0] <= 2, 2 <= delays[1] <= 4, 2.5 <= delays[2] <= 5] == [True] * 3
+    status = outbox.status(tracking_id)
+    assert status["state"] == "partial"
+    by_recipient = {m["recipient"]: m for m in status["messages"]}
+    assert by_recipient[flaky]["status"] == SENT and by_recipient[flaky]["attempts"] == 3
+    assert by_recipient[dead]["status"] == FAILED and by_recipient[dead]["attempts"] == 4
+    assert by_recipient[dead]["last_error"] == "provider unavailable"
+    assert outbox.metrics()["retried_messages"] == 2
+
+
+def test_expired_lease_is_reclaimed(outbox, clock):
+    """A message claimed by a dispatcher that died is handed out again after the lease"""
+    outbox.enqueue(_messages(1))
+    assert len(outbox.claim("sms", 10)) == 1
+    assert outbox.claim("sms", 10) == []
+    clock.now += 61
+    reclaimed = outbox.claim("sms", 10)
+    assert len(reclaimed) == 1 and reclaimed[0]["attempts"] == 2
+
+
+def test_sender_exception_fails_the_batch_without_stopping(outbox, clock):
+    """A raising sender marks its batch for retry; other channels are unaffected"""
+    def broken(batch):
+        raise ConnectionError("SMTP down")
+
+    email_id, _ = outbox.enqueue(_messages(2, "email"))
+    sms_id, _ = outbox.enqueue(_messages(2))
+    OutboxDispatcher(outbox, {"sms": FakeSender(), "email": broken}).run_once()
+
+    assert outbox.status(sms_id)["state"] == "delivered"
+    email = outbox.status(email_id)
+    assert email["state"] == PENDING and all(m["last_error"] == "SMTP down" for m in email["messages"])
+
+
+def test_sos_endpoint_returns_before_delivery(tmp_path, monkeypatch):
+    """POST /sos answers 202 with a tracking id while slow providers are still sending"""
+    from src.api.app import app
+
+    settings = build_settings({"services": {
+        "twilio": {"account_sid": "AC0001", "auth_token": "secret-token", "from_number": "+15550000000"},
+        "smtp": {"host": "127.0.0.1", "port": 2525, "from_email": "sos@example.com"},
+        "emergency_contacts": [{"name": "A", "phone": "+15550000001", "email": "a@example.com"},
+                               {"name": "B", "phone": "+15550000002"}],
+    }})
+    sms, email = FakeSender(delay=0.5), FakeSender(delay=0.5)
+    box = Outbox(str(tmp_path / "outbox.sqlite"))
+    dispatcher = OutboxDispatcher(box, {"sms": sms, "email": email}, poll_interval=5).start()
+    monkeypatch.setattr(outbox_module, "_settings", lambda: settings)
+    monkeypatch.setattr(outbox_module, "_outbox", box)
+    monkeypatch.setattr(outbox_module, "_dispatcher", dispatcher)
+
+    app.config['TESTING'] = True
+    try:
+        with app.test_client() as client:
+            start = time.perf_counter()
+            response = client.post('/sos', json={"summary": "Chest pain, BP 180/110"},
+                                   headers={"Idempotency-Key": "patient-7-alert"})
+            assert time.perf_counter() - start < 0.25
+            assert response.status_code == 202
+            queued = response.get_json()
+            assert queued["messages"] == 3 and not queued["duplicate"]
+
+            retry = client.post('/sos', json={"summary": "Chest pain, BP 180/110"},
+                                headers={"Idempotency-Key": "patient-7-alert"})
+            assert retry.status_code == 200 and retry.get_json()["tracking_id"] == queued["tracking_id"]
+
+            deadline = time.time() + 5
+            while client.get(queued["status_url"]).get_json()["state"] != "delivered" and time.time() < deadline:
+                time.sleep(0.05)
+            status = client.get(queued["status_url"]).get_json()
+            assert status["state"] == "delivered"
+            assert sorted(r for b in sms.batches for r in b) == ["+15550000001", "+15550000002"]
+            assert email.batches == [["a@example.com"]]
+
+            assert client.get('/sos/unknown').status_code == 404
+            assert client.post('/sos', json={}).status_code == 400
+            assert client.get('/health').get_json()["notification_outbox"]["backlog"] == 0
+    finally:
+        dispatcher.stop(timeout=2)
+        box.close()
@@ -0,0 +1,171 @@
+"""
+Unit tests for streaming Overpass parsing, using a recorded large response
+"""
+import gzip
+import json
+import pytest
+import random
+import sys
+import os
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.http_client as http_client
+import src.services.osm_maps as osm_maps
+from src.services.geo import haversine_m
+from src.services.http_client import BackendSession
+from src.services.overpass_stream import iter_json_array
+
+# Ring-ordered response (4 equal-area rings, 7000 facilities) for
+# build_overpass_query(52.52, 13.40, 60000, rings=4)
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "osm", "overpass_berlin_60km.json.gz")
+LAT, LNG = 52.52, 13.40
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    with gzip.open(FIXTURE) as f:
+        return f.read()
+
+
+class CountingChunks:
+    """Chunk iterator over a byte string that records how much was read"""
+
+    def __init__(self, data, size=65536):
+        self.data = data
+        self.size = size
+        self.read = 0
+
+    def __iter__(self):
+        while self.read < len(self.data):
+            chunk = self.data[self.read:self.read + self.size]
+            self.read += len(chunk)
+            yield chunk
+
+
+def _heart(facility):
+    return osm_maps.is_relevant(facility["tags"], "heart")
+
+
+def _brute_force_nearest(recorded, k):
+    elements = json.loads(recorded)["elements"]
+    facilities = [f for f in map(osm_maps._facility_from_element, elements) if f is not None and _heart(f)]
+    return sorted(facilities, key=lambda f: haversine_m(LAT, LNG, f["lat"], f["lng"]))[:k]
+
+
+def test_incremental_parse_matches_json_loads(recorded):
+    """Any chunking yields exactly the elements json.loads sees"""
+    expected = json.loads(recorded)["elements"]
+    rng = random.Random(3)
+    cuts = sorted(rng.sample(range(1, len(recorded)), 400))
+    chunks = [recorded[a:b] for a, b in zip([0] + cuts, cuts + [len(recorded)])]
+    assert list(iter_json_array(chunks)) == expected
+
+    assert list(iter_json_array([b'{"version": 0.6, "remark": "runtime error"}'])) == []
+    assert list(iter_json_array([b'{"elements": [1, 2.5', b'e3, "\\u00fc", [', b'], {}]}'])) == [1, 2500.0, "ü", [], {}]
+    with pytest.raises(ValueError):
+        list(iter_json_array([recorded[:100_000]]))
+
+
+def test_first_result_arrives_with_first_chunk(recorded):
+    """The first element is available after one chunk, not after the whole response"""
+    chunks = CountingChunks(recorded)
+    first = next(iter_json_array(chunks))
+    assert first["type"] in ("node", "way")
+    assert chunks.read == chunks.size
+
+
+def test_early_stop_returns_nearest_and_reads_less(recorded):
+    """With a result cap, reading stops after the first ring that settles the nearest facilities"""
+    chunks = CountingChunks(recorded)
+    nearest = osm_maps.collect_facilities(iter_json_array(chunks), LAT, LNG, max_results=25, keep=_heart)
+
+    assert [f["osm_id"] for f in nearest] == [f["osm_id"] for f in _brute_force_nearest(recorded, 25)]
+    assert chunks.read < 0.6 * len(recorded)
+
+    # Without a cap every relevant facility is kept, in stream order, once
+    everything = osm_maps.collect_facilities(iter_json_array([recorded]), LAT, LNG, keep=_heart)
+    assert len(everything) == len({f["osm_id"] for f in everything}) == len(_brute_force_nearest(recorded, None))
+
+
+def test_streaming_peak_memory_is_lower(recorded):
+    """Streaming with a cap needs a fraction of the memory of json.loads on the whole response"""
+    def peak(fn):
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    full = peak(lambda: osm_maps.collect_facilities(json.loads(recorded)["elements"], LAT, LNG, 25, _heart))
+    streamed = peak(lambda: osm_maps.collect_facilities(
+        iter_json_array(CountingChunks(recorded)), LAT, LNG, 25, _heart))
+    assert streamed < full / 5
+
+
+class RecordedOverpass(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.server.queries.append(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        body = self.server.body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # client stopped reading
+
+    def log_message(self, *args):
+        pass
+
+
+class RecordedOverpassServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # the client closes the connection once it has enough
+
+
+def test_uncached_search_streams_and_stops_early(recorded, monkeypatch):
+    """A large-radius search asks for rings and keeps only the nearest relevant facilities"""
+    server = RecordedOverpassServer(("127.0.0.1", 0), RecordedOverpass)
+    server.queries, server.body = [], recorded
+    read = []
+
+    def counting_parse(chunks):
+        def counted():
+            for chunk in chunks:
+                read.append(len(chunk))
+                yield chunk
+        return iter_json_array(counted())
+
+    monkeypatch.setattr(osm_maps, "iter_json_array", counting_parse)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(osm_maps, "OVERPASS_URL", f"http://127.0.0.1:{server.server_address[1]}/api/interpreter")
+    monkeypatch.setitem(http_client._backends, "overpass", BackendSession("overpass", retries=0))
+    try:
+        results = osm_maps.find_hospitals_nearby_osm(LAT, LNG, "heart", 60000, use_offline=False, limit=10)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [r["place_id"] for r in results] == [
+        f"osm_{f['osm_type']}_{f['osm_id']}" for f in _brute_force_nearest(recorded, 10)
+    ]
+    assert 'make ring_end ring="4", radius="60000"' in osm_maps.build_overpass_query(LAT, LNG, 60000, rings=4)
+    assert "ring_end" in server.queries[0].replace("+", " ").replace("%22", '"')
+    assert sum(read) < 0.6 * len(recorded)
+
+
+def test_single_ring_query_is_unchanged():
+    """Cached tile fetches keep the plain union query (complete, any order)"""
+    query = osm_maps.build_overpass_query(LAT, LNG, 5000)
+    assert query.count("(around:5000,52.52,13.4)") == 6
+    assert "make" not in query and query.rstrip().endswith("out center tags;")
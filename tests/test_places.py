@@ -0,0 +1,135 @@
+"""
+Unit tests for the concurrent Google Places search, against a local fake Places server
+"""
+import json
+import pytest
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import googlemaps
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.http_client as http_client
+import src.services.maps as maps
+from src.services.http_client import BackendSession
+from src.utils.settings import build_settings
+
+API_KEY = "AIzaFakeKeyForTests"
+LATENCY = 0.3
+
+
+def _place(place_id, offset):
+    return {
+        "place_id": place_id, "name": f"Place {place_id}", "vicinity": "Berlin",
+        "geometry": {"location": {"lat": 52.52 + offset, "lng": 13.40}},
+    }
+
+
+# keyword -> pages of results; "hospital" spans two pages and overlaps the others
+PAGES = {
+    "hospital": [[_place("a", 0.001), _place("b", 0.002)], [_place("c", 0.003), _place("x", 0.009)]],
+    "cardiology": [[_place("b", 0.002), _place("d", 0.004)]],
+    "heart clinic": [[_place("e", 0.005), _place("a", 0.001)]],
+}
+
+
+class FakePlacesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        with server.lock:
+            server.requests.append(query)
+        time.sleep(LATENCY)
+
+        token = query.get("pagetoken")
+        if token:
+            keyword, page = token.rsplit(":", 1)
+            if server.unready_tokens.pop(token, False):
+                body = {"status": "INVALID_REQUEST", "results": []}
+                return self._send(body)
+        else:
+            keyword, page = query["keyword"], "0"
+        pages = PAGES[keyword]
+        body = {"status": "OK", "results": pages[int(page)]}
+        if int(page) + 1 < len(pages):
+            body["next_page_token"] = f"{keyword}:{int(page) + 1}"
+        self._send(body)
+
+    def _send(self, body):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def places_server(monkeypatch):
+    """Fake Places server wired into maps.find_hospitals_nearby"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakePlacesHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.unready_tokens = {}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    backend = BackendSession("google_places", sleep=lambda seconds: None)
+    client = googlemaps.Client(
+        key=API_KEY, base_url=f"http://127.0.0.1:{server.server_address[1]}", requests_session=backend.session
+    )
+    monkeypatch.setitem(http_client._backends, "google_places", backend)
+    monkeypatch.setitem(maps._clients, API_KEY, client)
+
+    def use_settings(max_pages=3):
+        settings = build_settings({
+            "api": {"google_maps_api_key": API_KEY},
+            "maps": {"places": {"max_pages": max_pages, "page_token_delay": 0}},
+        })
+        monkeypatch.setattr(maps, "get_settings", lambda *args: settings)
+
+    server.use_settings = use_settings
+    use_settings()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_keyword_queries_run_concurrently_with_pagination(places_server):
+    """All pages are fetched and merged once per place_id in about the slowest query's time"""
+    start = time.perf_counter()
+    results = maps.find_hospitals_nearby(52.52, 13.40, "heart", 5000)
+    elapsed = time.perf_counter() - start
+
+    assert [r["place_id"] for r in results] == ["a", "b", "c", "d", "e", "x"]
+    assert all(r["distance_km"] is not None for r in results)
+    assert len(places_server.requests) == 4  # 3 first pages + 1 next page
+    # Serially: 4 requests; concurrently: the two-page "hospital" chain
+    assert elapsed < 3 * LATENCY
+
+
+def test_page_cap_and_limit(places_server):
+    """max_pages bounds the pagination and limit keeps the nearest results"""
+    places_server.use_settings(max_pages=1)
+    results = maps.find_hospitals_nearby(52.52, 13.40, "heart", 5000, limit=2)
+    assert [r["place_id"] for r in results] == ["a", "b"]
+    assert len(places_server.requests) == 3
+    assert not any("pagetoken" in q for q in places_server.requests)
+
+
+def test_unready_page_token_is_retried(places_server):
+    """A token that is not valid yet (INVALID_REQUEST) is requested again after the delay"""
+    places_server.unready_tokens["hospital:1"] = True
+    results = maps.find_hospitals_nearby(52.52, 13.40, "heart", 5000)
+    assert "x" in [r["place_id"] for r in results]
+    assert sum(q.get("pagetoken") == "hospital:1" for q in places_server.requests) == 2
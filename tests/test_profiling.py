@@ -0,0 +1,74 @@
+"""
+Unit tests for the training profiler
+"""
+import sys
+import os
+import json
+import pstats
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.profiling import TrainingProfiler, fit_voting_members
+
+
+def test_stages_are_recorded_in_order():
+    """Top-level stages precede their nested stages in the report"""
+    profiler = TrainingProfiler("demo")
+    with profiler.stage("load"):
+        pass
+    with profiler.stage("fit"):
+        with profiler.stage("rf"):
+            sum(range(10000))
+
+    report = profiler.report()
+    names = [s["name"] for s in report["stages"]]
+    assert names == ["load", "fit", "fit/rf"]
+    for stage in report["stages"]:
+        assert stage["wall_s"] >= 0
+        assert stage["cpu_s"] >= 0
+        assert "peak_rss_mb" in stage
+
+
+def test_disabled_profiler_records_nothing():
+    """Stages are no-ops when profiling is off"""
+    profiler = TrainingProfiler("demo", enabled=False)
+    with profiler.stage("fit"):
+        pass
+    assert profiler.stages == []
+
+
+def test_write_report_and_slowest_stage_dump(tmp_path):
+    """JSON report and a pstats dump of the slowest stage are written"""
+    profiler = TrainingProfiler("demo")
+    with profiler.stage("fast"):
+        pass
+    with profiler.stage("slow"):
+        sorted(np.random.default_rng(0).random(200000).tolist())
+
+    paths = profiler.write(str(tmp_path))
+    with open(paths["json"]) as f:
+        report = json.load(f)
+
+    assert report["slowest_stage"] == "slow"
+    assert report["profile_dump"]["stage"] == "slow"
+    assert pstats.Stats(paths["prof"]).total_calls > 0
+
+
+def test_fit_voting_members_matches_voting_fit():
+    """Member-by-member fitting gives the same soft-vote probabilities"""
+    X, y = make_classification(n_samples=200, random_state=0)
+    make = lambda: VotingClassifier(
+        estimators=[("lr", LogisticRegression()), ("rf", RandomForestClassifier(n_estimators=20, random_state=0))],
+        voting="soft",
+    )
+    reference = make().fit(X, y)
+    profiler = TrainingProfiler("demo", cprofile=False)
+    with profiler.stage("fit"):
+        profiled = fit_voting_members(make(), X, y, profiler)
+
+    np.testing.assert_allclose(profiled.predict_proba(X), reference.predict_proba(X))
+    assert [s["name"] for s in profiler.report()["stages"]] == ["fit", "fit/lr", "fit/rf"]
@@ -0,0 +1,100 @@
+"""
+Unit tests for the precompiled recommendation tables
+"""
+import pytest
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.recommendation.engine import (
+    RECOMMENDATION_TABLE,
+    _get_recommendations_by_risk,
+    generate_recommendations,
+    generate_recommendations_batch,
+    generate_recommendations_json,
+    risk_band,
+    risk_bands,
+)
+from src.utils import get_project_root
+
+# One score inside each granular band
+BAND_SCORES = {
+    "green_low": 10, "green_high": 35, "yellow_low": 50,
+    "yellow_high": 65, "red_low": 80, "red_high": 95,
+}
+
+
+def _legacy_generate(condition, score):
+    """generate_recommendations as it was before the tables were compiled"""
+    band = risk_band(score)
+    recommendations = _get_recommendations_by_risk(condition, band)
+    if band == "green_low":
+        recommendations["lifestyle"].insert(0, "✅ Excellent health indicators - maintain current habits")
+    elif band == "green_high":
+        recommendations["lifestyle"].insert(0, "⚠️ Good health but some risk factors detected - focus on prevention")
+    elif band == "yellow_low":
+        recommendations["medical"].insert(0, "⚡ Moderate risk detected - schedule medical consultation within 3-4 weeks")
+    elif band == "yellow_high":
+        recommendations["medical"].insert(0, "⚡ Elevated risk - schedule medical consultation within 1-2 weeks")
+    elif band == "red_low":
+        recommendations["medical"].insert(0, "🚨 High risk detected - seek medical attention within 3-5 days")
+    elif band == "red_high":
+        recommendations["medical"].insert(0, "🚨 CRITICAL RISK - Seek immediate medical attention (within 24-48 hours)")
+    return band, recommendations
+
+
+@pytest.mark.parametrize("condition", ["diabetes", "heart", "kidney", "Heart", "asthma"])
+@pytest.mark.parametrize("band", list(BAND_SCORES))
+def test_tables_match_legacy_output(condition, band):
+    """Every (condition, band) matches the previous dict-building implementation"""
+    score = BAND_SCORES[band]
+    legacy_band, legacy = _legacy_generate(condition, score)
+    result = generate_recommendations(condition, score)
+
+    assert legacy_band == band == result["risk_level"]
+    assert result["recommendations"] == legacy
+    assert json.loads(generate_recommendations_json(condition, score)) == json.loads(json.dumps(result))
+
+
+def test_unknown_band_uses_generic_entry():
+    """Bands without specific content get the generic fallback"""
+    entry = RECOMMENDATION_TABLE[("*", "unknown")]
+    assert entry.as_dict() == _get_recommendations_by_risk("diabetes", "green")
+
+
+def test_tables_are_immutable():
+    """Compiled entries cannot be changed by callers"""
+    entry = RECOMMENDATION_TABLE[("heart", "red_high")]
+    with pytest.raises(TypeError):
+        entry.recommendations["medical"] = ()
+    result = generate_recommendations("heart", 95)
+    result["recommendations"]["medical"].insert(0, "changed")
+    assert generate_recommendations("heart", 95)["recommendations"]["medical"][0].startswith("🚨")
+
+
+def test_vectorized_bands_match_scalar():
+    """risk_bands agrees with risk_band on band edges, with and without a config file"""
+    scores = [0, 10, 25, 25.01, 30, 30.5, 40, 55, 70, 70.5, 85, 85.01, 100]
+    assert risk_bands(scores).tolist() == [risk_band(s) for s in scores]
+
+    config_path = os.path.join(get_project_root(), "config", "config.yaml.template")
+    assert risk_bands(scores, config_path).tolist() == [risk_band(s, config_path) for s in scores]
+
+
+def test_batch_matches_single_generation():
+    """Batch results equal per-item generate_recommendations, feature rules included"""
+    items = [
+        {"disease": "diabetes", "risk_score": 82, "features": {"Glucose": 210, "BMI": 33, "Age": 30}},
+        {"disease": "heart", "risk_score": 12},
+        {"disease": "diabetes", "risk_score": 45, "features": {"Glucose": 150, "BMI": 22, "Age": 50}},
+        {"disease": "heart", "risk_score": 60, "features": {"chol": 260, "age": 61, "trestbps": 120}},
+    ]
+    batch = generate_recommendations_batch(items)
+
+    assert len(batch) == len(items)
+    for item, result in zip(items, batch):
+        assert result == generate_recommendations(item["disease"], item["risk_score"], features=item.get("features"))
+    assert "matched_rules" not in batch[1]
+    assert batch[0]["matched_rules"]
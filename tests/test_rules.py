@@ -0,0 +1,145 @@
+"""
+Unit tests for the data-driven recommendation rule engine
+"""
+import pytest
+import sys
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.recommendation.rules import RuleEngine, RuleSet, parse_rule, load_rule_file
+from src.recommendation.engine import generate_recommendations
+
+RULES_DIR = os.path.join(os.path.dirname(__file__), '..', 'config', 'rules')
+
+
+def _rule(rule_id, when, condition=None, priority=0):
+    return parse_rule({"id": rule_id, "text": rule_id, "when": when, "condition": condition, "priority": priority})
+
+
+def test_interval_boundaries():
+    """gt/ge/lt/le/eq/between respect open and closed ends"""
+    rules = RuleSet([
+        _rule("gt240", {"chol": {"gt": 240}}),
+        _rule("ge240", {"chol": {"ge": 240}}),
+        _rule("lt200", {"chol": {"lt": 200}}),
+        _rule("eq200", {"chol": {"eq": 200}}),
+        _rule("mid", {"chol": {"between": [200, 240]}}),
+    ])
+    ids = lambda value: sorted(r.id for r in rules.match({"chol": value}))
+
+    assert ids(240) == ["ge240", "mid"]
+    assert ids(240.5) == ["ge240", "gt240"]
+    assert ids(200) == ["eq200", "mid"]
+    assert ids(199) == ["lt200"]
+    assert ids(None) == []
+
+
+def test_conjunction_condition_and_priority():
+    """All features must match, condition filters rules and higher priority comes first"""
+    rules = RuleSet([
+        _rule("chol_age", {"chol": {"gt": 240}, "age": {"gt": 50}}, condition="heart", priority=5),
+        _rule("any_red", {"risk_score": {"gt": 70}}, priority=1),
+        _rule("glucose", {"Glucose": {"ge": 200}}, condition="diabetes", priority=3),
+    ])
+    patient = {"chol": 260, "age": 60, "risk_score": 80, "Glucose": 250}
+
+    assert [r.id for r in rules.match(patient, "heart")] == ["chol_age", "any_red"]
+    assert [r.id for r in rules.match(patient, "diabetes")] == ["glucose", "any_red"]
+    assert [r.id for r in rules.match(dict(patient, age=40), "heart")] == ["any_red"]
+    assert [r.id for r in rules.match(patient, "kidney")] == ["any_red"]
+
+
+def test_index_matches_direct_evaluation():
+    """Indexed batch matching agrees with evaluating every rule on random data"""
+    rng = np.random.default_rng(0)
+    ops = ["gt", "ge", "lt", "le", "eq"]
+    rules = []
+    for i in range(300):
+        when = {}
+        for feature in rng.choice(["a", "b", "c", "d"], size=rng.integers(1, 4), replace=False):
+            op = rng.choice(ops + ["between"])
+            when[feature] = {"between": sorted(rng.integers(0, 20, 2).tolist())} if op == "between" else {op: int(rng.integers(0, 20))}
+        rules.append(_rule(f"r{i}", when))
+    ruleset = RuleSet(rules)
+
+    patients = pd.DataFrame(rng.integers(0, 20, size=(200, 4)).astype(float), columns=list("abcd"))
+    patients.loc[::7, "c"] = np.nan
+    matched = ruleset.match_batch(patients)
+
+    for row, hits in zip(patients.to_dict(orient="records"), matched):
+        expected = {r.id for r in rules if r.matches(row)}
+        assert {r.id for r in hits} == expected
+
+
+def test_load_rule_files(tmp_path):
+    """Rules load from YAML and JSON; invalid rules are rejected"""
+    (tmp_path / "a.json").write_text(json.dumps({"rules": [{"id": "j", "text": "t", "when": {"x": {"lt": 1}}}]}))
+    ruleset = RuleSet.from_paths([RULES_DIR, str(tmp_path)])
+    assert "j" in {r.id for r in ruleset.rules}
+    assert len(ruleset) == len(load_rule_file(os.path.join(RULES_DIR, "clinical_rules.yaml"))) + 1
+
+    with pytest.raises(ValueError):
+        parse_rule({"id": "bad", "text": "t", "when": {"x": {"above": 1}}})
+    with pytest.raises(ValueError):
+        RuleSet([_rule("dup", {"x": {"lt": 1}}), _rule("dup", {"x": {"gt": 1}})])
+
+
+def test_reload_swaps_rules_in_background(tmp_path):
+    """Reloads compile off to the side; a broken file keeps the previous rules"""
+    path = tmp_path / "rules.yaml"
+    path.write_text("rules:\n  - {id: one, text: one, when: {x: {gt: 1}}}\n")
+    engine = RuleEngine([str(tmp_path)])
+    active = engine.ruleset
+    assert [r.id for r in engine.match({"x": 5})] == ["one"]
+
+    path.write_text("rules:\n  - {id: two, text: two, when: {x: {gt: 1}}}\n")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    thread = engine.reload_if_changed()
+    assert engine.ruleset is active or engine.ruleset.rules[0].id == "two"
+    thread.join(timeout=10)
+    assert [r.id for r in engine.match({"x": 5})] == ["two"]
+    assert engine.reload_if_changed() is None
+
+    path.write_text("rules:\n  - {id: bad, text: bad, when: {x: {above: 1}}}\n")
+    assert engine.reload() is False
+    assert engine.last_error
+    assert [r.id for r in engine.match({"x": 5})] == ["two"]
+
+
+def test_engine_picks_up_changed_files_on_read(tmp_path):
+    """Reads check the rule files every check_interval and reload in the background"""
+    path = tmp_path / "rules.yaml"
+    path.write_text("rules:\n  - {id: one, text: one, when: {x: {gt: 1}}}\n")
+    engine = RuleEngine([str(tmp_path)], check_interval=0)
+    path.write_text("rules:\n  - {id: two, text: two, when: {x: {gt: 1}}}\n")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+
+    deadline = time.time() + 10
+    while [r.id for r in engine.match({"x": 5})] != ["two"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert [r.id for r in engine.match({"x": 5})] == ["two"]
+
+
+def test_glucose_bands_are_contiguous():
+    """Every glucose value from 140 up matches exactly one glucose band"""
+    engine = RuleEngine([RULES_DIR])
+    for glucose in (139.9, 140, 199, 199.5, 200, 250):
+        ids = {r.id for r in engine.match({"Glucose": glucose}, "diabetes")} & {
+            "diabetes_glucose_prediabetic_range", "diabetes_glucose_diabetic_range"}
+        assert len(ids) == (0 if glucose < 140 else 1), glucose
+
+
+def test_generate_recommendations_with_features():
+    """Patient features add matching rule recommendations from config/rules"""
+    result = generate_recommendations("heart", 80, features={"chol": 260, "age": 61, "trestbps": 120})
+    ids = [r["id"] for r in result["matched_rules"]]
+
+    assert ids[0] == "heart_high_chol_over_50"
+    assert "heart_hypertension" not in ids
+    assert result["recommendations"]["medical"][-1] == result["matched_rules"][0]["text"]
+    assert "matched_rules" not in generate_recommendations("heart", 80)
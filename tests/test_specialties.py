@@ -0,0 +1,66 @@
+"""
+Unit tests for the precompiled specialty matcher
+"""
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.services.osm_maps as osm_maps
+from src.services.osm_index import read_extract
+from src.services.specialties import SpecialtyMatcher
+
+XML_EXTRACT = os.path.join(os.path.dirname(__file__), "fixtures", "osm", "sample_extract.osm")
+
+
+def _legacy_matches(keywords, *texts):
+    """Previous per-field, per-keyword lowercase substring test"""
+    return any(k.lower() in (t or "").lower() for k in keywords for t in texts)
+
+
+def test_matches_equal_legacy_substring_test():
+    """Compiled matching agrees with the old any(keyword in field) loop on random text"""
+    matcher = osm_maps.SPECIALTY_MATCHER
+    rng = random.Random(7)
+    words = ["Clinic", "CARDIOLOGY", "kidney", "Dialysis", "Praxis", "internal", "Medicine",
+             "Heart", "endo", "crinology", "St.", "", "nephro", "logy"]
+
+    for _ in range(500):
+        texts = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 4))) for _ in range(3)]
+        for condition, keywords in osm_maps.CONDITION_TO_SPECIALTIES.items():
+            assert matcher.matches(condition, *texts) == _legacy_matches(keywords, *texts), texts
+        expected = {c for c, kws in osm_maps.CONDITION_TO_SPECIALTIES.items() if _legacy_matches(kws, *texts)}
+        assert matcher.conditions(*texts) == expected
+
+
+def test_overlapping_keywords_credit_every_condition():
+    """A keyword inside a longer one, and keywords split across fields, behave like substring tests"""
+    matcher = SpecialtyMatcher({"a": ["cardio"], "b": ["cardiology"], "c": ["logy clinic"]})
+
+    assert matcher.conditions("Cardiology Clinic") == {"a", "b", "c"}
+    assert matcher.conditions("cardio") == {"a"}
+    # Fields are scanned together but a keyword never spans two of them
+    assert matcher.conditions("Cardiology", "clinic") == {"a", "b"}
+    assert not matcher.matches("unknown", "cardiology")
+    assert not matcher.has_condition("unknown") and matcher.has_condition("A")
+
+
+def test_screen_facilities_tags_all_conditions():
+    """Combined screening keeps specialists for any condition and general hospitals, tagged in one pass"""
+    facilities = read_extract(XML_EXTRACT)
+    screened = osm_maps.screen_facilities(facilities, 52.52, 13.40, ["heart", "kidney"])
+    by_name = {f["name"]: f["conditions"] for f in screened}
+
+    assert by_name["Herzzentrum Cardiology Clinic"] == ["heart"]
+    assert by_name["Nephrology Practice Prenzlauer Berg"] == ["kidney"]
+    assert by_name["Charite Campus Mitte"] == []
+    assert "Diabetes Praxis Moabit" not in by_name
+    assert "Dental Clinic North" not in by_name
+    assert [f["distance_meters"] for f in screened] == sorted(f["distance_meters"] for f in screened)
+
+    # Each condition's share matches the single-condition filter
+    for condition in ("heart", "kidney"):
+        single = {f["name"] for f in osm_maps.select_facilities(facilities, 52.52, 13.40, condition)}
+        tagged = {name for name, conds in by_name.items() if condition in conds or not conds}
+        assert single == tagged
@@ -0,0 +1,56 @@
+"""
+Unit tests for the synthetic patient data generator
+"""
+import pytest
+import sys
+import os
+import pandas as pd
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_processing.synthetic import SyntheticDataGenerator, fit_generator
+from src.api.app import EXPECTED_FEATURES
+
+RAW_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw')
+
+
+@pytest.mark.parametrize("disease", ["diabetes", "heart", "kidney"])
+def test_schema_matches_raw_data(disease):
+    """Synthetic rows keep the raw column names, order and dtypes"""
+    raw = pd.read_csv(os.path.join(RAW_DIR, f'{disease}.csv'))
+    sample = fit_generator(disease).sample(500)
+
+    assert list(sample.columns) == list(raw.columns)
+    assert (sample.dtypes.astype(str) == raw.dtypes.astype(str)).all()
+    assert set(EXPECTED_FEATURES[disease]).issubset(sample.columns)
+
+
+def test_iter_chunks_streams_requested_rows():
+    """Chunks add up to the requested row count with contiguous ids"""
+    gen = fit_generator("kidney")
+    chunks = list(gen.iter_chunks(2500, chunk_size=1000))
+
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+    ids = pd.concat(chunks)["id"].to_numpy()
+    assert np.array_equal(ids, np.arange(2500))
+
+
+def test_chunks_are_reproducible():
+    """The same seed yields identical chunks"""
+    a = next(fit_generator("diabetes", seed=7).iter_chunks(100))
+    b = next(fit_generator("diabetes", seed=7).iter_chunks(100))
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_preserves_marginals_and_correlation():
+    """Fitted copula keeps value ranges and the sign of strong correlations"""
+    rng = np.random.default_rng(0)
+    x = rng.normal(50, 10, 2000).round()
+    df = pd.DataFrame({"x": x, "y": 2 * x + rng.normal(0, 5, 2000), "label": (x > 55).astype(int)})
+    sample = SyntheticDataGenerator.fit(df).sample(5000)
+
+    assert sample["x"].between(df["x"].min(), df["x"].max()).all()
+    assert sample["x"].corr(sample["y"]) > 0.8
+    assert set(sample["label"].unique()) <= {0, 1}
+    assert abs(sample["label"].mean() - df["label"].mean()) < 0.05
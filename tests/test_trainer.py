@@ -86,3 +86,42 @@ def test_split_features_no_target():
     
     assert len(X.columns) == 2
     assert y is None
+
+
+def test_train_and_save_uses_configured_fold_cache(tmp_path):
+    """Models and cached splits are written to the configured directories only"""
+    from src.models.trainer import ModelTrainer
+
+    config = tmp_path / "config.yaml"
+    config.write_text(f"paths:\n  models: {tmp_path / 'models'}\n")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'a': rng.normal(size=120), 'b': rng.normal(size=120)})
+    df['Outcome'] = (df['a'] > 0).astype(int)
+
+    trainer = ModelTrainer(str(config), fold_cache_dir=str(tmp_path / "cache"))
+    result = trainer.train_and_save("diabetes", df, importance=False)
+
+    assert os.path.exists(result.model_path)
+    assert result.model_path.startswith(str(tmp_path))
+    assert os.listdir(tmp_path / "cache")
+
+
+def test_importance_is_opt_in(tmp_path, monkeypatch):
+    """Population SHAP importance only runs when enabled in config or by the caller"""
+    import src.models.trainer as trainer_module
+    from src.models.trainer import ModelTrainer
+
+    calls = []
+    monkeypatch.setattr(trainer_module, "compute_global_importance", lambda *a, **k: calls.append(1) or {})
+    monkeypatch.setattr(trainer_module, "save_importance", lambda report, save_dir, condition: "importance.json")
+    config = tmp_path / "config.yaml"
+    config.write_text(f"paths:\n  models: {tmp_path / 'models'}\n")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'a': rng.normal(size=120), 'b': rng.normal(size=120)})
+    df['Outcome'] = (df['a'] > 0).astype(int)
+    trainer = ModelTrainer(str(config), fold_cache_dir=str(tmp_path / "cache"))
+
+    assert trainer.train_and_save("diabetes", df).importance_path is None
+    assert calls == []
+    assert trainer.train_and_save("diabetes", df, importance=True).importance_path == "importance.json"
+    assert calls == [1]
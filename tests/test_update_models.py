@@ -0,0 +1,87 @@
+"""
+Unit tests for incremental model updates
+"""
+import pytest
+import sys
+import os
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from xgboost import XGBClassifier
+from lightgbm import LGBMClassifier
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ml.update_models import update_ensemble
+
+
+@pytest.fixture
+def fitted_ensemble():
+    X, y = make_classification(n_samples=300, n_features=6, random_state=0)
+    ensemble = VotingClassifier(
+        estimators=[
+            ('rf', RandomForestClassifier(n_estimators=10, random_state=0)),
+            ('xgb', XGBClassifier(n_estimators=10, random_state=0)),
+            ('lgbm', LGBMClassifier(n_estimators=10, random_state=0, verbose=-1)),
+            ('gb', GradientBoostingClassifier(n_estimators=10, random_state=0)),
+            ('lr', LogisticRegression()),
+        ],
+        voting='soft'
+    )
+    return ensemble.fit(X[:200], y[:200]), X[200:], y[200:]
+
+
+def test_update_ensemble_adds_rounds_and_trees(fitted_ensemble):
+    """Boosted members gain rounds, RF gains trees, others stay unchanged"""
+    model, X_new, y_new = fitted_ensemble
+    lr_coef = model.named_estimators_['lr'].coef_.copy()
+
+    model, changes = update_ensemble(model, X_new, y_new, extra_rounds=5, extra_trees=7)
+
+    assert len(model.named_estimators_['rf'].estimators_) == 17
+    assert model.named_estimators_['xgb'].get_booster().num_boosted_rounds() == 15
+    assert model.named_estimators_['lgbm'].booster_.num_trees() == 15
+    assert model.named_estimators_['gb'].n_estimators_ == 15
+    np.testing.assert_array_equal(model.named_estimators_['lr'].coef_, lr_coef)
+    assert changes['lr'].startswith("unchanged")
+
+
+def test_updated_ensemble_predicts(fitted_ensemble):
+    """The updated ensemble still produces valid probabilities"""
+    model, X_new, y_new = fitted_ensemble
+    model, _ = update_ensemble(model, X_new, y_new, extra_rounds=5, extra_trees=5)
+
+    proba = model.predict_proba(X_new)
+    assert proba.shape == (len(X_new), 2)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+
+def test_unpromoted_updates_chain_on_latest_version(tmp_path, monkeypatch, fitted_ensemble):
+    """A second update without --promote builds on v1, not on the serving model"""
+    import json
+    import joblib
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    import src.ml.update_models as update_models
+
+    model, X_new, y_new = fitted_ensemble
+    features = [f"f{i}" for i in range(X_new.shape[1])]
+    save_dir = tmp_path / "saved_models"
+    save_dir.mkdir()
+    joblib.dump(model, save_dir / "toy_model.joblib")
+    joblib.dump(StandardScaler().fit(pd.DataFrame(X_new, columns=features)), save_dir / "toy_scaler.joblib")
+    (save_dir / "toy_metadata.json").write_text(json.dumps({"features": features}))
+    batch = pd.DataFrame(X_new, columns=features).assign(target=y_new)
+    batch.to_csv(tmp_path / "batch.csv", index=False)
+    monkeypatch.setattr(update_models, "SAVE_DIR", str(save_dir))
+    monkeypatch.setattr(update_models, "VERSIONS_DIR", str(save_dir / "versions"))
+
+    update_models.update_and_save_model(str(tmp_path / "batch.csv"), "target", "toy",
+                                        extra_rounds=2, extra_trees=3)
+    second, metadata = update_models.update_and_save_model(str(tmp_path / "batch.csv"), "target", "toy",
+                                                           extra_rounds=2, extra_trees=3)
+
+    assert metadata["version"] == 2 and metadata["parent_version"] == 1
+    assert len(second.named_estimators_['rf'].estimators_) == 16
+    assert joblib.load(save_dir / "toy_model.joblib").named_estimators_['rf'].n_estimators == 10
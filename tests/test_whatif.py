@@ -0,0 +1,81 @@
+"""
+Unit tests for what-if sensitivity sweeps
+"""
+import pytest
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.whatif import build_block, parse_sweep, score_sweeps, zone_crossings
+
+FEATURES = ["Glucose", "BMI", "Age"]
+
+
+class LinearRisk:
+    """Risk = Glucose / 200, counting predict_proba calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        p = np.clip(X["Glucose"].to_numpy() / 200.0, 0, 1)
+        return np.column_stack([1 - p, p])
+
+
+def test_parse_sweep_range_is_inclusive():
+    """start/stop/step sweeps include the stop value"""
+    sweep = parse_sweep({"feature": "Glucose", "start": 80, "stop": 200, "step": 5}, FEATURES)
+    assert sweep.values[0] == 80 and sweep.values[-1] == 200
+    assert len(sweep.values) == 25
+
+    with pytest.raises(ValueError):
+        parse_sweep({"feature": "Height", "values": [1]}, FEATURES)
+    with pytest.raises(ValueError):
+        parse_sweep({"feature": "BMI", "start": 30, "stop": 20, "step": 1}, FEATURES)
+
+
+def test_build_block_layout():
+    """Block holds base row, one curve per sweep and the full cartesian grid"""
+    sweeps = [parse_sweep({"feature": "Glucose", "values": [100, 150, 200]}, FEATURES),
+              parse_sweep({"feature": "BMI", "values": [20, 30]}, FEATURES)]
+    block, curves, grid = build_block(np.array([120.0, 25.0, 50.0]), sweeps, FEATURES)
+
+    assert block.shape == (1 + 3 + 2 + 6, 3)
+    assert block[curves[1]][:, 0].tolist() == [120.0, 120.0]
+    assert block[grid][:, :2].tolist() == [[100, 20], [100, 30], [150, 20], [150, 30], [200, 20], [200, 30]]
+    assert (block[:, 2] == 50.0).all()
+
+    with pytest.raises(ValueError):
+        build_block(np.zeros(3), sweeps, FEATURES, max_rows=5)
+
+
+def test_zone_crossings_interpolate_boundaries():
+    """Crossings are interpolated in both directions, including double jumps"""
+    up = zone_crossings(np.array([0.0, 10.0]), np.array([20.0, 80.0]))
+    assert [(c["from"], c["to"]) for c in up] == [("Green", "Yellow"), ("Yellow", "Red")]
+    assert up[0]["at"] == pytest.approx(10 / 6)
+
+    down = zone_crossings(np.array([0.0, 1.0, 2.0]), np.array([60.0, 50.0, 20.0]))
+    assert down == [{"from": "Yellow", "to": "Green", "at": pytest.approx(5 / 3)}]
+
+
+def test_score_sweeps_uses_one_predict_call():
+    """Curves, crossings and grid come from a single batched predict_proba"""
+    model = LinearRisk()
+    result = score_sweeps(
+        model,
+        {"Glucose": 120, "BMI": 30, "Age": 50},
+        [{"feature": "Glucose", "start": 40, "stop": 200, "step": 10}, {"feature": "BMI", "values": [25, 30]}],
+        FEATURES,
+    )
+
+    assert model.calls == 1
+    assert result["base"] == {"risk_score": 60.0, "zone": "Yellow"}
+    glucose = result["curves"][0]
+    assert glucose["risk_scores"][0] == 20.0
+    assert [c["at"] for c in glucose["crossings"]] == pytest.approx([60.0, 140.0])
+    assert result["grid"]["shape"] == [17, 2]
+    assert result["rows_scored"] == 1 + 17 + 2 + 34